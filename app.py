@@ -3,13 +3,16 @@ import ccxt
 import pandas as pd
 import pandas_ta as ta
 import openai
-import requests
 import threading
 import logging
 import time
 import os
 from dotenv import load_dotenv
 from datetime import datetime
+from notifier import TelegramDispatcher
+from trade_journal import TradeJournal
+from execution import parse_fill
+import report
 
 # --- CONFIGURAÇÃO INICIAL ---
 st.set_page_config(page_title="🤖 Mega Bot Trader", layout="wide")
@@ -46,43 +49,85 @@ def get_exchange():
     exchange.set_sandbox_mode(True)  # Mude para False para produção
     return exchange
 
+@st.cache_resource
+def get_telegram_dispatcher():
+    """Um dispatcher por processo (o Streamlit reexecuta o script a cada interação)"""
+    return TelegramDispatcher(
+        lambda: (TELEGRAM_TOKEN, TELEGRAM_CHAT_ID),
+        on_error=lambda e: logging.error(f"Erro Telegram: {e}")
+    )
+
 def send_telegram_message(message):
-    """Envia mensagem para o Telegram"""
-    if TELEGRAM_TOKEN and TELEGRAM_CHAT_ID:
-        try:
-            url = f"https://api.telegram.org/bot{TELEGRAM_TOKEN}/sendMessage"
-            data = {"chat_id": TELEGRAM_CHAT_ID, "text": message, "parse_mode": "Markdown"}
-            requests.post(url, json=data)
-        except Exception as e:
-            logging.error(f"Erro Telegram: {e}")
+    """Enfileira a mensagem para o Telegram (envio em background)"""
+    get_telegram_dispatcher().send(message)
+
+@st.cache_resource
+def get_report_state():
+    """Vendas (diário SQLite), posições abertas e cotações para o relatório periódico"""
+    return {
+        'journal': TradeJournal('app_trades.db'),
+        'positions': {}, # symbol -> {'price', 'amount', 'cost'} das compras feitas nesta execução
+        'prices': {},
+        'free_usdt': None
+    }
+
+def record_sell(symbol, fill, reason):
+    """Grava a venda com o lucro real, se a compra foi feita nesta execução"""
+    state = get_report_state()
+    position = state['positions'].pop(symbol, None)
+    if not position or not fill['filled']:
+        logging.warning(f"Venda de {symbol} sem preço de entrada conhecido: fora do relatório")
+        return
+    cost_basis = position['cost'] * min(1.0, fill['filled'] / position['amount'])
+    profit_usdt = fill['cost'] - fill['fee_usdt'] - cost_basis
+    state['journal'].append({
+        'symbol': symbol,
+        'type': 'SELL',
+        'buy_price': position['price'],
+        'sell_price': fill['price'],
+        'amount': fill['filled'],
+        'profit_usdt': profit_usdt,
+        'profit_pct': profit_usdt / cost_basis * 100 if cost_basis else 0.0,
+        'reason': reason,
+        'timestamp': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+        'fee_usdt': position['fee_usdt'] + fill['fee_usdt']
+    })
 
 def relatorio_ia_telegram():
-    """Thread do 'Sócio Digital': Lê logs, resume com IA e envia no Telegram"""
+    """Thread do 'Sócio Digital': resume o período (números calculados localmente) e envia no Telegram"""
+    start = datetime.now()
+    equity_start = None
     while True:
         time.sleep(21600)  # Roda a cada 6 horas
         try:
-            if os.path.exists('diario_bordo.log'):
-                with open('diario_bordo.log', 'r') as f:
-                    logs = f.read()
-                
-                if not logs.strip():
-                    continue
-
-                # Chama OpenAI (GPT-4o-mini ou 3.5-turbo)
-                client = openai.OpenAI(api_key=OPENAI_API_KEY)
-                prompt = f"Resuma essas operações de trade num tom informal de um sócio para o Telegram. Use emojis. Diga o lucro/prejuízo e o saldo atual:\n\n{logs[-2000:]}"
-                
-                response = client.chat.completions.create(
-                    model="gpt-3.5-turbo",
-                    messages=[{"role": "user", "content": prompt}]
-                )
-                
-                resumo = response.choices[0].message.content
-                send_telegram_message(f"🧠 *Relatório do Sócio Digital*\n\n{resumo}")
-                
-                # Limpa o log após envio (opcional, ou arquiva)
-                with open('diario_bordo.log', 'w') as f:
-                    f.write("")
+            state = get_report_state()
+            end = datetime.now()
+            positions = dict(state['positions'])
+            prices = dict(state['prices'])
+            equity_end = None
+            if state['free_usdt'] is not None:
+                equity_end = state['free_usdt'] + sum(p['amount'] * prices.get(s, p['price']) for s, p in positions.items())
+            trades = state['journal'].query(start=start.strftime('%Y-%m-%d %H:%M:%S'), end=end.strftime('%Y-%m-%d %H:%M:%S'))
+            digest = report.build_digest(trades, positions, prices, start, end, equity_start, equity_end)
+            start, equity_start = end, equity_end
+            if report.is_empty(digest):
+                continue
+
+            resumo = None
+            if OPENAI_API_KEY:
+                try:
+                    # Só o resumo vai para o LLM, que escreve o texto
+                    client = openai.OpenAI(api_key=OPENAI_API_KEY)
+                    response = client.chat.completions.create(
+                        model="gpt-3.5-turbo",
+                        messages=[{"role": "user", "content": report.build_prompt(digest)}]
+                    )
+                    resumo = response.choices[0].message.content
+                except Exception as e:
+                    logging.error(f"Erro na Thread IA (usando relatório sem IA): {e}")
+            if resumo is None:
+                resumo = report.render_template(digest)
+            send_telegram_message(f"🧠 *Relatório do Sócio Digital*\n\n{resumo}")
                     
         except Exception as e:
             logging.error(f"Erro na Thread IA: {e}")
@@ -104,6 +149,7 @@ def run_bot_logic(exchange, placeholder):
             # Atualiza Saldo
             balance = exchange.fetch_balance()
             free_usdt = balance['total'].get('USDT', 0.0)
+            report_state = get_report_state()
             
             for symbol in PAIRS:
                 try:
@@ -117,6 +163,7 @@ def run_bot_logic(exchange, placeholder):
                     df = pd.concat([df, bbands], axis=1)
                     
                     current_price = df['close'].iloc[-1]
+                    report_state['prices'][symbol] = float(current_price)
                     rsi = df['rsi'].iloc[-1]
                     lower_band = df[f"BBL_20_2.0"].iloc[-1]
                     
@@ -134,7 +181,13 @@ def run_bot_logic(exchange, placeholder):
                         if rsi < 30 and current_price < lower_band:
                             if free_usdt >= 11.0:
                                 amount = 11.0 / current_price
-                                exchange.create_market_buy_order(symbol, amount)
+                                fill = parse_fill(exchange.create_market_buy_order(symbol, amount), symbol)
+                                report_state['positions'][symbol] = {
+                                    'price': fill['price'] or float(current_price),
+                                    'amount': fill['filled'] or amount,
+                                    'cost': fill['cost'] or 11.0,
+                                    'fee_usdt': fill['fee_usdt']
+                                }
                                 msg = f"🟢 COMPRA: {symbol} a ${current_price:.4f}"
                                 logging.info(msg)
                                 send_telegram_message(msg)
@@ -159,7 +212,8 @@ def run_bot_logic(exchange, placeholder):
                         # pois sem banco de dados, calcular % exato é arriscado.
                         
                         if rsi > 70:
-                            exchange.create_market_sell_order(symbol, coin_balance)
+                            fill = parse_fill(exchange.create_market_sell_order(symbol, coin_balance), symbol)
+                            record_sell(symbol, fill, "RSI > 70")
                             msg = f"🔴 VENDA (RSI > 70): {symbol} a ${current_price:.4f}"
                             logging.info(msg)
                             send_telegram_message(msg)
@@ -177,6 +231,8 @@ def run_bot_logic(exchange, placeholder):
                     logging.error(f"Erro em {symbol}: {e}")
                     status_data.append({"Moeda": symbol, "Status": "Erro"})
 
+            report_state['free_usdt'] = free_usdt
+
             # Atualiza Interface
             df_status = pd.DataFrame(status_data)
             
@@ -0,0 +1,193 @@
+import argparse
+import os
+import time
+from datetime import datetime
+import numpy as np
+import pandas as pd
+
+from candles import CANDLE_COLUMNS
+from indicators import rsi_series, bollinger_series, higher_timeframe_rsi
+from candles import timeframe_seconds
+from strategy import TRADE_AMOUNT_USDT, RISK_MODES, buy_signal, exit_masks, sell_reason, uses_higher_timeframes
+
+# Backtest vetorizado das estratégias do robô sobre candles históricos locais.
+#
+# Uso:
+#   python backtest.py dados/BTC_USDT_1m.csv dados/ETH_USDT_1m.parquet --risk-mode moderate
+#
+# Arquivos CSV/Parquet (Parquet requer pyarrow) com as colunas timestamp(ms), open, high, low, close, volume
+# (ou sem cabeçalho, na ordem do fetch_ohlcv). O par vem do nome do arquivo
+# (BTC_USDT_1m.csv -> BTC/USDT) ou de --symbol.
+
+DEFAULT_FEE_RATE = 0.001  # Taxa spot da Binance (0,1%) em cada lado
+
+def symbol_from_path(path):
+    name = os.path.splitext(os.path.basename(path))[0]
+    parts = name.split('_')
+    if len(parts) >= 2:
+        return f"{parts[0]}/{parts[1]}".upper()
+    return name.upper()
+
+def load_candles(path):
+    """Lê CSV/Parquet e retorna um dict de arrays NumPy (timestamp, open, ..., volume)"""
+    if path.endswith('.parquet'):
+        df = pd.read_parquet(path)
+    else:
+        df = pd.read_csv(path)
+        if 'close' not in df.columns:
+            df = pd.read_csv(path, header=None, names=CANDLE_COLUMNS)
+    df = df.sort_values('timestamp').drop_duplicates('timestamp')
+    return {col: df[col].to_numpy(dtype=np.float64) for col in CANDLE_COLUMNS}
+
+def compute_indicators(close, params):
+    """(rsi, banda inferior) da série inteira, de uma vez"""
+    rsi = rsi_series(close, params['rsi_length'])
+    lower_band, _, _ = bollinger_series(close, params['bb_length'], params['bb_std'])
+    return rsi, lower_band
+
+def compute_htf_rsi(candles, params):
+    """{timeframe: RSI alinhado aos candles de 1m} para os perfis com confirmação (None nos demais)"""
+    if not uses_higher_timeframes(params):
+        return None
+    timeframes = set(params.get('confirm_rsi_buy', {})) | set(params.get('confirm_rsi_sell', {}))
+    return {
+        tf: higher_timeframe_rsi(candles['timestamp'], candles['close'], timeframe_seconds(tf) * 1000, params['rsi_length'])
+        for tf in timeframes
+    }
+
+def compute_signals(close, params, indicators=None, htf_rsi=None):
+    """Sinais de entrada; indicators permite reaproveitar (rsi, banda) já calculados"""
+    rsi, lower_band = indicators if indicators is not None else compute_indicators(close, params)
+    with np.errstate(invalid='ignore'):
+        entries = buy_signal(params, rsi, close, lower_band, htf_rsi)
+    return rsi, entries
+
+def find_exit(close, rsi, entry_index, buy_price, params, chunk=1024, htf_rsi=None):
+    """Primeiro candle após a entrada que dispara TP, SL ou RSI.
+    Procura em blocos crescentes, já que a maioria das posições fecha logo."""
+    start = entry_index + 1
+    while start < len(close):
+        end = min(start + chunk, len(close))
+        pnl = (close[start:end] - buy_price) / buy_price * 100
+        with np.errstate(invalid='ignore'):
+            htf_slice = {tf: values[start:end] for tf, values in htf_rsi.items()} if htf_rsi else None
+            take_profit, stop_loss, tech_exit = exit_masks(params, pnl, rsi[start:end], htf_slice)
+        hits = take_profit | stop_loss | tech_exit
+        if hits.any():
+            offset = int(np.argmax(hits))
+            reason = sell_reason(params, take_profit[offset], stop_loss[offset], tech_exit[offset])
+            return start + offset, reason
+        start = end
+        chunk *= 2
+    return None, None
+
+def simulate(symbol, candles, params, amount_usdt=TRADE_AMOUNT_USDT, fee_rate=DEFAULT_FEE_RATE, indicators=None):
+    """Uma posição por vez, valor fixo por compra, taxa nos dois lados.
+    Retorna os trades fechados com os mesmos campos gravados por save_trade; o
+    lucro segue o on_sell_filled (líquido das taxas, % sobre o custo da compra).
+    TP/SL/RSI continuam pelo preço bruto, como no robô."""
+    close = candles['close']
+    timestamps = candles['timestamp']
+    htf_rsi = compute_htf_rsi(candles, params)
+    rsi, entries = compute_signals(close, params, indicators, htf_rsi)
+    entry_indexes = np.flatnonzero(entries)
+
+    trades = []
+    open_position = None
+    cursor = 0
+    while cursor < len(entry_indexes):
+        i = int(entry_indexes[cursor])
+        buy_price = close[i]
+        amount = amount_usdt / buy_price * (1 - fee_rate)  # Taxa da compra sai na moeda
+        j, reason = find_exit(close, rsi, i, buy_price, params, htf_rsi=htf_rsi)
+        if j is None:
+            open_position = {'symbol': symbol, 'buy_price': buy_price, 'amount': amount,
+                             'timestamp': format_ts(timestamps[i])}
+            break
+
+        sell_price = close[j]
+        sell_fee = amount * sell_price * fee_rate
+        proceeds = amount * sell_price - sell_fee
+        profit_usdt = proceeds - amount_usdt
+        trades.append({
+            'symbol': symbol,
+            'type': 'SELL',
+            'buy_price': float(buy_price),
+            'sell_price': float(sell_price),
+            'amount': float(amount),
+            'profit_usdt': float(profit_usdt),
+            'profit_pct': float(profit_usdt / amount_usdt * 100),
+            'reason': reason,
+            'fee_usdt': float(amount_usdt * fee_rate + sell_fee),
+            'timestamp': format_ts(timestamps[j]),
+            'entry_timestamp': format_ts(timestamps[i])
+        })
+        # Próxima compra só depois da venda
+        cursor = int(np.searchsorted(entry_indexes, j, side='right'))
+
+    return trades, open_position
+
+def summarize(trades):
+    profits = np.array([t['profit_usdt'] for t in trades]) if trades else np.zeros(0)
+    equity = np.cumsum(profits)
+    drawdown = float(np.max(np.maximum.accumulate(np.concatenate(([0.0], equity)))[1:] - equity)) if trades else 0.0
+    by_reason = {}
+    for t in trades:
+        by_reason[t['reason']] = by_reason.get(t['reason'], 0.0) + t['profit_usdt']
+    return {
+        'trades': len(trades),
+        'profit_usdt': float(profits.sum()),
+        'win_rate': float((profits > 0).mean() * 100) if trades else 0.0,
+        'avg_profit_usdt': float(profits.mean()) if trades else 0.0,
+        'max_drawdown_usdt': drawdown,
+        'by_reason': by_reason
+    }
+
+def run_backtest(datasets, params, amount_usdt=TRADE_AMOUNT_USDT, fee_rate=DEFAULT_FEE_RATE):
+    """datasets: {par: candles}. Retorna (trades de todos os pares, resumo por par e geral)"""
+    all_trades = []
+    summary = {}
+    for symbol, candles in datasets.items():
+        trades, _ = simulate(symbol, candles, params, amount_usdt, fee_rate)
+        summary[symbol] = summarize(trades)
+        all_trades.extend(trades)
+    all_trades.sort(key=lambda t: t['timestamp'])
+    summary['TOTAL'] = summarize(all_trades)
+    return all_trades, summary
+
+def format_ts(ms):
+    return datetime.fromtimestamp(ms / 1000).strftime('%Y-%m-%d %H:%M:%S')
+
+def main():
+    parser = argparse.ArgumentParser(description="Backtest vetorizado das estratégias do robô")
+    parser.add_argument('files', nargs='+', help="Arquivos CSV/Parquet de candles")
+    parser.add_argument('--symbol', help="Par (se for um único arquivo sem o par no nome)")
+    parser.add_argument('--risk-mode', default='conservative', choices=sorted(RISK_MODES))
+    parser.add_argument('--amount', type=float, default=TRADE_AMOUNT_USDT, help="USDT por compra")
+    parser.add_argument('--fee', type=float, default=DEFAULT_FEE_RATE * 100, help="Taxa por lado, em %%")
+    parser.add_argument('--trades-out', help="Salva os trades simulados em CSV")
+    args = parser.parse_args()
+
+    started = time.time()
+    datasets = {}
+    for path in args.files:
+        symbol = args.symbol if args.symbol and len(args.files) == 1 else symbol_from_path(path)
+        datasets[symbol] = load_candles(path)
+    loaded = time.time()
+
+    trades, summary = run_backtest(datasets, RISK_MODES[args.risk_mode], args.amount, args.fee / 100)
+    finished = time.time()
+
+    candles_total = sum(len(c['close']) for c in datasets.values())
+    print(f"Perfil: {args.risk_mode} | {len(datasets)} pares | {candles_total} candles")
+    print(f"Leitura: {loaded - started:.2f}s | Simulação: {finished - loaded:.2f}s\n")
+    print(f"{'Par':<12} {'Trades':>7} {'Lucro USDT':>11} {'Acerto %':>9} {'Drawdown':>9}")
+    for symbol, s in summary.items():
+        print(f"{symbol:<12} {s['trades']:>7} {s['profit_usdt']:>11.2f} {s['win_rate']:>9.1f} {s['max_drawdown_usdt']:>9.2f}")
+
+    if args.trades_out:
+        pd.DataFrame(trades).to_csv(args.trades_out, index=False)
+        print(f"\nTrades salvos em {args.trades_out}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,167 @@
+import json
+import threading
+import time
+from websockets.exceptions import ConnectionClosedOK
+from websockets.sync.client import connect
+
+LISTEN_KEY_KEEPALIVE_SECONDS = 1800  # A Binance expira o listenKey após 60 min sem keepalive
+
+class BalanceCache:
+    """Saldo da conta mantido localmente, sem fetch_balance a cada ciclo.
+
+    Fontes, da mais para a menos confiável:
+    - apply_snapshot(): fetch_balance completo (reconciliação periódica);
+    - apply_account(): saldo absoluto por moeda vindo do stream da conta;
+    - apply_fill(): variação calculada a partir do preenchimento de uma ordem.
+    Valores reservados para ordens em andamento ficam fora de available().
+    """
+
+    def __init__(self, reconcile_seconds=300, clock=time.time):
+        self.reconcile_seconds = reconcile_seconds
+        self.clock = clock
+        self.lock = threading.Lock()
+        self.free = {}
+        self.used = {}
+        self.reserved = {}
+        self.reconciled_at = None
+        self.stale = True
+
+    def needs_reconcile(self, interval=None):
+        interval = self.reconcile_seconds if interval is None else interval
+        with self.lock:
+            return self.stale or self.reconciled_at is None or self.clock() - self.reconciled_at >= interval
+
+    def mark_stale(self):
+        """Força um fetch_balance no próximo ciclo (ex.: stream caiu)"""
+        self.stale = True
+
+    def apply_snapshot(self, balance):
+        """Resposta do fetch_balance do ccxt"""
+        with self.lock:
+            total = balance.get('total') or {}
+            free = balance.get('free') or {}
+            self.free = {asset: float(free.get(asset, amount) or 0.0) for asset, amount in total.items()}
+            self.used = {asset: float(amount or 0.0) - self.free[asset] for asset, amount in total.items()}
+            self.reconciled_at = self.clock()
+            self.stale = False
+
+    def apply_account(self, balances):
+        """Evento outboundAccountPosition: [{'a': moeda, 'f': livre, 'l': travado}]"""
+        with self.lock:
+            for item in balances:
+                self.free[item['a']] = float(item['f'])
+                self.used[item['a']] = float(item['l'])
+
+    def apply_delta(self, asset, delta):
+        """Evento balanceUpdate (depósito, saque, transferência)"""
+        with self.lock:
+            self.free[asset] = self.free.get(asset, 0.0) + float(delta)
+
+    def apply_fill(self, symbol, side, fill):
+        """Variação do saldo causada por uma ordem executada (ver execution.parse_fill)"""
+        base, quote = symbol.split('/')
+        sign = 1 if side == 'buy' else -1
+        with self.lock:
+            self.free[base] = self.free.get(base, 0.0) + sign * fill['filled'] - fill['fee_base']
+            self.free[quote] = self.free.get(quote, 0.0) - sign * fill['cost'] - fill['fee_quote']
+
+    def reserve(self, asset, amount):
+        with self.lock:
+            self.reserved[asset] = self.reserved.get(asset, 0.0) + amount
+
+    def release(self, asset, amount):
+        with self.lock:
+            self.reserved[asset] = max(0.0, self.reserved.get(asset, 0.0) - amount)
+
+    def total(self, asset):
+        with self.lock:
+            return self.free.get(asset, 0.0) + self.used.get(asset, 0.0)
+
+    def available(self, asset):
+        """Total menos o que está reservado para ordens ainda sem preenchimento"""
+        with self.lock:
+            return self.free.get(asset, 0.0) + self.used.get(asset, 0.0) - self.reserved.get(asset, 0.0)
+
+    def snapshot(self):
+        """Mesmo formato do fetch_balance ({'total': ..., 'free': ...})"""
+        with self.lock:
+            assets = set(self.free) | set(self.used)
+            return {
+                'total': {a: self.free.get(a, 0.0) + self.used.get(a, 0.0) for a in assets},
+                'free': dict(self.free)
+            }
+
+class UserDataStream:
+    """Stream da conta da Binance (listenKey): repassa atualizações de saldo ao cache
+    numa thread própria, com keepalive do listenKey e reconexão automática."""
+
+    def __init__(self, exchange, base_url, cache, on_update=None, on_error=None):
+        self.exchange = exchange
+        self.base_url = base_url.rstrip('/')
+        self.cache = cache
+        self.on_update = on_update
+        self.on_error = on_error
+        self.stop_event = threading.Event()
+        self.thread = None
+        self.connected = False
+        self.failures = 0  # Falhas seguidas (on_error recebe a contagem)
+
+    def start(self):
+        self.stop_event.clear()
+        self.thread = threading.Thread(target=self._run, name="user-data-stream", daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        self.stop_event.set()
+        if self.thread:
+            self.thread.join(timeout=5)
+        self.connected = False
+
+    @property
+    def running(self):
+        return self.thread is not None and self.thread.is_alive()
+
+    def _run(self):
+        backoff = 1
+        while not self.stop_event.is_set():
+            try:
+                listen_key = self.exchange.publicPostUserDataStream()['listenKey']
+                kept_alive = time.time()
+                with connect(f"{self.base_url}/ws/{listen_key}", open_timeout=10) as ws:
+                    self.connected = True
+                    self.failures = 0
+                    backoff = 1
+                    while not self.stop_event.is_set():
+                        if time.time() - kept_alive > LISTEN_KEY_KEEPALIVE_SECONDS:
+                            self.exchange.publicPutUserDataStream({'listenKey': listen_key})
+                            kept_alive = time.time()
+                        try:
+                            message = ws.recv(timeout=1)
+                        except TimeoutError:
+                            continue
+                        self._dispatch(message)
+            except ConnectionClosedOK:
+                pass
+            except Exception as e:
+                self.failures += 1
+                if self.on_error:
+                    self.on_error(e, self.failures)
+            # Stream caiu: eventos podem ter sido perdidos, o próximo ciclo reconcilia
+            if self.connected:
+                self.cache.mark_stale()
+            self.connected = False
+            self.stop_event.wait(backoff)
+            backoff = min(backoff * 2, 30)
+
+    def _dispatch(self, message):
+        data = json.loads(message)
+        data = data.get('event', data)  # Formato da WebSocket API envolve em 'event'
+        kind = data.get('e')
+        if kind == 'outboundAccountPosition':
+            self.cache.apply_account(data.get('B', []))
+        elif kind == 'balanceUpdate':
+            self.cache.apply_delta(data['a'], data['d'])
+        else:
+            return
+        if self.on_update:
+            self.on_update()
@@ -0,0 +1,188 @@
+import json
+import math
+import threading
+import time
+import zlib
+from collections import Counter
+
+# Substituto determinístico do ccxt.binance para benchmarks e testes locais:
+# candles sintéticos, latência configurável e contagem de requisições.
+
+class FakeExchange:
+    """Implementa só os métodos do ccxt que o robô usa"""
+
+    def __init__(self, pairs, latency=0.02, balance_usdt=1000.0, candles_per_call=1000):
+        self.pairs = list(pairs)
+        self.latency = latency
+        self.candles_per_call = candles_per_call
+        self.lock = threading.Lock()
+        self.calls = Counter()
+        self.balance = {'USDT': balance_usdt}
+        self.orders = []
+        self.user_server = None
+        self.user_clients = set()
+        self.markets = {
+            symbol: {
+                'symbol': symbol,
+                'precision': {'amount': 1e-6, 'price': 1e-2},
+                'limits': {'amount': {'min': 1e-6}, 'cost': {'min': 5.0}}
+            }
+            for symbol in self.pairs
+        }
+
+    # --- Infraestrutura ---
+
+    def _request(self, method):
+        with self.lock:
+            self.calls[method] += 1
+        if self.latency:
+            time.sleep(self.latency)
+
+    def reset_calls(self):
+        with self.lock:
+            self.calls = Counter()
+
+    @staticmethod
+    def parse_timeframe(timeframe):
+        units = {'m': 60, 'h': 3600, 'd': 86400}
+        return int(timeframe[:-1]) * units[timeframe[-1]]
+
+    def set_sandbox_mode(self, enabled):
+        pass
+
+    def load_markets(self, reload=False):
+        self._request('load_markets')
+        return self.markets
+
+    def amount_to_precision(self, symbol, amount):
+        return f"{math.floor(amount * 1e6) / 1e6:.6f}"
+
+    # --- Dados de mercado sintéticos ---
+
+    def price_at(self, symbol, ts):
+        """Preço determinístico por par e minuto: senoide + ruído fixo"""
+        seed = zlib.crc32(symbol.encode())
+        base = 1 + seed % 50000
+        minute = ts // 60000
+        noise = (zlib.crc32(f"{symbol}{minute}".encode()) % 1000) / 1000 - 0.5
+        return base * (1 + 0.02 * math.sin(minute / 30 + seed) + 0.004 * noise)
+
+    def _candle(self, symbol, ts):
+        close = self.price_at(symbol, ts)
+        open_ = self.price_at(symbol, ts - 60000)
+        return [ts, open_, max(open_, close) * 1.001, min(open_, close) * 0.999, close, 10.0]
+
+    def fetch_ohlcv(self, symbol, timeframe='1m', since=None, limit=None):
+        self._request('fetch_ohlcv')
+        step = self.parse_timeframe(timeframe) * 1000
+        now = int(time.time() * 1000) // step * step
+        if since is None:
+            count = limit or self.candles_per_call
+            start = now - (count - 1) * step
+        else:
+            start = since // step * step
+        end = now if limit is None else min(now, start + (limit - 1) * step)
+        count = min((end - start) // step + 1, self.candles_per_call)
+        return [self._candle(symbol, start + i * step) for i in range(count)]
+
+    def _ticker(self, symbol):
+        return {'symbol': symbol, 'last': self.price_at(symbol, int(time.time() * 1000))}
+
+    def fetch_ticker(self, symbol):
+        self._request('fetch_ticker')
+        return self._ticker(symbol)
+
+    def fetch_tickers(self, symbols=None):
+        self._request('fetch_tickers')
+        return {s: self._ticker(s) for s in (symbols or self.pairs)}
+
+    # --- Conta e ordens ---
+
+    def fetch_balance(self):
+        self._request('fetch_balance')
+        with self.lock:
+            total = dict(self.balance)
+        return {'total': total, 'free': dict(total)}
+
+    def _fill(self, symbol, side, amount, params=None):
+        price = self._ticker(symbol)['last']
+        amount = float(amount)
+        asset = symbol.split('/')[0]
+        with self.lock:
+            sign = 1 if side == 'buy' else -1
+            self.balance[asset] = self.balance.get(asset, 0.0) + sign * amount
+            self.balance['USDT'] = self.balance.get('USDT', 0.0) - sign * amount * price
+            order = {
+                'id': str(len(self.orders) + 1),
+                'clientOrderId': (params or {}).get('newClientOrderId'),
+                'symbol': symbol, 'side': side, 'type': 'market', 'status': 'closed',
+                'amount': amount, 'filled': amount, 'average': price, 'cost': amount * price,
+                'fee': {'currency': 'USDT', 'cost': amount * price * 0.001}
+            }
+            self.orders.append(order)
+            updated = {asset: self.balance[asset] for asset in (asset, 'USDT')}
+        self._push_account(updated)
+        return order
+
+    def fetch_order(self, id, symbol=None, params=None):
+        self._request('fetch_order')
+        cid = (params or {}).get('origClientOrderId')
+        with self.lock:
+            for order in self.orders:
+                if order['id'] == id or (cid and order['clientOrderId'] == cid):
+                    return dict(order)
+        raise KeyError(f"Ordem {id or cid} não encontrada")
+
+    def create_market_buy_order(self, symbol, amount, params=None):
+        self._request('create_order')
+        return self._fill(symbol, 'buy', amount, params)
+
+    def create_market_sell_order(self, symbol, amount, params=None):
+        self._request('create_order')
+        return self._fill(symbol, 'sell', amount, params)
+
+    # --- Stream da conta (listenKey), para testar o balance_cache sem internet ---
+
+    def start_user_stream(self, host='localhost', port=0):
+        """Sobe um WebSocket local no formato do stream da conta da Binance e retorna
+        a URL base (use em BINANCE_USER_STREAM_URL)"""
+        from websockets.sync.server import serve
+
+        def handler(ws):
+            with self.lock:
+                self.user_clients.add(ws)
+            try:
+                for _ in ws:
+                    pass
+            finally:
+                with self.lock:
+                    self.user_clients.discard(ws)
+
+        self.user_server = serve(handler, host, port)
+        threading.Thread(target=self.user_server.serve_forever, daemon=True).start()
+        return f"ws://{host}:{self.user_server.socket.getsockname()[1]}"
+
+    def publicPostUserDataStream(self, params=None):
+        self._request('user_data_stream')
+        if self.user_server is None:
+            raise RuntimeError("Stream da conta não iniciado (start_user_stream)")
+        return {'listenKey': 'fake-listen-key'}
+
+    def publicPutUserDataStream(self, params=None):
+        self._request('user_data_stream')
+        return {}
+
+    def _push_account(self, balances):
+        if not self.user_clients:
+            return
+        message = json.dumps({
+            'e': 'outboundAccountPosition', 'E': int(time.time() * 1000),
+            'B': [{'a': asset, 'f': f"{amount:.8f}", 'l': "0.00000000"} for asset, amount in balances.items()]
+        })
+        with self.lock:
+            clients = list(self.user_clients)
+        for ws in clients:
+            try:
+                ws.send(message)
+            except Exception:
+                pass
@@ -0,0 +1,85 @@
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Endpoint local compatível com POST /v1/chat/completions, para rodar o chat do
+# Telegram sem rede nem custo. Latência configurável e contagem de chamadas.
+#
+#   stub = FakeOpenAI(latency=0.2).start()
+#   os.environ["OPENAI_BASE_URL"] = stub.base_url   # antes de criar o cliente
+
+class FakeOpenAI:
+    def __init__(self, latency=0.05, host='127.0.0.1', port=0):
+        self.latency = latency
+        self.lock = threading.Lock()
+        self.calls = 0
+        self.prompts = []
+        self.server = ThreadingHTTPServer((host, port), self._handler())
+        self.server.daemon_threads = True
+
+    @property
+    def base_url(self):
+        host, port = self.server.server_address[:2]
+        return f"http://{host}:{port}/v1"
+
+    def start(self):
+        threading.Thread(target=self.server.serve_forever, name="fake-openai", daemon=True).start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def reset_calls(self):
+        with self.lock:
+            self.calls = 0
+            self.prompts = []
+
+    def _complete(self, body):
+        prompt = body['messages'][-1]['content']
+        with self.lock:
+            self.calls += 1
+            self.prompts.append(prompt)
+            number = self.calls
+        if self.latency:
+            time.sleep(self.latency)
+        return {
+            'id': f"chatcmpl-fake{number}",
+            'object': 'chat.completion',
+            'created': int(time.time()),
+            'model': body.get('model', 'fake'),
+            'choices': [{
+                'index': 0,
+                'finish_reason': 'stop',
+                'message': {'role': 'assistant', 'content': f"Resposta simulada #{number} ({len(prompt)} caracteres)"}
+            }],
+            'usage': {'prompt_tokens': len(prompt) // 4, 'completion_tokens': 8, 'total_tokens': len(prompt) // 4 + 8}
+        }
+
+    def _handler(self):
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1' # Keep-alive, como a API real
+
+            def do_POST(self):
+                length = int(self.headers.get('Content-Length') or 0)
+                body = json.loads(self.rfile.read(length) or b'{}')
+                if not self.path.endswith('/chat/completions'):
+                    self._send(404, {'error': {'message': f"Rota não simulada: {self.path}"}})
+                    return
+                self._send(200, stub._complete(body))
+
+            def _send(self, status, payload):
+                data = json.dumps(payload).encode()
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def log_message(self, *args):
+                pass # Sem log por requisição
+
+        return Handler
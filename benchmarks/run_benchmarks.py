@@ -0,0 +1,248 @@
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+
+# Benchmarks do robô com a FakeExchange: process_data, um ciclo completo do
+# bot_loop, /api/status e gravação no diário de trades, em 10/100/500 pares, e o
+# chat do Telegram contra um endpoint OpenAI local (fake_openai.py).
+#
+# Uso (na raiz do projeto):
+#   python benchmarks/run_benchmarks.py                  # roda e compara com o baseline
+#   python benchmarks/run_benchmarks.py --save-baseline  # grava o resultado como novo baseline
+#   python benchmarks/run_benchmarks.py --pairs 10,100 --latency-ms 5
+#   python benchmarks/run_benchmarks.py --shards 4 --output sharded.json  # modo BOT_SHARD_WORKERS
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.dirname(BENCH_DIR)
+BASELINE_FILE = os.path.join(BENCH_DIR, 'baseline.json')
+
+sys.path.insert(0, ROOT)
+sys.path.insert(0, BENCH_DIR)
+
+from fake_exchange import FakeExchange
+from fake_openai import FakeOpenAI
+
+def percentile(samples, pct):
+    ordered = sorted(samples)
+    if not ordered:
+        return 0.0
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+def timed(fn, repeat):
+    """Latências (ms) de `repeat` chamadas"""
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - started) * 1000)
+    return samples
+
+def peak_memory_kb(fn):
+    """Pico de memória alocada pelo Python durante uma chamada"""
+    tracemalloc.start()
+    try:
+        fn()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return peak / 1024
+
+def result(samples, memory_kb=None, requests=None):
+    data = {
+        'p50_ms': round(percentile(samples, 50), 3),
+        'p99_ms': round(percentile(samples, 99), 3),
+        'samples': len(samples)
+    }
+    if memory_kb is not None:
+        data['peak_memory_kb'] = round(memory_kb, 1)
+    if requests is not None:
+        data['requests_per_cycle'] = requests
+    return data
+
+def make_pairs(count):
+    return [f"C{i:03d}/USDT" for i in range(count)]
+
+def load_server():
+    # Importa o servidor num diretório temporário (config, trades.db etc.) e sem threads
+    os.environ["BOT_BACKGROUND_THREADS"] = "0"
+    os.chdir(tempfile.mkdtemp(prefix="bench_"))
+    import server
+    return server
+
+def install_exchange(server, fake, pairs):
+    server.bot_state.update(api_key='bench', secret_key='bench', is_live=False,
+                            pairs=pairs, running=True, stream_mode=False)
+    # Mesmo caminho do get_exchange: cliente envolvido pela instrumentação
+    server.exchange_session.update(client=server.metrics.instrument(fake), key=('bench', 'bench', False), markets_loaded_at=time.time())
+    server.USER_DATA_STREAM = False # Sem rede: o saldo vem do cache + reconciliação
+    server.balance_cache.mark_stale()
+    server.candle_store.clear()
+    server.indicator_engines.clear()
+    server.timeframe_engines.clear()
+    server.timeframe_indicators.clear()
+    server.market_data.clear()
+
+def bench_pairs(server, count, latency, cycles, shards=0):
+    pairs = make_pairs(count)
+    fake = FakeExchange(pairs, latency=latency)
+    install_exchange(server, fake, pairs)
+    # Shards criam a própria FakeExchange (as requisições deles não entram em requests_per_cycle)
+    server.SHARD_WORKERS = shards
+    server.shard_exchange_factory = lambda: (FakeExchange, (pairs, latency))
+    results = {}
+
+    # process_data: primeira chamada semeia o buffer, depois mede a incremental
+    for symbol in pairs:
+        server.process_data(fake, symbol)
+    samples = []
+    for symbol in pairs:
+        samples += timed(lambda: server.process_data(fake, symbol), 1)
+    results['process_data'] = result(samples)
+
+    # Ciclo completo (saldo + cotações + candles + decisões)
+    fake.reset_calls()
+    samples = timed(server.run_cycle, cycles)
+    requests = round(sum(fake.calls.values()) / cycles, 1)
+    memory = peak_memory_kb(server.run_cycle)
+    results['bot_cycle'] = result(samples, memory, requests)
+
+    # /api/status com o market_data desse tamanho
+    client = server.app.test_client()
+    results['api_status'] = result(timed(lambda: client.get('/api/status'), 200))
+
+    # /api/status com o snapshot sujo (ex.: chegou um log novo)
+    def dirty_status():
+        server.status_snapshot.mark_dirty()
+        client.get('/api/status')
+    results['api_status_rebuild'] = result(timed(dirty_status, 100))
+    return results
+
+def bench_journal(server, history):
+    journal = server.trade_journal
+    start = datetime(2024, 1, 1)
+
+    def trade(i):
+        return {
+            'symbol': f"C{i % 50:03d}/USDT", 'type': 'SELL', 'buy_price': 100.0, 'sell_price': 101.0,
+            'amount': 0.11, 'profit_usdt': 0.11, 'profit_pct': 1.0, 'reason': 'Take Profit (+2%)',
+            'timestamp': (start + timedelta(minutes=i)).strftime('%Y-%m-%d %H:%M:%S')
+        }
+
+    with journal.lock, journal.conn:
+        journal.conn.executemany(
+            "INSERT INTO trades (timestamp, symbol, profit_usdt, data) VALUES (?, ?, ?, ?)",
+            [journal._row(trade(i)) for i in range(history)]
+        )
+    counter = iter(range(history, history * 2))
+    results = {'append': result(timed(lambda: server.save_trade(trade(next(counter))), 500))}
+    results['recent_15'] = result(timed(lambda: server.load_trades(limit=15), 200))
+    return results
+
+def bench_chat(server, chats, burst, latency):
+    """Rajadas de `burst` mensagens em `chats` conversas ao mesmo tempo: latência até
+    a resposta e chamadas ao LLM por rodada (agrupamento por chat)"""
+    stub = FakeOpenAI(latency=latency).start()
+    os.environ["OPENAI_BASE_URL"] = stub.base_url
+    server.bot_state["openai_key"] = 'bench'
+    server.openai_session.update(client=None, key=None)
+    lock = server.threading.Lock()
+    samples = []
+
+    def reply(message, text):
+        done = time.perf_counter()
+        with lock:
+            samples.extend((done - sent) * 1000 for sent in message)
+
+    rounds = 3
+    pool = server.ChatWorkerPool(server.answer_chat, reply, max_workers=4, max_pending=chats * burst, coalesce_window=0.05)
+    for _ in range(rounds):
+        sent = {chat: [] for chat in range(chats)}
+        for _ in range(burst):
+            for chat in range(chats):
+                sent[chat].append(time.perf_counter())
+                # message = lista de envios: o reply mede todas as mensagens agrupadas
+                pool.submit(chat, sent[chat], "como estão as operações?")
+            time.sleep(0.01)
+        pool.wait(timeout=60)
+    stub.stop()
+    return {'burst': result(samples, requests=round(stub.calls / rounds, 1))}
+
+def compare(current, baseline, tolerance, min_delta_ms=1.0):
+    """Lista de métricas que pioraram além da tolerância (e de min_delta_ms, para
+    que ruído em medições abaixo de 1 ms não vire regressão)"""
+    regressions = []
+    for group, benches in current.items():
+        for bench, metrics in benches.items():
+            base = baseline.get(group, {}).get(bench, {})
+            for metric in ('p50_ms', 'p99_ms', 'requests_per_cycle'):
+                if metric in metrics and base.get(metric):
+                    floor = min_delta_ms if metric.endswith('_ms') else 0
+                    if metrics[metric] - base[metric] > max(base[metric] * tolerance, floor):
+                        regressions.append(f"{group}/{bench}/{metric}: {base[metric]} -> {metrics[metric]}")
+    return regressions
+
+def print_table(results):
+    print(f"{'Grupo':<14} {'Benchmark':<20} {'p50 ms':>9} {'p99 ms':>9} {'Mem KB':>9} {'Req/ciclo':>10}")
+    for group, benches in results.items():
+        for bench, m in benches.items():
+            print(f"{group:<14} {bench:<20} {m['p50_ms']:>9.2f} {m['p99_ms']:>9.2f} "
+                  f"{m.get('peak_memory_kb', ''):>9} {m.get('requests_per_cycle', ''):>10}")
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmarks do robô com exchange simulada")
+    parser.add_argument('--pairs', default='10,100,500', help="Tamanhos da lista de pares")
+    parser.add_argument('--latency-ms', type=float, default=20.0, help="Latência simulada por requisição")
+    parser.add_argument('--cycles', type=int, default=5, help="Ciclos medidos por tamanho")
+    parser.add_argument('--history', type=int, default=10000, help="Trades já gravados no diário")
+    parser.add_argument('--chats', type=int, default=8, help="Conversas simultâneas no benchmark do chat")
+    parser.add_argument('--chat-latency-ms', type=float, default=200.0, help="Latência simulada do LLM")
+    parser.add_argument('--shards', type=int, default=0, help="Processos shard (0 = modo de um processo)")
+    parser.add_argument('--tolerance', type=float, default=0.25, help="Piora aceita antes de acusar regressão")
+    parser.add_argument('--min-delta-ms', type=float, default=1.0, help="Diferença mínima (ms) para acusar regressão")
+    parser.add_argument('--save-baseline', action='store_true')
+    parser.add_argument('--output', help="Grava o resultado em JSON")
+    args = parser.parse_args()
+
+    server = load_server()
+    results = {}
+    for count in [int(c) for c in args.pairs.split(',')]:
+        print(f"Rodando {count} pares...")
+        results[f"pairs_{count}"] = bench_pairs(server, count, args.latency_ms / 1000, args.cycles, args.shards)
+    server.stop_shard_pool()
+    print(f"Rodando diário com {args.history} trades...")
+    results[f"journal_{args.history}"] = bench_journal(server, args.history)
+    print(f"Rodando chat com {args.chats} conversas...")
+    results[f"chat_{args.chats}"] = bench_chat(server, args.chats, 3, args.chat_latency_ms / 1000)
+
+    print()
+    print_table(results)
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=4)
+
+    if args.save_baseline:
+        with open(BASELINE_FILE, 'w') as f:
+            json.dump(results, f, indent=4)
+        print(f"\nBaseline salvo em {BASELINE_FILE}")
+        return
+
+    if os.path.exists(BASELINE_FILE):
+        with open(BASELINE_FILE, 'r') as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline, args.tolerance, args.min_delta_ms)
+        if regressions:
+            print("\n⚠️ Regressões em relação ao baseline:")
+            for line in regressions:
+                print(f"  - {line}")
+            sys.exit(1)
+        print("\nSem regressões em relação ao baseline.")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,215 @@
+import threading
+import time
+import numpy as np
+
+# Colunas na mesma ordem retornada pelo fetch_ohlcv do ccxt
+CANDLE_COLUMNS = ['timestamp', 'open', 'high', 'low', 'close', 'volume']
+TIMESTAMP, OPEN, HIGH, LOW, CLOSE, VOLUME = range(6)
+
+class CandleBuffer:
+    """Buffer circular de candles de um par, em memória NumPy de tamanho fixo.
+
+    Cada candle é gravado duas vezes (posição i e i + size), assim a janela
+    cronológica é sempre uma fatia contígua do array, sem cópia nem realocação.
+    """
+
+    def __init__(self, size=50):
+        self.size = size
+        self.data = np.zeros((size * 2, len(CANDLE_COLUMNS)), dtype=np.float64)
+        self.head = 0  # Próxima posição de escrita
+        self.count = 0
+
+    @property
+    def last_timestamp(self):
+        if self.count == 0:
+            return None
+        return int(self.data[(self.head - 1) % self.size, TIMESTAMP])
+
+    def _write(self, index, candle):
+        self.data[index] = candle
+        self.data[index + self.size] = candle
+
+    def extend(self, ohlcv):
+        """Adiciona candles novos e atualiza o último (ainda em formação).
+        Retorna quantos candles novos entraram no buffer."""
+        added = 0
+        for candle in ohlcv:
+            last_ts = self.last_timestamp
+            ts = candle[TIMESTAMP]
+            if last_ts is not None and ts < last_ts:
+                continue  # Candle antigo, já está no buffer
+            if last_ts is not None and ts == last_ts:
+                # Mesmo candle: a exchange enviou a versão mais recente
+                self._write((self.head - 1) % self.size, candle)
+                continue
+            self._write(self.head, candle)
+            self.head = (self.head + 1) % self.size
+            self.count = min(self.count + 1, self.size)
+            added += 1
+        return added
+
+    def window(self):
+        """Visão (sem cópia) dos candles em ordem cronológica, shape (count, 6)"""
+        if self.count < self.size:
+            return self.data[:self.count]
+        return self.data[self.head:self.head + self.size]
+
+    def closes(self):
+        return self.window()[:, CLOSE]
+
+    def clear(self):
+        self.head = 0
+        self.count = 0
+
+def timeframe_seconds(timeframe):
+    """'5m' -> 300, '1h' -> 3600 (mesma regra do ccxt.Exchange.parse_timeframe)"""
+    units = {'s': 1, 'm': 60, 'h': 3600, 'd': 86400, 'w': 604800}
+    return int(timeframe[:-1]) * units[timeframe[-1]]
+
+class ResampledFrame:
+    """Candles de um timeframe maior montados a partir de candles de 1m.
+
+    O candle do período atual é reescrito a cada minuto (mesmo timestamp, como o
+    candle em formação do fetch_ohlcv). Os minutos já fechados do período ficam
+    somados em `closed`, então atualizar o minuto em formação não conta o volume
+    duas vezes.
+    """
+
+    def __init__(self, timeframe, size=100):
+        self.timeframe = timeframe
+        self.period_ms = timeframe_seconds(timeframe) * 1000
+        self.buffer = CandleBuffer(size)
+        self.clear()
+
+    def clear(self):
+        self.buffer.clear()
+        self.bucket = None
+        self.closed = None  # [open, high, low, close, volume] dos minutos fechados do período
+        self.minute = None  # Último candle de 1m recebido (pode estar em formação)
+
+    def feed(self, candle):
+        ts = candle[TIMESTAMP]
+        if self.minute is not None:
+            if ts < self.minute[TIMESTAMP]:
+                return # Minuto antigo, já contado
+            if ts > self.minute[TIMESTAMP] and self._bucket(self.minute[TIMESTAMP]) == self.bucket:
+                self.closed = self._merge(self.closed, self.minute) # O minuto anterior fechou
+        bucket = self._bucket(ts)
+        if bucket != self.bucket:
+            self.bucket = bucket
+            self.closed = None
+        self.minute = candle
+        merged = self._merge(self.closed, candle)
+        self.buffer.extend([[bucket] + merged])
+
+    def seed(self, candles, minutes):
+        """Semeadura: `candles` do próprio timeframe (fetch_ohlcv) para os períodos
+        anteriores e os candles de 1m a partir do primeiro período que eles cobrem
+        por inteiro. O primeiro período parcial dos candles de 1m é descartado (o
+        candle montado só com parte dos minutos distorceria os indicadores)."""
+        self.clear()
+        if not len(minutes):
+            self.buffer.extend(candles)
+            return
+        first = minutes[0][TIMESTAMP]
+        first_full = self._bucket(first) if first == self._bucket(first) else self._bucket(first) + self.period_ms
+        self.buffer.extend([list(c) for c in candles if c[TIMESTAMP] < first_full])
+        for candle in minutes:
+            if candle[TIMESTAMP] >= first_full:
+                self.feed(candle)
+
+    def _bucket(self, ts):
+        return ts // self.period_ms * self.period_ms
+
+    @staticmethod
+    def _merge(agg, candle):
+        if agg is None:
+            return [candle[OPEN], candle[HIGH], candle[LOW], candle[CLOSE], candle[VOLUME]]
+        return [agg[0], max(agg[1], candle[HIGH]), min(agg[2], candle[LOW]), candle[CLOSE], agg[4] + candle[VOLUME]]
+
+    def window(self):
+        return self.buffer.window()
+
+class CandleStore:
+    """Buffers de candles por par, semeados uma vez e depois atualizados de forma incremental.
+
+    Com higher_timeframes (ex.: ('5m', '15m', '1h')), cada candle recebido também
+    alimenta os ResampledFrame do par: os timeframes maiores saem dos mesmos
+    candles de 1m, sem fetch_ohlcv extra no dia a dia. Só a semeadura pede
+    `history` candles de cada timeframe maior (um fetch_ohlcv por timeframe),
+    então RSI e Bollinger do 1h ficam prontos logo na partida, sem horas de
+    aquecimento. seed_limit (pelo menos um período do maior timeframe) é o número
+    de candles de 1m da semeadura.
+    """
+
+    def __init__(self, size=50, timeframe='1m', higher_timeframes=(), history=100, seed_limit=None):
+        self.size = size
+        self.timeframe = timeframe
+        self.higher_timeframes = tuple(higher_timeframes)
+        self.history = history
+        # Os candles de 1m da semeadura cobrem o período em formação de cada timeframe maior
+        longest = max([timeframe_seconds(tf) // timeframe_seconds(timeframe) for tf in self.higher_timeframes] or [0])
+        self.seed_limit = max(seed_limit or size, size, longest + 1)
+        self.buffers = {}
+        self.frames = {}  # symbol -> {timeframe: ResampledFrame}
+        self.lock = threading.Lock()
+
+    def options(self):
+        """Argumentos para criar um CandleStore igual (ex.: nos processos shard)"""
+        return {'size': self.size, 'timeframe': self.timeframe, 'higher_timeframes': self.higher_timeframes,
+                'history': self.history, 'seed_limit': self.seed_limit}
+
+    def get(self, symbol):
+        with self.lock:
+            if symbol not in self.buffers:
+                self.buffers[symbol] = CandleBuffer(self.size)
+            return self.buffers[symbol]
+
+    def get_frames(self, symbol):
+        with self.lock:
+            if symbol not in self.frames:
+                self.frames[symbol] = {tf: ResampledFrame(tf, self.history) for tf in self.higher_timeframes}
+            return self.frames[symbol]
+
+    def clear(self):
+        with self.lock:
+            self.buffers = {}
+            self.frames = {}
+
+    def retain(self, symbols):
+        """Descarta os buffers de pares fora de `symbols`"""
+        with self.lock:
+            self.buffers = {s: b for s, b in self.buffers.items() if s in symbols}
+            self.frames = {s: f for s, f in self.frames.items() if s in symbols}
+
+    def feed(self, symbol, ohlcv):
+        """Candles novos (REST ou stream) para o buffer de 1m e os timeframes maiores"""
+        buffer = self.get(symbol)
+        buffer.extend(ohlcv)
+        for frame in self.get_frames(symbol).values():
+            for candle in ohlcv:
+                frame.feed(candle)
+        return buffer
+
+    def update(self, exchange, symbol):
+        """Baixa apenas os candles novos (ou o atual atualizado) desde o último timestamp.
+        Cada par deve ser atualizado por uma única thread por vez."""
+        buffer = self.get(symbol)
+        timeframe_ms = exchange.parse_timeframe(self.timeframe) * 1000
+        last_ts = buffer.last_timestamp
+
+        # Sem histórico, ou parado por mais tempo que a janela: semeia de novo
+        if last_ts is None or time.time() * 1000 - last_ts > self.size * timeframe_ms:
+            return self.seed(exchange, symbol)
+        ohlcv = exchange.fetch_ohlcv(symbol, self.timeframe, since=last_ts)
+        return self.feed(symbol, ohlcv)
+
+    def seed(self, exchange, symbol):
+        """Histórico inicial: seed_limit candles de 1m e `history` de cada timeframe maior"""
+        buffer = self.get(symbol)
+        buffer.clear()
+        ohlcv = exchange.fetch_ohlcv(symbol, self.timeframe, limit=self.seed_limit)
+        buffer.extend(ohlcv)
+        for timeframe, frame in self.get_frames(symbol).items():
+            frame.seed(exchange.fetch_ohlcv(symbol, timeframe, limit=self.history), ohlcv)
+        return buffer
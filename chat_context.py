@@ -0,0 +1,115 @@
+import json
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeout
+
+class TTLCache:
+    """Resultados de funções lentas (HTTP) guardados por `ttl` segundos.
+
+    Só uma thread busca cada chave por vez; as outras esperam o mesmo resultado.
+    Se a busca falhar, devolve o último valor conhecido (mesmo vencido).
+    """
+
+    def __init__(self, clock=time.time, max_entries=128):
+        self.clock = clock
+        self.max_entries = max_entries
+        self.lock = threading.Lock()
+        self.entries = {}  # chave -> (expira_em, valor)
+        self.key_locks = {}
+
+    def get(self, key, loader, ttl):
+        entry = self.entries.get(key)
+        if entry and entry[0] > self.clock():
+            return entry[1]
+        with self.lock:
+            key_lock = self.key_locks.setdefault(key, threading.Lock())
+        with key_lock:
+            entry = self.entries.get(key)
+            if entry and entry[0] > self.clock():
+                return entry[1] # Outra thread acabou de buscar
+            try:
+                value = loader()
+            except Exception:
+                if entry:
+                    return entry[1]
+                raise
+            with self.lock:
+                if len(self.entries) >= self.max_entries and key not in self.entries:
+                    oldest = min(self.entries, key=lambda k: self.entries[k][0])
+                    del self.entries[oldest]
+                    self.key_locks.pop(oldest, None)
+                self.entries[key] = (self.clock() + ttl, value)
+            return value
+
+class RecentTradesDigest:
+    """Últimos trades para o prompt do chat, mantidos em memória.
+
+    Carregado uma vez do diário e atualizado a cada trade salvo; o texto JSON
+    só é refeito quando algo muda.
+    """
+
+    def __init__(self, size=15):
+        self.lock = threading.Lock()
+        self.trades = deque(maxlen=size)
+        self.text = None
+
+    def load(self, trades):
+        with self.lock:
+            self.trades.clear()
+            self.trades.extend(trades)
+            self.text = None
+
+    def add(self, trade):
+        with self.lock:
+            self.trades.append(trade)
+            self.text = None
+
+    def render(self):
+        with self.lock:
+            if self.text is None:
+                self.text = json.dumps(list(self.trades), indent=2)
+            return self.text
+
+class ChatContext:
+    """Dados externos do chat (Fear & Greed e notícias) buscados em paralelo e com cache.
+
+    O índice Fear & Greed muda uma vez por dia (fng_ttl longo); as notícias
+    ficam em cache por consulta normalizada. Cada busca tem um tempo máximo:
+    estourou, a resposta segue com "Indisponível" e o cache é preenchido depois.
+    """
+
+    def __init__(self, fear_and_greed, search_news, fng_ttl=3600, news_ttl=600, timeout=6, max_workers=4):
+        self.fear_and_greed = fear_and_greed
+        self.search_news = search_news
+        self.fng_ttl = fng_ttl
+        self.news_ttl = news_ttl
+        self.timeout = timeout
+        self.cache = TTLCache()
+        self.pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="chat-context")
+
+    def fng(self):
+        return self.cache.get('fng', self.fear_and_greed, self.fng_ttl)
+
+    def news(self, query):
+        key = ('news', ' '.join(query.lower().split()))
+        return self.cache.get(key, lambda: self.search_news(query), self.news_ttl)
+
+    def prefetch(self):
+        """Aquece o cache do Fear & Greed em background (ex.: ao iniciar o chat)"""
+        self.pool.submit(self.fng)
+
+    def gather(self, query):
+        """{'fng': ..., 'news': ...} buscados ao mesmo tempo"""
+        started = time.monotonic()
+        futures = {'fng': self.pool.submit(self.fng), 'news': self.pool.submit(self.news, query)}
+        result = {}
+        for name, future in futures.items():
+            remaining = max(0.0, self.timeout - (time.monotonic() - started))
+            try:
+                result[name] = future.result(timeout=remaining)
+            except FutureTimeout:
+                result[name] = "Indisponível"
+            except Exception as e:
+                result[name] = f"Indisponível ({e})"
+        return result
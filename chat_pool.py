@@ -0,0 +1,113 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+class ChatWorkerPool:
+    """Respostas do chat do Telegram em paralelo, sem uma conversa travar as outras.
+
+    - Cada chat é atendido por no máximo um worker por vez, então as respostas
+      saem na ordem das perguntas; chats diferentes rodam em paralelo.
+    - Mensagens que chegam dentro de `coalesce_window` (ou enquanto a resposta
+      anterior é gerada) viram uma única chamada ao LLM.
+    - Backpressure: com `max_pending` mensagens esperando, submit() recusa.
+    - Mensagens que esperaram mais que `max_wait` são descartadas com aviso.
+
+    answer(chat_id, texts) gera o texto da resposta e reply(message, text)
+    envia; ambos rodam na thread do worker.
+    """
+
+    def __init__(self, answer, reply, max_workers=4, max_pending=20, coalesce_window=1.5,
+                 max_wait=120, on_error=None, metrics=None):
+        self.answer = answer
+        self.reply = reply
+        self.coalesce_window = coalesce_window
+        self.max_pending = max_pending
+        self.max_wait = max_wait
+        self.on_error = on_error
+        self.metrics = metrics
+        self.pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="chat")
+        self.lock = threading.Lock()
+        self.chats = {}  # chat_id -> lista de (recebida_em, message, texto) aguardando
+        self.active = set()  # chats com um worker agendado ou rodando
+        self.pending = 0
+        self.rejected = 0
+        self.completions = 0
+
+    def submit(self, chat_id, message, text):
+        """Enfileira a mensagem; False se a fila está cheia (avise o usuário)"""
+        with self.lock:
+            if self.pending >= self.max_pending:
+                self.rejected += 1
+                return False
+            self.chats.setdefault(chat_id, []).append((time.monotonic(), message, text))
+            self.pending += 1
+            if chat_id in self.active:
+                return True # O worker deste chat pega a mensagem ao terminar a atual
+            self.active.add(chat_id)
+        self.pool.submit(self._drain, chat_id)
+        return True
+
+    def idle(self):
+        with self.lock:
+            return not self.active
+
+    def wait(self, timeout=None):
+        """Espera todas as conversas terminarem (testes / desligamento)"""
+        deadline = time.monotonic() + timeout if timeout is not None else None
+        while not self.idle():
+            if deadline is not None and time.monotonic() > deadline:
+                return False
+            time.sleep(0.02)
+        return True
+
+    def _drain(self, chat_id):
+        try:
+            # Janela curta para juntar a rajada de mensagens seguidas
+            with self.lock:
+                first = self.chats[chat_id][0][0]
+            delay = first + self.coalesce_window - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+            while True:
+                with self.lock:
+                    batch = self.chats.pop(chat_id, [])
+                    self.pending -= len(batch)
+                    if not batch:
+                        self.active.discard(chat_id)
+                        return
+                self._process(chat_id, batch)
+        except Exception as e:
+            with self.lock:
+                self.pending -= len(self.chats.pop(chat_id, []))
+                self.active.discard(chat_id)
+            self._error(e)
+
+    def _process(self, chat_id, batch):
+        now = time.monotonic()
+        last_message = batch[-1][1]
+        fresh = [text for received, _, text in batch if now - received <= self.max_wait]
+        if not fresh:
+            self._reply(last_message, "⌛ Sua mensagem esperou demais na fila. Pode mandar de novo?")
+            return
+        started = time.perf_counter()
+        try:
+            text = self.answer(chat_id, fresh)
+            self.completions += 1
+        except Exception as e:
+            self._error(e)
+            text = f"😵 Ocorreu um erro ao processar sua mensagem: {e}"
+        if self.metrics:
+            self.metrics.observe('chat', time.perf_counter() - started)
+        self._reply(last_message, text)
+
+    def _reply(self, message, text):
+        try:
+            self.reply(message, text)
+        except Exception as e:
+            self._error(e)
+
+    def _error(self, e):
+        if self.metrics:
+            self.metrics.count_error('chat')
+        if self.on_error:
+            self.on_error(e)
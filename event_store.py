@@ -0,0 +1,116 @@
+import json
+import os
+import threading
+import time
+from collections import deque
+
+class EventStore:
+    """Logs e notificações com IDs sequenciais, memória limitada e histórico em disco.
+
+    - Os últimos `capacity` eventos ficam num ring buffer (deque com maxlen):
+      inserir é O(1) e a memória não cresce com o tempo de execução.
+    - Todo evento também é gravado como uma linha JSON em `path`; acima de
+      `max_bytes` o arquivo é rotacionado (path.1 ... path.N, o mais antigo sai).
+    - since(after) devolve só o que é mais novo que o cursor, lendo do disco
+      apenas quando o cursor é mais antigo que a memória.
+    - Os IDs continuam de onde pararam após reiniciar (lidos do arquivo).
+    """
+
+    def __init__(self, path='events.jsonl', capacity=500, max_bytes=2 * 1024 * 1024, backups=3):
+        self.path = path
+        self.capacity = capacity
+        self.max_bytes = max_bytes
+        self.backups = backups
+        self.lock = threading.Lock()
+        self.events = deque(maxlen=capacity)
+        self.last_id = 0
+        self.file = None
+        if path:
+            for history in self._history_paths():
+                self.events.extend(self._read_file(history))
+            if self.events:
+                self.last_id = self.events[-1]['id']
+            self.file = open(path, 'a', encoding='utf-8')
+
+    def append(self, kind, data):
+        with self.lock:
+            self.last_id += 1
+            event = {'id': self.last_id, 'kind': kind, 'time': time.time(), 'data': data}
+            self.events.append(event)
+            if self.file:
+                try:
+                    self.file.write(json.dumps(event, ensure_ascii=False) + '\n')
+                    self.file.flush()
+                    if self.file.tell() >= self.max_bytes:
+                        self._rotate()
+                except OSError as e:
+                    print(f"Erro ao gravar evento em {self.path}: {e}")
+            return event
+
+    def recent(self, kind=None, limit=50):
+        """Últimos eventos em memória (mais antigo primeiro)"""
+        with self.lock:
+            events = list(self.events)
+        if kind:
+            events = [e for e in events if e['kind'] == kind]
+        return events[-limit:] if limit else events
+
+    def since(self, after=0, kind=None, limit=200):
+        """Eventos com id > after (mais antigo primeiro), no máximo `limit`"""
+        with self.lock:
+            events = list(self.events)
+        oldest = events[0]['id'] if events else self.last_id + 1
+        if after + 1 < oldest and self.path:
+            # Cursor anterior à memória: o começo vem dos arquivos em disco
+            result = []
+            for event in self._read_history(after, oldest):
+                if not kind or event['kind'] == kind:
+                    result.append(event)
+                    if len(result) >= limit:
+                        return result
+        else:
+            result = []
+        for event in events:
+            if event['id'] > after and (not kind or event['kind'] == kind):
+                result.append(event)
+                if len(result) >= limit:
+                    break
+        return result
+
+    def close(self):
+        with self.lock:
+            if self.file:
+                self.file.close()
+                self.file = None
+
+    def _rotate(self):
+        self.file.close()
+        for index in range(self.backups, 0, -1):
+            source = self.path if index == 1 else f"{self.path}.{index - 1}"
+            if os.path.exists(source):
+                os.replace(source, f"{self.path}.{index}")
+        self.file = open(self.path, 'a', encoding='utf-8')
+
+    def _read_history(self, after, before):
+        """Eventos com after < id < before, do arquivo mais antigo para o mais novo"""
+        for path in self._history_paths():
+            for event in self._read_file(path):
+                if event['id'] >= before:
+                    return
+                if event['id'] > after:
+                    yield event
+
+    def _history_paths(self):
+        return [f"{self.path}.{index}" for index in range(self.backups, 0, -1)] + [self.path]
+
+    def _read_file(self, path):
+        try:
+            f = open(path, 'r', encoding='utf-8')
+        except OSError:
+            return # Ainda não existe (ou acabou de ser rotacionado)
+        with f:
+            for line in f:
+                try:
+                    yield json.loads(line)
+                except ValueError:
+                    continue # Linha cortada por queda no meio da gravação
@@ -0,0 +1,136 @@
+import itertools
+import threading
+import time
+import ccxt
+from concurrent.futures import ThreadPoolExecutor
+
+# Execução de ordens a mercado com ID próprio (clientOrderId) e leitura do
+# preenchimento real: preço médio, quantidade executada e taxa.
+
+CLIENT_ORDER_PREFIX = "mcb"  # Identifica as ordens do robô na conta
+_sequence = itertools.count(1)
+
+def client_order_id(symbol, side):
+    """ID único por ordem (Binance aceita até 36 caracteres [A-Za-z0-9_-])"""
+    base = symbol.split('/')[0][:8]
+    return f"{CLIENT_ORDER_PREFIX}{side[0]}{base}{int(time.time() * 1000)}{next(_sequence) % 1000:03d}"
+
+def parse_fill(order, symbol):
+    """Resumo do preenchimento de uma ordem ccxt. Taxa convertida para a moeda de cotação
+    quando vem em USDT ou na própria moeda; em outra moeda (ex.: BNB) fica só registrada."""
+    base, quote = symbol.split('/')
+    filled = float(order.get('filled') or 0.0)
+    cost = float(order.get('cost') or 0.0)
+    average = order.get('average') or (cost / filled if filled else order.get('price'))
+    average = float(average or 0.0)
+    if not cost:
+        cost = average * filled
+
+    fee_quote = 0.0
+    fee_base = 0.0
+    fees = order.get('fees') or ([order['fee']] if order.get('fee') else [])
+    for fee in fees:
+        if not fee or fee.get('cost') is None:
+            continue
+        if fee.get('currency') == quote:
+            fee_quote += float(fee['cost'])
+        elif fee.get('currency') == base:
+            fee_base += float(fee['cost'])
+    return {
+        'order_id': order.get('id'),
+        'client_order_id': order.get('clientOrderId'),
+        'status': order.get('status'),
+        'price': average,
+        'filled': filled,
+        'cost': cost,
+        'fee_quote': fee_quote,
+        'fee_base': fee_base,
+        'fee_usdt': fee_quote + fee_base * average,
+        'fees': fees
+    }
+
+class OrderExecutor:
+    """Envia ordens a mercado em paralelo, sem travar o ciclo do robô.
+
+    submit() retorna na hora; on_done(fill, None) ou on_done(None, erro) é chamado
+    na thread do pool. Falha de rede no envio não gera ordem duplicada: a ordem é
+    procurada pelo clientOrderId antes de reenviar com o mesmo ID.
+    """
+
+    def __init__(self, max_workers=4, retries=2, metrics=None):
+        self.pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="order")
+        self.retries = retries
+        self.metrics = metrics
+        self.lock = threading.Lock()
+        self.pending = {}  # symbol -> Future
+
+    def is_pending(self, symbol):
+        with self.lock:
+            return symbol in self.pending
+
+    def submit(self, exchange, symbol, side, amount, on_done):
+        with self.lock:
+            if symbol in self.pending:
+                return None
+            future = self.pool.submit(self._run, exchange, symbol, side, amount, on_done)
+            self.pending[symbol] = future
+            return future
+
+    def wait(self, timeout=None):
+        """Espera as ordens em andamento (testes / desligamento)"""
+        with self.lock:
+            futures = list(self.pending.values())
+        for future in futures:
+            future.exception(timeout=timeout)
+
+    def _run(self, exchange, symbol, side, amount, on_done):
+        try:
+            try:
+                fill = self.execute(exchange, symbol, side, amount)
+            except Exception as e:
+                if self.metrics:
+                    self.metrics.count_error('order')
+                on_done(None, e)
+                return
+            on_done(fill, None)
+        finally:
+            with self.lock:
+                self.pending.pop(symbol, None)
+
+    def execute(self, exchange, symbol, side, amount):
+        """Envia a ordem e devolve o preenchimento (parse_fill), bloqueando esta thread"""
+        cid = client_order_id(symbol, side)
+        params = {'newClientOrderId': cid}
+        create = exchange.create_market_buy_order if side == 'buy' else exchange.create_market_sell_order
+        started = time.perf_counter()
+        attempt = 0
+        while True:
+            try:
+                order = create(symbol, amount, params)
+                break
+            except (ccxt.NetworkError, ccxt.DuplicateOrderId) as e:
+                # A ordem pode ter chegado à exchange: procura pelo nosso ID
+                order = self.lookup(exchange, symbol, cid)
+                if order is not None:
+                    break
+                attempt += 1
+                if attempt > self.retries or isinstance(e, ccxt.DuplicateOrderId):
+                    raise
+                time.sleep(0.5 * attempt)
+
+        # Resposta sem o preenchimento (ex.: ordem ainda NEW): consulta a ordem
+        if not order.get('filled') and order.get('status') != 'canceled':
+            order = self.lookup(exchange, symbol, cid) or order
+        if self.metrics:
+            self.metrics.observe('order', time.perf_counter() - started)
+        fill = parse_fill(order, symbol)
+        fill['client_order_id'] = fill['client_order_id'] or cid
+        fill['side'] = side
+        fill['requested'] = float(amount)
+        return fill
+
+    def lookup(self, exchange, symbol, cid):
+        try:
+            return exchange.fetch_order(None, symbol, {'origClientOrderId': cid})
+        except Exception:
+            return None # OrderNotFound ou falha de rede: trata como não encontrada
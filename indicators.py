@@ -0,0 +1,213 @@
+import math
+from collections import deque
+import numpy as np
+import pandas as pd
+
+from candles import TIMESTAMP, CLOSE
+
+# Indicadores em streaming: cada candle fechado atualiza o estado em O(1).
+# As fórmulas seguem o pandas_ta (rsi = rma via ewm(alpha=1/n, adjust=True),
+# bbands = sma +- k * desvio padrão populacional), então os valores batem com
+# ta.rsi / ta.bbands calculados sobre a mesma série (tests/test_indicators.py).
+#
+# Atenção: o RSI agora usa o ewm sobre TODO o histórico do par, e não mais só os
+# 50 candles que o robô baixava por ciclo. Em dados reais isso muda o RSI em até
+# ~0,9 ponto, o que desloca um pouco os sinais perto de rsi_buy / rsi_sell.
+
+class StreamingRSI:
+    """RSI de Wilder incremental"""
+
+    def __init__(self, length=14):
+        self.length = length
+        self.decay = 1.0 - 1.0 / length
+        self.reset()
+
+    def reset(self):
+        # (último fechamento, soma ponderada das altas, soma ponderada das baixas, amostras)
+        # Os pesos do ewm se cancelam na razão altas / (altas + baixas)
+        self.state = (None, 0.0, 0.0, 0)
+
+    def _step(self, state, close):
+        prev_close, gain_sum, loss_sum, samples = state
+        if prev_close is None:
+            return (close, gain_sum, loss_sum, samples)
+        change = close - prev_close
+        gain_sum = gain_sum * self.decay + max(change, 0.0)
+        loss_sum = loss_sum * self.decay + max(-change, 0.0)
+        return (close, gain_sum, loss_sum, samples + 1)
+
+    def _value(self, state):
+        _, gain_sum, loss_sum, samples = state
+        if samples < self.length:
+            return None
+        if gain_sum + loss_sum == 0:
+            return 50.0  # Mercado parado: neutro
+        return 100.0 * gain_sum / (gain_sum + loss_sum)
+
+    def update(self, close):
+        self.state = self._step(self.state, close)
+        return self.value
+
+    def peek(self, close):
+        """Valor 'e se': RSI caso o candle em formação fechasse neste preço"""
+        return self._value(self._step(self.state, close))
+
+    @property
+    def value(self):
+        return self._value(self.state)
+
+class StreamingBollinger:
+    """Bandas de Bollinger incrementais (média móvel simples e desvio populacional)"""
+
+    def __init__(self, length=20, std=2.0):
+        self.length = length
+        self.std = std
+        self.reset()
+
+    def reset(self):
+        self.window = deque(maxlen=self.length)
+        self.total = 0.0
+        self.total_sq = 0.0
+        self.updates = 0
+
+    def _bands(self, total, total_sq):
+        mean = total / self.length
+        variance = max(total_sq / self.length - mean * mean, 0.0)
+        deviation = math.sqrt(variance)
+        return mean - self.std * deviation, mean, mean + self.std * deviation
+
+    def update(self, close):
+        if len(self.window) == self.length:
+            oldest = self.window[0]
+            self.total -= oldest
+            self.total_sq -= oldest * oldest
+        self.window.append(close)
+        self.total += close
+        self.total_sq += close * close
+
+        # Recalcula as somas a cada janela completa para não acumular erro de arredondamento
+        self.updates += 1
+        if self.updates % self.length == 0:
+            self.total = math.fsum(self.window)
+            self.total_sq = math.fsum(c * c for c in self.window)
+        return self.value
+
+    def peek(self, close):
+        """Bandas 'e se' o candle em formação fechasse neste preço: (inferior, média, superior)"""
+        if len(self.window) < self.length - 1:
+            return None
+        total, total_sq = self.total + close, self.total_sq + close * close
+        if len(self.window) == self.length:
+            oldest = self.window[0]
+            total -= oldest
+            total_sq -= oldest * oldest
+        return self._bands(total, total_sq)
+
+    @property
+    def value(self):
+        if len(self.window) < self.length:
+            return None
+        return self._bands(self.total, self.total_sq)
+
+class IndicatorEngine:
+    """RSI(14) e Bollinger(20, 2) de um par, alimentados pelos candles fechados do buffer"""
+
+    def __init__(self, rsi_length=14, bb_length=20, bb_std=2.0):
+        self.key = (rsi_length, bb_length, bb_std)
+        self.rsi = StreamingRSI(rsi_length)
+        self.bbands = StreamingBollinger(bb_length, bb_std)
+        self.last_closed_ts = None
+
+    def reset(self):
+        self.rsi.reset()
+        self.bbands.reset()
+        self.last_closed_ts = None
+
+    def update(self, close, timestamp=None):
+        self.rsi.update(close)
+        self.bbands.update(close)
+        self.last_closed_ts = timestamp
+
+    def sync(self, window):
+        """Consome os candles fechados da janela (todos menos o último, em formação)
+        que ainda não entraram no estado"""
+        if len(window) == 0:
+            return
+        timestamps = window[:, TIMESTAMP]
+        # Buffer foi semeado de novo (buraco no histórico): recomeça do zero
+        if self.last_closed_ts is not None and not np.any(timestamps == self.last_closed_ts):
+            self.reset()
+        for candle in window[:-1]:
+            if self.last_closed_ts is None or candle[TIMESTAMP] > self.last_closed_ts:
+                self.update(candle[CLOSE], candle[TIMESTAMP])
+
+    def peek(self, close):
+        """(rsi, banda inferior, banda superior) para o candle em formação no preço dado"""
+        rsi = self.rsi.peek(close)
+        bands = self.bbands.peek(close)
+        lower_band, upper_band = (bands[0], bands[2]) if bands else (None, None)
+        return rsi, lower_band, upper_band
+
+    def closed(self):
+        """(rsi, banda inferior, banda superior) só com os candles fechados (não muda
+        dentro do período; usado na confirmação por timeframes maiores)"""
+        bands = self.bbands.value
+        lower_band, upper_band = (bands[0], bands[2]) if bands else (None, None)
+        return self.rsi.value, lower_band, upper_band
+
+def sync_timeframes(engines, frames, key):
+    """{timeframe: {'rsi', 'lower_band', 'upper_band'}} dos candles fechados de cada
+    timeframe maior. engines: {timeframe: IndicatorEngine} do par (recriados se o
+    perfil mudar); frames: candles.ResampledFrame por timeframe."""
+    result = {}
+    for timeframe, frame in frames.items():
+        engine = engines.get(timeframe)
+        if engine is None or engine.key != key:
+            engine = engines[timeframe] = IndicatorEngine(rsi_length=key[0], bb_length=key[1], bb_std=key[2])
+        engine.sync(frame.window())
+        rsi, lower_band, upper_band = engine.closed()
+        result[timeframe] = {'rsi': rsi, 'lower_band': lower_band, 'upper_band': upper_band}
+    return result
+
+# --- VERSÕES VETORIZADAS (série inteira, usadas pelo backtest) ---
+
+def rsi_series(close, length=14):
+    """RSI de uma série inteira, mesma fórmula do pandas_ta e do StreamingRSI"""
+    change = np.diff(np.asarray(close, dtype=np.float64))
+    gains = pd.Series(np.maximum(change, 0.0))
+    losses = pd.Series(np.maximum(-change, 0.0))
+    gain_avg = gains.ewm(alpha=1.0 / length, min_periods=length).mean().to_numpy()
+    loss_avg = losses.ewm(alpha=1.0 / length, min_periods=length).mean().to_numpy()
+    total = gain_avg + loss_avg
+    with np.errstate(invalid='ignore', divide='ignore'):
+        rsi = np.where(total > 0, 100.0 * gain_avg / total, 50.0)
+    rsi[np.isnan(gain_avg)] = np.nan
+    # O primeiro candle não tem variação
+    return np.concatenate(([np.nan], rsi))
+
+def bollinger_series(close, length=20, std=2.0):
+    """(inferior, média, superior) de uma série inteira (rolling do pandas, estável numericamente)"""
+    series = pd.Series(np.asarray(close, dtype=np.float64))
+    mid = series.rolling(length).mean().to_numpy()
+    deviation = series.rolling(length).std(ddof=0).to_numpy()
+    return mid - std * deviation, mid, mid + std * deviation
+
+def higher_timeframe_rsi(timestamps, close, timeframe_ms, length=14, base_ms=60000):
+    """RSI do timeframe maior (só períodos já fechados, como o closed() do robô)
+    alinhado a cada candle de 1m da série"""
+    timestamps = np.asarray(timestamps, dtype=np.int64)
+    buckets = timestamps // timeframe_ms * timeframe_ms
+    # Último minuto de cada período = fechamento do candle do timeframe maior
+    last = np.flatnonzero(np.append(buckets[1:] != buckets[:-1], True))
+    # Série começando no meio de um período: esse candle parcial fica de fora,
+    # como no ResampledFrame.seed do robô
+    if len(last) and timestamps[0] != buckets[0]:
+        last = last[1:]
+    rsi = rsi_series(np.asarray(close, dtype=np.float64)[last], length)
+    ends = buckets[last] + timeframe_ms
+    # Período visível no fechamento do minuto i: os que terminaram até ts[i] + 1m
+    index = np.searchsorted(ends, timestamps + base_ms, side='right') - 1
+    result = np.full(len(timestamps), np.nan)
+    valid = index >= 0
+    result[valid] = rsi[index[valid]]
+    return result
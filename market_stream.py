@@ -0,0 +1,102 @@
+import json
+import threading
+from websockets.exceptions import ConnectionClosedOK
+from websockets.sync.client import connect
+
+# Streams públicos da Binance (klines + ticker), no formato de stream combinado
+BINANCE_STREAM_URL = "wss://stream.binance.com:9443"
+BINANCE_TESTNET_STREAM_URL = "wss://stream.testnet.binance.vision"
+
+def stream_name(symbol):
+    """'BTC/USDT' -> 'btcusdt'"""
+    return symbol.replace('/', '').lower()
+
+def parse_kline(kline):
+    """Kline da Binance -> candle no formato do fetch_ohlcv"""
+    return [
+        kline['t'],
+        float(kline['o']),
+        float(kline['h']),
+        float(kline['l']),
+        float(kline['c']),
+        float(kline['v'])
+    ]
+
+class MarketStream:
+    """Assina os streams de kline e ticker dos pares e chama on_event(symbol, kind, payload)
+    a cada mensagem recebida, numa thread própria com reconexão automática.
+
+    kind é 'kline' (payload = candle [ts, o, h, l, c, v] e 'closed') ou 'ticker'
+    (payload = {'price': último preço}).
+    """
+
+    def __init__(self, base_url, pairs, on_event, on_error=None, timeframe='1m'):
+        self.base_url = base_url.rstrip('/')
+        self.pairs = list(pairs)
+        self.timeframe = timeframe
+        self.on_event = on_event
+        self.on_error = on_error
+        self.symbols = {stream_name(p): p for p in self.pairs}
+        self.stop_event = threading.Event()
+        self.thread = None
+        self.connected = False
+
+    @property
+    def url(self):
+        streams = []
+        for name in self.symbols:
+            streams.append(f"{name}@kline_{self.timeframe}")
+            streams.append(f"{name}@ticker")
+        return f"{self.base_url}/stream?streams={'/'.join(streams)}"
+
+    def start(self):
+        self.stop_event.clear()
+        self.thread = threading.Thread(target=self._run, daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        self.stop_event.set()
+        if self.thread:
+            self.thread.join(timeout=5)
+
+    @property
+    def running(self):
+        return self.thread is not None and self.thread.is_alive()
+
+    def _run(self):
+        backoff = 1
+        while not self.stop_event.is_set():
+            try:
+                with connect(self.url, open_timeout=10) as ws:
+                    self.connected = True
+                    backoff = 1
+                    while not self.stop_event.is_set():
+                        try:
+                            message = ws.recv(timeout=1)
+                        except TimeoutError:
+                            continue
+                        self._dispatch(message)
+            except ConnectionClosedOK:
+                pass  # Servidor encerrou normalmente; só reconecta
+            except Exception as e:
+                if self.on_error:
+                    self.on_error(e)
+            self.connected = False
+            # Reconecta com espera progressiva (máx. 30s)
+            self.stop_event.wait(backoff)
+            backoff = min(backoff * 2, 30)
+
+    def _dispatch(self, message):
+        data = json.loads(message).get('data', {})
+        symbol = self.symbols.get(data.get('s', '').lower())
+        if symbol is None:
+            return
+        try:
+            if data.get('e') == 'kline':
+                kline = data['k']
+                self.on_event(symbol, 'kline', {'candle': parse_kline(kline), 'closed': kline['x']})
+            elif data.get('e') == '24hrTicker':
+                self.on_event(symbol, 'ticker', {'price': float(data['c'])})
+        except Exception as e:
+            if self.on_error:
+                self.on_error(e)
@@ -0,0 +1,179 @@
+import bisect
+import threading
+import time
+from contextlib import contextmanager
+
+# Limites dos buckets dos histogramas, em segundos (formato Prometheus)
+BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+# Métodos do ccxt contados como chamadas à API
+API_METHODS = {
+    'fetch_balance', 'fetch_ticker', 'fetch_tickers', 'fetch_ohlcv', 'load_markets',
+    'create_market_buy_order', 'create_market_sell_order', 'create_order', 'fetch_order'
+}
+
+class Histogram:
+    """Contagem por bucket + soma; observe() custa um bisect e três somas"""
+
+    def __init__(self):
+        self.counts = [0] * (len(BUCKETS) + 1)
+        self.total = 0.0
+        self.count = 0
+        self.last = 0.0
+
+    def observe(self, seconds):
+        self.counts[bisect.bisect_left(BUCKETS, seconds)] += 1
+        self.total += seconds
+        self.count += 1
+        self.last = seconds
+
+    def quantile(self, q):
+        """Estimativa pelo limite superior do bucket (suficiente para o painel)"""
+        if not self.count:
+            return 0.0
+        target = q * self.count
+        seen = 0
+        for i, c in enumerate(self.counts):
+            seen += c
+            if seen >= target:
+                return BUCKETS[i] if i < len(BUCKETS) else self.last
+        return self.last
+
+class Metrics:
+    """Tempos por etapa e por par, chamadas/erros de API e duração do ciclo.
+
+    Tudo fica em memória com um único lock; o custo por medição é de alguns
+    microssegundos, então a instrumentação fica sempre ligada.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.stages = {}
+        self.symbols = {}
+        self.api = {}
+        self.api_calls = {}
+        self.api_errors = {}
+        self.errors = {}
+        self.started_at = time.time()
+
+    def observe(self, stage, seconds, symbol=None):
+        with self.lock:
+            if symbol is not None:
+                _histogram(self.symbols, symbol).observe(seconds)
+            else:
+                _histogram(self.stages, stage).observe(seconds)
+
+    @contextmanager
+    def timer(self, stage, symbol=None):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(stage, time.perf_counter() - started, symbol)
+
+    def count_call(self, method, seconds, failed=False):
+        with self.lock:
+            _histogram(self.api, method).observe(seconds)
+            self.api_calls[method] = self.api_calls.get(method, 0) + 1
+            if failed:
+                self.api_errors[method] = self.api_errors.get(method, 0) + 1
+
+    def count_error(self, stage):
+        with self.lock:
+            self.errors[stage] = self.errors.get(stage, 0) + 1
+
+    def forget_symbols(self, keep):
+        """Descarta os histogramas de pares que saíram da lista"""
+        with self.lock:
+            for symbol in [s for s in self.symbols if s not in keep]:
+                del self.symbols[symbol]
+
+    def instrument(self, exchange):
+        return InstrumentedExchange(exchange, self)
+
+    def summary(self):
+        """Resumo compacto para o dashboard (ms)"""
+        with self.lock:
+            stages = {
+                name: {
+                    'last_ms': round(h.last * 1000, 1),
+                    'avg_ms': round(h.total / h.count * 1000, 1),
+                    'p95_ms': round(h.quantile(0.95) * 1000, 1)
+                }
+                for name, h in self.stages.items()
+            }
+            slowest = sorted(self.symbols.items(), key=lambda item: item[1].last, reverse=True)[:3]
+            return {
+                'stages': stages,
+                'slowest_symbols': {s: round(h.last * 1000, 1) for s, h in slowest},
+                'api_calls': sum(self.api_calls.values()),
+                'api_errors': sum(self.api_errors.values()),
+                'errors': sum(self.errors.values())
+            }
+
+    def render_prometheus(self):
+        """Texto no formato de exposição do Prometheus"""
+        lines = []
+        with self.lock:
+            self._render_histograms(lines, 'bot_stage_duration_seconds', 'Duração das etapas do ciclo', 'stage', self.stages)
+            self._render_histograms(lines, 'bot_symbol_duration_seconds', 'Tempo de coleta e cálculo por par', 'symbol', self.symbols)
+            self._render_histograms(lines, 'bot_api_duration_seconds', 'Latência das chamadas à API da exchange', 'method', self.api)
+            self._render_counter(lines, 'bot_api_calls_total', 'Chamadas à API da exchange', 'method', self.api_calls)
+            self._render_counter(lines, 'bot_api_errors_total', 'Chamadas à API que falharam', 'method', self.api_errors)
+            self._render_counter(lines, 'bot_errors_total', 'Erros tratados por etapa', 'stage', self.errors)
+        lines.append('# HELP bot_uptime_seconds Tempo desde o início do processo')
+        lines.append('# TYPE bot_uptime_seconds gauge')
+        lines.append(f'bot_uptime_seconds {time.time() - self.started_at:.3f}')
+        return '\n'.join(lines) + '\n'
+
+    def _render_histograms(self, lines, name, help_text, label, histograms):
+        lines.append(f'# HELP {name} {help_text}')
+        lines.append(f'# TYPE {name} histogram')
+        for key, h in histograms.items():
+            value = escape_label(key)
+            cumulative = 0
+            for bound, count in zip(BUCKETS, h.counts):
+                cumulative += count
+                lines.append(f'{name}_bucket{{{label}="{value}",le="{bound}"}} {cumulative}')
+            lines.append(f'{name}_bucket{{{label}="{value}",le="+Inf"}} {h.count}')
+            lines.append(f'{name}_sum{{{label}="{value}"}} {h.total:.6f}')
+            lines.append(f'{name}_count{{{label}="{value}"}} {h.count}')
+
+    def _render_counter(self, lines, name, help_text, label, counters):
+        lines.append(f'# HELP {name} {help_text}')
+        lines.append(f'# TYPE {name} counter')
+        for key, value in counters.items():
+            lines.append(f'{name}{{{label}="{escape_label(key)}"}} {value}')
+
+def _histogram(histograms, name):
+    histogram = histograms.get(name)
+    if histogram is None:
+        histogram = histograms[name] = Histogram()
+    return histogram
+
+def escape_label(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+class InstrumentedExchange:
+    """Envolve o cliente ccxt: cada método da API é contado e cronometrado.
+    O resto (markets, amount_to_precision...) passa direto."""
+
+    def __init__(self, exchange, metrics):
+        self._exchange = exchange
+        self._metrics = metrics
+
+    def __getattr__(self, name):
+        attr = getattr(self._exchange, name)
+        if name not in API_METHODS:
+            return attr
+
+        def call(*args, **kwargs):
+            started = time.perf_counter()
+            failed = True
+            try:
+                result = attr(*args, **kwargs)
+                failed = False
+                return result
+            finally:
+                self._metrics.count_call(name, time.perf_counter() - started, failed)
+        return call
@@ -0,0 +1,142 @@
+import queue
+import threading
+import time
+import requests
+
+TELEGRAM_API_URL = "https://api.telegram.org"
+TELEGRAM_MAX_LENGTH = 4096  # Limite de caracteres por mensagem da API do Telegram
+
+class TelegramDispatcher:
+    """Envio de mensagens do Telegram fora da thread do robô.
+
+    send() só coloca a mensagem numa fila limitada e retorna na hora. Uma thread
+    em background junta as mensagens que chegam juntas (ex.: várias compras no
+    mesmo ciclo) num único envio, usando uma requests.Session (conexão
+    reaproveitada), timeout e novas tentativas com espera crescente.
+
+    credentials() é lido a cada envio e retorna (token, chat_id), para que
+    mudanças feitas pelo painel valham sem recriar o dispatcher.
+    """
+
+    def __init__(self, credentials, max_queue=200, coalesce_window=1.0, timeout=10,
+                 max_retries=4, backoff=1.0, api_url=TELEGRAM_API_URL, on_error=None, metrics=None):
+        self.credentials = credentials
+        self.queue = queue.Queue(maxsize=max_queue)
+        self.coalesce_window = coalesce_window
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.api_url = api_url.rstrip('/')
+        self.on_error = on_error
+        self.metrics = metrics
+        self.session = requests.Session()
+        self.lock = threading.Lock()
+        self.thread = None
+        self.dropped = 0
+        self.sent = 0
+
+    def send(self, message):
+        """Enfileira a mensagem; retorna False se não há Telegram configurado ou a fila está cheia"""
+        token, chat_id = self.credentials()
+        if not token or not chat_id:
+            return False
+        self._ensure_worker()
+        try:
+            self.queue.put_nowait((token, chat_id, message))
+            return True
+        except queue.Full:
+            self.dropped += 1
+            return False
+
+    def flush(self, timeout=None):
+        """Espera a fila esvaziar (testes / desligamento)"""
+        deadline = time.time() + timeout if timeout is not None else None
+        while self.queue.unfinished_tasks:
+            if deadline is not None and time.time() > deadline:
+                return False
+            time.sleep(0.05)
+        return True
+
+    def _ensure_worker(self):
+        if self.thread is not None and self.thread.is_alive():
+            return
+        with self.lock:
+            if self.thread is None or not self.thread.is_alive():
+                self.thread = threading.Thread(target=self._run, name="telegram-dispatcher", daemon=True)
+                self.thread.start()
+
+    def _run(self):
+        while True:
+            batch = [self.queue.get()]
+            # Janela curta para agrupar a rajada de mensagens do mesmo ciclo
+            deadline = time.time() + self.coalesce_window
+            while True:
+                remaining = deadline - time.time()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self.queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+            try:
+                for (token, chat_id), text in coalesce(batch):
+                    self._deliver(token, chat_id, text)
+            finally:
+                for _ in batch:
+                    self.queue.task_done()
+
+    def _deliver(self, token, chat_id, text):
+        url = f"{self.api_url}/bot{token}/sendMessage"
+        data = {"chat_id": chat_id, "text": text, "parse_mode": "Markdown"}
+        delay = self.backoff
+        for attempt in range(self.max_retries + 1):
+            try:
+                started = time.perf_counter()
+                response = self.session.post(url, json=data, timeout=self.timeout)
+                if self.metrics:
+                    self.metrics.observe('telegram', time.perf_counter() - started)
+                if response.status_code == 200:
+                    self.sent += 1
+                    return True
+                if response.status_code == 400 and "parse_mode" in data:
+                    # Markdown inválido (ex.: '_' num símbolo): manda como texto puro
+                    data.pop("parse_mode")
+                    continue
+                if response.status_code == 429:
+                    retry_after = response.json().get("parameters", {}).get("retry_after")
+                    delay = max(delay, float(retry_after or 0))
+                elif response.status_code < 500:
+                    self._error(f"Telegram respondeu {response.status_code}: {response.text[:200]}")
+                    return False
+                error = f"HTTP {response.status_code}"
+            except requests.RequestException as e:
+                error = e
+            if attempt < self.max_retries:
+                time.sleep(delay)
+                delay *= 2
+        self._error(f"Falha ao enviar após {self.max_retries + 1} tentativas: {error}")
+        return False
+
+    def _error(self, message):
+        if self.metrics:
+            self.metrics.count_error('telegram')
+        if self.on_error:
+            self.on_error(message)
+
+def coalesce(batch):
+    """Agrupa as mensagens por destino, respeitando o limite de tamanho do Telegram"""
+    grouped = {}
+    for token, chat_id, message in batch:
+        grouped.setdefault((token, chat_id), []).append(message)
+    chunks = []
+    for target, messages in grouped.items():
+        current = ""
+        for message in messages:
+            message = message[:TELEGRAM_MAX_LENGTH]
+            if current and len(current) + 2 + len(message) > TELEGRAM_MAX_LENGTH:
+                chunks.append((target, current))
+                current = ""
+            current = f"{current}\n\n{message}" if current else message
+        if current:
+            chunks.append((target, current))
+    return chunks
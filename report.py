@@ -0,0 +1,116 @@
+# Relatório periódico do Sócio Digital: os números são calculados aqui, a partir
+# do diário de trades e das posições abertas. O LLM só recebe este resumo
+# compacto para escrever o texto; sem LLM, render_template() gera a mensagem.
+
+def build_digest(trades, positions, prices, start, end, equity_start=None, equity_end=None):
+    """Estatísticas do período.
+
+    trades: vendas do diário no período (ordem cronológica, com profit_usdt).
+    positions: active_trades ({symbol: {'price', 'amount', 'cost', ...}}).
+    prices: {symbol: preço atual} para o resultado não realizado.
+    equity_*: saldo USDT + valor das moedas no início/fim do período.
+    """
+    realized = 0.0
+    fees = 0.0
+    wins = 0
+    peak = 0.0
+    max_drawdown = 0.0
+    by_symbol = {}
+    best = worst = None
+    for trade in trades:
+        profit = float(trade.get('profit_usdt', 0) or 0)
+        realized += profit
+        fees += float(trade.get('fee_usdt', 0) or 0)
+        if profit > 0:
+            wins += 1
+        # Drawdown sobre a curva do lucro realizado acumulado no período
+        peak = max(peak, realized)
+        max_drawdown = max(max_drawdown, peak - realized)
+        symbol = trade.get('symbol', '')
+        stats = by_symbol.setdefault(symbol, {'trades': 0, 'wins': 0, 'pnl': 0.0})
+        stats['trades'] += 1
+        stats['wins'] += 1 if profit > 0 else 0
+        stats['pnl'] += profit
+        if best is None or profit > best['profit_usdt']:
+            best = {'symbol': symbol, 'profit_usdt': profit, 'profit_pct': trade.get('profit_pct', 0.0)}
+        if worst is None or profit < worst['profit_usdt']:
+            worst = {'symbol': symbol, 'profit_usdt': profit, 'profit_pct': trade.get('profit_pct', 0.0)}
+
+    open_positions = []
+    unrealized = 0.0
+    for symbol, position in positions.items():
+        amount = float(position.get('amount', 0) or 0)
+        cost = float(position.get('cost') or position.get('price', 0) * amount)
+        price = prices.get(symbol)
+        value = price * amount if price else cost
+        unrealized += value - cost
+        open_positions.append({
+            'symbol': symbol,
+            'cost': cost,
+            'value': value,
+            'pnl': value - cost,
+            'pnl_pct': (value - cost) / cost * 100 if cost else 0.0
+        })
+
+    digest = {
+        'start': start.strftime('%Y-%m-%d %H:%M'),
+        'end': end.strftime('%Y-%m-%d %H:%M'),
+        'trades': len(trades),
+        'wins': wins,
+        'losses': len(trades) - wins,
+        'win_rate': wins / len(trades) * 100 if trades else 0.0,
+        'realized_pnl': realized,
+        'fees': fees,
+        'max_drawdown': max_drawdown,
+        'best': best,
+        'worst': worst,
+        'by_symbol': dict(sorted(by_symbol.items(), key=lambda item: item[1]['pnl'], reverse=True)),
+        'open_positions': open_positions,
+        'unrealized_pnl': unrealized,
+        'equity_start': equity_start,
+        'equity_end': equity_end,
+        'equity_delta': equity_end - equity_start if equity_start is not None and equity_end is not None else None
+    }
+    return digest
+
+def is_empty(digest):
+    return not digest['trades'] and not digest['open_positions']
+
+def render_digest(digest):
+    """Resumo em poucas linhas para o prompt (economiza tokens)"""
+    lines = [
+        f"Período: {digest['start']} a {digest['end']}",
+        f"Trades fechados: {digest['trades']} ({digest['wins']} ganhos, {digest['losses']} perdas, "
+        f"taxa de acerto {digest['win_rate']:.0f}%)",
+        f"Lucro realizado: ${digest['realized_pnl']:.2f} (taxas ${digest['fees']:.2f})",
+        f"Maior drawdown do lucro realizado: ${digest['max_drawdown']:.2f}"
+    ]
+    if digest['best']:
+        lines.append(f"Melhor trade: {digest['best']['symbol']} ${digest['best']['profit_usdt']:.2f}")
+        lines.append(f"Pior trade: {digest['worst']['symbol']} ${digest['worst']['profit_usdt']:.2f}")
+    for symbol, stats in digest['by_symbol'].items():
+        lines.append(f"- {symbol}: {stats['trades']} trades, {stats['wins']} ganhos, ${stats['pnl']:.2f}")
+    if digest['open_positions']:
+        lines.append(f"Posições abertas: {len(digest['open_positions'])}, resultado não realizado ${digest['unrealized_pnl']:.2f}")
+        for position in digest['open_positions']:
+            lines.append(f"- {position['symbol']}: ${position['value']:.2f} ({position['pnl_pct']:+.2f}%)")
+    if digest['equity_delta'] is not None:
+        lines.append(f"Patrimônio: ${digest['equity_start']:.2f} -> ${digest['equity_end']:.2f} ({digest['equity_delta']:+.2f})")
+    elif digest['equity_end'] is not None:
+        lines.append(f"Patrimônio atual: ${digest['equity_end']:.2f}")
+    return "\n".join(lines)
+
+def build_prompt(digest):
+    return (
+        "Escreva o relatório de um robô de trade para o Telegram, num tom informal de sócio, com emojis. "
+        "Use exatamente os números abaixo (já calculados, não refaça contas) e comente os destaques "
+        "em no máximo 8 linhas:\n\n" + render_digest(digest)
+    )
+
+def render_template(digest):
+    """Mensagem pronta sem LLM (sem chave da OpenAI ou se a chamada falhar)"""
+    emoji = "📈" if digest['realized_pnl'] >= 0 else "📉"
+    return (
+        f"{emoji} Resultado do período: ${digest['realized_pnl']:.2f}\n\n"
+        + render_digest(digest)
+    )
@@ -0,0 +1,76 @@
+import math
+import threading
+import time
+
+class CandleScheduler:
+    """Decide quando cada par deve ser avaliado.
+
+    - Todos os pares logo após o fechamento de cada candle (+ close_delay para a
+      exchange consolidar o candle), então os indicadores usam o candle fechado.
+    - Entre fechamentos, pares com posição aberta a cada position_interval
+      (take profit / stop loss) e os demais a cada idle_interval (None desliga).
+    - Os horários são absolutos: o tempo gasto no ciclo sai da espera, e um ciclo
+      atrasado não gera uma rajada de ciclos para "compensar".
+    """
+
+    def __init__(self, period, close_delay=2.0, position_interval=5.0, idle_interval=None, clock=time.time):
+        self.period = period
+        self.close_delay = close_delay
+        self.position_interval = position_interval
+        self.idle_interval = idle_interval
+        self.clock = clock
+        self.last_run = {}
+        self.wake_event = threading.Event()
+
+    def last_close(self, now):
+        """Horário (já com o atraso) do fechamento de candle mais recente"""
+        return math.floor((now - self.close_delay) / self.period) * self.period + self.close_delay
+
+    def interval(self, symbol, open_positions):
+        return self.position_interval if symbol in open_positions else self.idle_interval
+
+    def due(self, pairs, open_positions, now=None):
+        """Pares que precisam ser avaliados agora"""
+        now = self.clock() if now is None else now
+        boundary = self.last_close(now)
+        result = []
+        for symbol in pairs:
+            last = self.last_run.get(symbol)
+            interval = self.interval(symbol, open_positions)
+            if last is None or last < boundary or (interval and now - last >= interval):
+                result.append(symbol)
+        return result
+
+    def mark_run(self, symbols, now):
+        for symbol in symbols:
+            self.last_run[symbol] = now
+
+    def forget(self, pairs):
+        for symbol in [s for s in self.last_run if s not in pairs]:
+            del self.last_run[symbol]
+
+    def next_wakeup(self, pairs, open_positions, now=None):
+        """Próximo horário em que algum par fica pendente"""
+        now = self.clock() if now is None else now
+        wakeup = self.last_close(now) + self.period
+        for symbol in pairs:
+            last = self.last_run.get(symbol)
+            interval = self.interval(symbol, open_positions)
+            if last is None:
+                return now
+            if interval:
+                wakeup = min(wakeup, last + interval)
+        return max(wakeup, now)
+
+    def wait(self, pairs, open_positions, max_wait=None):
+        """Dorme até o próximo horário (ou até wake())"""
+        delay = self.next_wakeup(pairs, open_positions) - self.clock()
+        if max_wait is not None:
+            delay = min(delay, max_wait)
+        if delay > 0:
+            self.wake_event.wait(delay)
+        self.wake_event.clear()
+
+    def wake(self):
+        """Acorda o loop na hora (ex.: robô ligado ou lista de pares alterada no painel)"""
+        self.wake_event.set()
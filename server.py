@@ -1,16 +1,35 @@
+import multiprocessing
 import threading
 import time
 import ccxt
-import pandas as pd
-import pandas_ta as ta
 import json
 import os
 import requests
 import openai
+from concurrent.futures import ThreadPoolExecutor
+from candles import CandleStore, CLOSE
+from indicators import IndicatorEngine, sync_timeframes
+from strategy import TRADE_AMOUNT_USDT, MIN_BALANCE_USDT, RISK_MODES, HIGHER_TIMEFRAMES, get_risk_params, exit_masks, reload_risk_presets
+from strategy import buy_signal as strategy_buy_signal, sell_reason as strategy_sell_reason
+from trade_journal import TradeJournal, ProfitAggregator
+from status_stream import StatusBroadcaster, StatusSnapshot
+from market_stream import MarketStream, BINANCE_STREAM_URL, BINANCE_TESTNET_STREAM_URL
+from stream_replay import ReplaySession, load_datasets
+from metrics import Metrics
+from notifier import TelegramDispatcher
+from scheduler import CandleScheduler
+from execution import OrderExecutor
+from balances import BalanceCache, UserDataStream
+from event_store import EventStore
+from chat_context import ChatContext, RecentTradesDigest
+from chat_pool import ChatWorkerPool
+import report
+import shards
+from state_store import StateStore, StateServer, StateClient, parse_address, acquire_primary_lock
 import telebot
 from duckduckgo_search import DDGS
 from dotenv import load_dotenv
-from flask import Flask, render_template, jsonify, request
+from flask import Flask, Response, render_template, jsonify, request
 from datetime import datetime
 
 # Carrega variáveis de ambiente do .env
@@ -41,6 +60,7 @@ def save_config_to_file():
         "pairs": bot_state["pairs"],
         "is_live": bot_state["is_live"],
         "risk_mode": bot_state.get("risk_mode", "conservative"),
+        "stream_mode": bot_state.get("stream_mode", False),
         "telegram_token": bot_state.get("telegram_token", ""),
         "telegram_chat_id": bot_state.get("telegram_chat_id", "")
     }
@@ -50,34 +70,41 @@ def save_config_to_file():
     except Exception as e:
         print(f"Erro ao salvar config: {e}")
 
-TRADES_FILE = 'trades.json'
+TRADES_FILE = 'trades.json' # Formato antigo, migrado automaticamente para o TRADES_DB
+TRADES_DB = 'trades.db'
 
-def load_trades():
-    if os.path.exists(TRADES_FILE):
-        try:
-            with open(TRADES_FILE, 'r') as f:
-                return json.load(f)
-        except:
-            return []
-    return []
+# Diário de trades (SQLite/WAL): append O(1) e consultas por período/par.
+# Aberto em open_storage(), só no processo primário (o único que escreve)
+trade_journal = None
+
+# Lucros total / do dia / por par / por motivo, lidos uma vez e atualizados a cada venda
+profit_aggregator = ProfitAggregator()
+
+def load_trades(start=None, end=None, symbol=None, limit=None):
+    try:
+        return trade_journal.query(start=start, end=end, symbol=symbol, limit=limit)
+    except Exception as e:
+        print(f"Erro ao ler trades: {e}")
+        return []
 
 def save_trade(trade):
-    trades = load_trades()
-    trades.append(trade)
     try:
-        with open(TRADES_FILE, 'w') as f:
-            json.dump(trades, f, indent=4)
+        trade_journal.append(trade)
     except Exception as e:
         print(f"Erro ao salvar trade: {e}")
 
+    profit_aggregator.add(trade)
+    recent_trades_digest.add(trade)
+
     trade_volume = trade.get("amount", 0)
     trade_value = trade.get("buy_price", 0) * trade_volume
-    bot_state["total_traded_value"] = bot_state.get("total_traded_value", 0.0) + abs(trade_value)
-    bot_state["trade_volume_by_symbol"].setdefault(trade["symbol"], 0.0)
-    bot_state["trade_volume_by_symbol"][trade["symbol"]] += trade_volume
+    with bot_state.write() as state:
+        state["total_traded_value"] = state.get("total_traded_value", 0.0) + abs(trade_value)
+        volumes = dict(state["trade_volume_by_symbol"]) # Copia: leitores podem estar com a versão anterior
+        volumes[trade["symbol"]] = volumes.get(trade["symbol"], 0.0) + trade_volume
+        state["trade_volume_by_symbol"] = volumes
 
 ACTIVE_TRADES_FILE = 'active_trades.json'
-TRADE_AMOUNT_USDT = 11.0  # Valor fixo em USDT por operação
 
 def load_active_trades():
     if os.path.exists(ACTIVE_TRADES_FILE):
@@ -91,18 +118,12 @@ def load_active_trades():
 def save_active_trades():
     try:
         with open(ACTIVE_TRADES_FILE, 'w') as f:
-            json.dump(active_trades, f, indent=4)
+            json.dump(active_trades.snapshot(), f, indent=4)
     except Exception as e:
         print(f"Erro ao salvar trades ativos: {e}")
 
 def get_profits():
-    trades = load_trades()
-    total = sum(t.get('profit_usdt', 0) for t in trades)
-    
-    today = datetime.now().strftime('%Y-%m-%d')
-    daily = sum(t.get('profit_usdt', 0) for t in trades if t.get('timestamp', '').startswith(today))
-    
-    return total, daily
+    return profit_aggregator.totals()
 
 # --- ESTADO GLOBAL ---
 saved_config = load_config_from_file()
@@ -114,7 +135,9 @@ env_telegram_token = sanitize_value(os.getenv("TELEGRAM_TOKEN"))
 env_telegram_chat_id = sanitize_value(os.getenv("TELEGRAM_CHAT_ID"))
 env_openai_key = sanitize_value(os.getenv("OPENAI_API_KEY"))
 
-bot_state = {
+# Estados compartilhados entre as threads: escrita sob lock, leitura por snapshot
+# (ver state_store.py). Valores aninhados são trocados inteiros, nunca alterados.
+bot_state = StateStore({
     "running": False,
     "connected": False,
     "api_key": env_api_key if env_api_key else saved_config.get("api_key", ""),
@@ -122,6 +145,7 @@ bot_state = {
     "pairs": saved_config.get("pairs", []), 
     "is_live": saved_config.get("is_live", False),
     "risk_mode": saved_config.get("risk_mode", "conservative"), # conservative, moderate, aggressive
+    "stream_mode": saved_config.get("stream_mode", False), # True = decisões por evento via WebSocket
     "telegram_token": env_telegram_token if env_telegram_token else sanitize_value(saved_config.get("telegram_token", "")),
     "telegram_chat_id": env_telegram_chat_id if env_telegram_chat_id else sanitize_value(saved_config.get("telegram_chat_id", "")),
     "openai_key": env_openai_key,
@@ -130,10 +154,22 @@ bot_state = {
     "total_traded_value": 0.0,
     "trade_volume_by_symbol": {},
     "brl_rate": 5.0,
-    "brl_rate_updated": 0,
-    "logs": [],
-    "notifications": [] # Fila de notificações para o frontend
-}
+    "brl_rate_updated": 0
+})
+
+# Logs e notificações: ring buffer em memória + histórico rotacionado em disco (/api/events).
+# Só em memória até o open_storage() do primário; os workers leem do primário
+EVENTS_FILE = 'events.jsonl'
+events = EventStore(None, capacity=500)
+
+# Eventos SSE para o dashboard (/api/stream): só o que mudou
+status_broadcaster = StatusBroadcaster()
+
+# Resposta do /api/status pré-serializada e versionada (ETag)
+status_snapshot = StatusSnapshot()
+
+# Tempos por etapa/par, chamadas e erros da API (/api/metrics e painel)
+metrics = Metrics()
 
 def refresh_brl_rate(force=False):
     last = bot_state.get("brl_rate_updated", 0)
@@ -148,113 +184,286 @@ def refresh_brl_rate(force=False):
     except Exception as e:
         log(f"Erro ao atualizar cotação BRL: {e}")
 
-refresh_brl_rate(force=True)
-
 # Dados em tempo real das moedas
 # Estrutura: { 'BTC/USDT': { 'price': 0, 'rsi': 0, 'status': 'Neutro', 'pnl': 0, 'action': '-' } }
-market_data = {}
+market_data = StateStore()
 
 # Histórico de Trades e Estado
 # Estrutura: { 'BTC/USDT': { 'status': 'BOUGHT', 'price': 50000 } }
-active_trades = {} 
+active_trades = StateStore()
 
 # --- FUNÇÕES AUXILIARES (INTERNET) ---
 
 def get_fear_and_greed():
-    try:
-        r = requests.get("https://api.alternative.me/fng/", timeout=5)
-        data = r.json()
-        item = data['data'][0]
-        return f"{item['value_classification']} (Índice: {item['value']})"
-    except:
-        return "Indisponível"
+    # Erros sobem para o ChatContext, que mantém o último valor em cache
+    r = requests.get("https://api.alternative.me/fng/", timeout=5)
+    data = r.json()
+    item = data['data'][0]
+    return f"{item['value_classification']} (Índice: {item['value']})"
 
 def search_web_info(query):
-    try:
-        with DDGS() as ddgs:
-            # Busca notícias recentes sobre o tema
-            results = list(ddgs.text(f"crypto news {query}", region="br-pt", timelimit="d", max_results=3))
-            if not results:
-                return "Nenhuma notícia recente encontrada."
-            
-            summary = "\n".join([f"- {r['title']}: {r['body']}" for r in results])
-            return summary
-    except Exception as e:
-        return f"Erro na busca web: {e}"
+    with DDGS() as ddgs:
+        # Busca notícias recentes sobre o tema
+        results = list(ddgs.text(f"crypto news {query}", region="br-pt", timelimit="d", max_results=3))
+        if not results:
+            return "Nenhuma notícia recente encontrada."
+        
+        summary = "\n".join([f"- {r['title']}: {r['body']}" for r in results])
+        return summary
+
+# Contexto do chat: F&G e notícias em paralelo com TTL, últimos trades já prontos
+chat_context = ChatContext(get_fear_and_greed, search_web_info, fng_ttl=3600, news_ttl=600)
+recent_trades_digest = RecentTradesDigest(size=15)
 
 # --- FUNÇÕES DO ROBÔ ---
 
+# Sessão única com a exchange: reaproveita o pool HTTP, o ajuste de horário e os
+# metadados dos mercados entre os ciclos. Só é recriada quando as chaves ou o modo
+# (real/testnet) mudam.
+MARKETS_REFRESH_SECONDS = 3600  # Recarrega precisão/limites dos mercados a cada 1h
+exchange_lock = threading.Lock()
+exchange_session = {
+    "client": None,
+    "key": None, # (api_key, secret_key, is_live) usados para criar o cliente
+    "markets_loaded_at": 0
+}
+
 def get_exchange():
+    if replay_session is not None:
+        # Replay offline: exchange simulada, sem chaves nem rede
+        with exchange_lock:
+            if exchange_session["client"] is None:
+                exchange_session["client"] = metrics.instrument(replay_session.exchange)
+                exchange_session["key"] = 'replay'
+                exchange_session["markets_loaded_at"] = time.time()
+            return exchange_session["client"]
+
     if not bot_state["api_key"] or not bot_state["secret_key"]:
         return None
     
-    try:
-        exchange = ccxt.binance({
-            'apiKey': bot_state["api_key"],
-            'secret': bot_state["secret_key"],
-            'enableRateLimit': True,
-            'options': {
-                'defaultType': 'spot',
-                'adjustForTimeDifference': True,
-            }
-        })
+    session_key = (bot_state["api_key"], bot_state["secret_key"], bot_state["is_live"])
+    
+    with exchange_lock:
+        if exchange_session["client"] is not None and exchange_session["key"] == session_key:
+            return exchange_session["client"]
         
-        if not bot_state["is_live"]:
-            exchange.set_sandbox_mode(True) # TESTNET
+        try:
+            exchange = ccxt.binance({
+                'apiKey': bot_state["api_key"],
+                'secret': bot_state["secret_key"],
+                'enableRateLimit': True,
+                'options': {
+                    'defaultType': 'spot',
+                    'adjustForTimeDifference': True,
+                }
+            })
             
-        return exchange
+            if not bot_state["is_live"]:
+                exchange.set_sandbox_mode(True) # TESTNET
+            
+            # Toda chamada à API passa a ser contada e cronometrada
+            exchange = metrics.instrument(exchange)
+            
+            # Carrega os mercados uma única vez (precisão, valor mínimo, lote)
+            exchange.load_markets()
+            
+            exchange_session["client"] = exchange
+            exchange_session["key"] = session_key
+            exchange_session["markets_loaded_at"] = time.time()
+            return exchange
+        except Exception as e:
+            log(f"Erro ao conectar na exchange: {e}")
+            return None
+
+def reset_exchange():
+    """Descarta a sessão atual; a próxima chamada a get_exchange cria uma nova"""
+    with exchange_lock:
+        exchange_session["client"] = None
+        exchange_session["key"] = None
+        exchange_session["markets_loaded_at"] = 0
+    # Candles e saldo da conta anterior (ex.: testnet) não valem para a nova sessão
+    candle_store.clear()
+    indicator_engines.clear()
+    timeframe_engines.clear()
+    timeframe_indicators.clear()
+    stop_shard_pool()
+    stop_user_stream()
+    balance_cache.mark_stale()
+
+def refresh_markets(force=False):
+    """Atualiza os metadados dos mercados em cache (explícito ou a cada MARKETS_REFRESH_SECONDS)"""
+    exchange = exchange_session["client"]
+    if exchange is None:
+        return
+    if not force and time.time() - exchange_session["markets_loaded_at"] < MARKETS_REFRESH_SECONDS:
+        return
+    try:
+        exchange.load_markets(reload=True)
+        exchange_session["markets_loaded_at"] = time.time()
     except Exception as e:
-        log(f"Erro ao conectar na exchange: {e}")
-        return None
+        log(f"Erro ao atualizar mercados: {e}")
+
+def get_market_info(symbol):
+    """Precisão e limites do par, lidos do cache de mercados (sem chamada à API)"""
+    exchange = exchange_session["client"]
+    if exchange is None or not exchange.markets or symbol not in exchange.markets:
+        return {}
+    market = exchange.markets[symbol]
+    limits = market.get('limits', {})
+    return {
+        'amount_precision': market.get('precision', {}).get('amount'),
+        'price_precision': market.get('precision', {}).get('price'),
+        'min_amount': (limits.get('amount') or {}).get('min'),
+        'min_cost': (limits.get('cost') or {}).get('min')
+    }
 
 def log(message):
     timestamp = datetime.now().strftime('%H:%M:%S')
-    bot_state["logs"].insert(0, f"[{timestamp}] {message}")
-    if len(bot_state["logs"]) > 50:
-        bot_state["logs"].pop()
+    line = f"[{timestamp}] {message}"
+    events.append('log', line)
+    status_broadcaster.publish('log', line)
+    status_snapshot.mark_dirty()
+
+def notify(kind, msg):
+    """Notificação (toast) para o frontend"""
+    notification = {"type": kind, "msg": msg, "time": datetime.now().timestamp()}
+    events.append('notification', notification)
+    status_broadcaster.publish('notification', notification)
+    status_snapshot.mark_dirty()
+
+# Envio em background: a thread do robô só enfileira (ver notifier.py)
+telegram_dispatcher = TelegramDispatcher(
+    lambda: (bot_state.get("telegram_token"), bot_state.get("telegram_chat_id")),
+    on_error=lambda e: log(f"Erro ao enviar Telegram: {e}"),
+    metrics=metrics
+)
 
 def send_telegram_message(message):
-    token = bot_state.get("telegram_token")
-    chat_id = bot_state.get("telegram_chat_id")
-    
-    if token and chat_id:
+    telegram_dispatcher.send(message)
+
+REPORT_INTERVAL_SECONDS = 21600  # Relatório a cada 6 horas
+
+def current_equity():
+    """Saldo USDT + valor atual das moedas em carteira"""
+    return bot_state.get("balance", 0.0) + bot_state.get("total_wallet_value_usdt", 0.0)
+
+def build_report(start, end, equity_start=None):
+    """Resumo do período calculado localmente (diário + posições), ver report.py"""
+    trades = load_trades(start=start.strftime('%Y-%m-%d %H:%M:%S'), end=end.strftime('%Y-%m-%d %H:%M:%S'))
+    prices = {symbol: data.get('price') for symbol, data in market_data.snapshot().items()}
+    return report.build_digest(trades, active_trades.snapshot(), prices, start, end,
+                               equity_start=equity_start, equity_end=current_equity())
+
+def write_report(digest):
+    """Texto do relatório: LLM escreve a partir do resumo; sem chave ou com erro, usa o modelo fixo"""
+    if bot_state["openai_key"]:
         try:
-            url = f"https://api.telegram.org/bot{token}/sendMessage"
-            data = {"chat_id": chat_id, "text": message, "parse_mode": "Markdown"}
-            requests.post(url, json=data)
+            response = get_openai_client().chat.completions.create(
+                model="gpt-3.5-turbo",
+                messages=[{"role": "user", "content": report.build_prompt(digest)}]
+            )
+            return response.choices[0].message.content
         except Exception as e:
-            log(f"Erro ao enviar Telegram: {e}")
+            log(f"Erro na Thread IA (usando relatório sem IA): {e}")
+    return report.render_template(digest)
 
 def relatorio_ia_telegram():
-    """Thread do 'Sócio Digital': Lê logs, resume com IA e envia no Telegram"""
+    """Thread do 'Sócio Digital': resume o período e envia no Telegram"""
     log("🧠 Sócio Digital (IA) iniciado em background.")
+    start = datetime.now()
+    equity_start = None
     while True:
-        time.sleep(21600)  # Roda a cada 6 horas (21600 segundos)
+        time.sleep(REPORT_INTERVAL_SECONDS)
         try:
-            if not bot_state["openai_key"]:
-                continue
-
-            # Pega os últimos logs da memória
-            recent_logs = "\n".join(bot_state["logs"][:50])
-            
-            if not recent_logs.strip():
+            end = datetime.now()
+            digest = build_report(start, end, equity_start)
+            start, equity_start = end, digest['equity_end']
+            if report.is_empty(digest):
                 continue
 
-            # Chama OpenAI (GPT-3.5-turbo)
-            client = openai.OpenAI(api_key=bot_state["openai_key"])
-            prompt = f"Resuma essas operações de trade num tom informal de um sócio para o Telegram. Use emojis. Diga o lucro/prejuízo e o saldo atual:\n\n{recent_logs}"
-            
-            response = client.chat.completions.create(
-                model="gpt-3.5-turbo",
-                messages=[{"role": "user", "content": prompt}]
-            )
-            
-            resumo = response.choices[0].message.content
+            resumo = write_report(digest)
             send_telegram_message(f"🧠 *Relatório do Sócio Digital*\n\n{resumo}")
             
         except Exception as e:
             log(f"Erro na Thread IA: {e}")
 
+# Cliente OpenAI único (pool HTTP reaproveitado), recriado só se a chave mudar.
+# OPENAI_BASE_URL no ambiente aponta para outro endpoint (ex.: stub local nos testes).
+OPENAI_TIMEOUT_SECONDS = 45
+openai_lock = threading.Lock()
+openai_session = {"client": None, "key": None}
+
+def get_openai_client():
+    key = bot_state["openai_key"]
+    with openai_lock:
+        if openai_session["client"] is None or openai_session["key"] != key:
+            openai_session["client"] = openai.OpenAI(api_key=key, timeout=OPENAI_TIMEOUT_SECONDS, max_retries=1)
+            openai_session["key"] = key
+        return openai_session["client"]
+
+def answer_chat(chat_id, texts):
+    """Resposta do Sócio Digital para as mensagens (já agrupadas) de um chat"""
+    user_text = "\n".join(texts)
+
+    # 1. Coleta dados básicos
+    state = bot_state.snapshot()
+    brl = state.get("brl_rate", 5.0)
+    investido_brl = state.get("total_invested_usdt", 0.0) * brl
+    atual_brl = state.get("total_wallet_value_usdt", 0.0) * brl
+    lucro_brl = atual_brl - investido_brl
+    
+    # 2. Verifica se precisa de busca na internet (F&G e notícias em paralelo, com cache)
+    web_context = ""
+    keywords_busca = ["previsão", "previsao", "tendencia", "noticia", "analise", "mercado", "bitcoin", "btc", "futuro", "subir", "cair"]
+    if any(k in user_text.lower() for k in keywords_busca):
+        web = chat_context.gather(user_text)
+        web_context = f"""
+        DADOS DA INTERNET (EM TEMPO REAL):
+        - Fear & Greed Index: {web['fng']}
+        - Notícias/Buscas Recentes:
+        {web['news']}
+        """
+
+    # 3. Histórico recente (mantido em memória, sem ler o diário)
+    history_str = recent_trades_digest.render()
+
+    # 4. Monta o Prompt
+    contexto = f"""
+    Você é um Sócio Digital e Analista Sênior de Criptomoedas.
+    Seu objetivo é dar conselhos estratégicos, analisar o mercado e explicar os resultados.
+    
+    DADOS FINANCEIROS (EM REAIS R$):
+    - Total Investido: R$ {investido_brl:.2f}
+    - Valor Atual: R$ {atual_brl:.2f}
+    - Lucro/Prejuízo: R$ {lucro_brl:.2f}
+    
+    DADOS TÉCNICOS:
+    - Saldo Livre: ${state['balance']:.2f} USDT
+    - Cotação Dólar: R$ {brl:.2f}
+    - Moedas Monitoradas: {', '.join(state['pairs'])}
+    - Trades Ativos: {json.dumps(active_trades.snapshot())}
+    
+    {web_context}
+    
+    HISTÓRICO RECENTE:
+    {history_str}
+    
+    INSTRUÇÕES:
+    - Use os dados da internet (se houver) para embasar suas previsões.
+    - Se o usuário pedir previsão, cite o 'Fear & Greed Index' e notícias.
+    - Seja realista, mas otimista. Use emojis.
+    - Se houver prejuízo, explique tecnicamente e sugira melhorias.
+    - Se vierem várias mensagens seguidas, responda a todas numa só resposta.
+    
+    PERGUNTA DO USUÁRIO: {user_text}
+    """
+
+    response = get_openai_client().chat.completions.create(
+        model="gpt-3.5-turbo", # Pode alterar para gpt-4-turbo se tiver acesso
+        messages=[{"role": "user", "content": contexto}]
+    )
+    return response.choices[0].message.content
+
 def telegram_polling():
     """Thread para responder mensagens no Telegram usando IA"""
     log("🤖 Chatbot Telegram iniciado.")
@@ -264,6 +473,20 @@ def telegram_polling():
         return
 
     bot = telebot.TeleBot(bot_state["telegram_token"])
+    chat_context.prefetch()
+
+    def reply(message, text):
+        bot.reply_to(message, text)
+
+    def answer(chat_id, texts):
+        bot.send_chat_action(chat_id, 'typing') # Notifica que está "digitando" (processando)
+        return answer_chat(chat_id, texts)
+
+    # O handler só enfileira: a resposta (LLM) roda no pool, em paralelo entre chats
+    chat_pool = ChatWorkerPool(
+        answer, reply, max_workers=4, max_pending=20, coalesce_window=1.5,
+        on_error=lambda e: log(f"Erro no chat do Telegram: {e}"), metrics=metrics
+    )
 
     @bot.message_handler(func=lambda message: True)
     def handle_message(message):
@@ -272,82 +495,15 @@ def telegram_polling():
             bot.reply_to(message, "⛔ Acesso negado.")
             return
 
-        user_text = message.text
-        
         if not bot_state["openai_key"]:
             bot.reply_to(message, "⚠️ Configure a chave da OpenAI para eu poder responder.")
             return
 
-        # Notifica que está "digitando" (processando)
-        bot.send_chat_action(message.chat.id, 'typing')
-
-        try:
-            # 1. Coleta dados básicos
-            brl = bot_state.get("brl_rate", 5.0)
-            investido_brl = bot_state.get("total_invested_usdt", 0.0) * brl
-            atual_brl = bot_state.get("total_wallet_value_usdt", 0.0) * brl
-            lucro_brl = atual_brl - investido_brl
-            
-            # 2. Verifica se precisa de busca na internet
-            web_context = ""
-            keywords_busca = ["previsão", "previsao", "tendencia", "noticia", "analise", "mercado", "bitcoin", "btc", "futuro", "subir", "cair"]
-            if any(k in user_text.lower() for k in keywords_busca):
-                bot.send_chat_action(message.chat.id, 'typing') # Renova status
-                fng = get_fear_and_greed()
-                news = search_web_info(user_text)
-                web_context = f"""
-                DADOS DA INTERNET (EM TEMPO REAL):
-                - Fear & Greed Index: {fng}
-                - Notícias/Buscas Recentes:
-                {news}
-                """
-
-            # 3. Carrega histórico recente
-            closed_trades = load_trades()
-            recent_history = closed_trades[-15:] if closed_trades else []
-            history_str = json.dumps(recent_history, indent=2)
-
-            # 4. Monta o Prompt
-            contexto = f"""
-            Você é um Sócio Digital e Analista Sênior de Criptomoedas.
-            Seu objetivo é dar conselhos estratégicos, analisar o mercado e explicar os resultados.
-            
-            DADOS FINANCEIROS (EM REAIS R$):
-            - Total Investido: R$ {investido_brl:.2f}
-            - Valor Atual: R$ {atual_brl:.2f}
-            - Lucro/Prejuízo: R$ {lucro_brl:.2f}
-            
-            DADOS TÉCNICOS:
-            - Saldo Livre: ${bot_state['balance']:.2f} USDT
-            - Cotação Dólar: R$ {brl:.2f}
-            - Moedas Monitoradas: {', '.join(bot_state['pairs'])}
-            - Trades Ativos: {json.dumps(active_trades)}
-            
-            {web_context}
-            
-            HISTÓRICO RECENTE:
-            {history_str}
-            
-            INSTRUÇÕES:
-            - Use os dados da internet (se houver) para embasar suas previsões.
-            - Se o usuário pedir previsão, cite o 'Fear & Greed Index' e notícias.
-            - Seja realista, mas otimista. Use emojis.
-            - Se houver prejuízo, explique tecnicamente e sugira melhorias.
-            
-            PERGUNTA DO USUÁRIO: {user_text}
-            """
+        if not message.text:
+            return
 
-            client = openai.OpenAI(api_key=bot_state["openai_key"])
-            response = client.chat.completions.create(
-                model="gpt-3.5-turbo", # Pode alterar para gpt-4-turbo se tiver acesso
-                messages=[{"role": "user", "content": contexto}]
-            )
-            
-            resposta_ia = response.choices[0].message.content
-            bot.reply_to(message, resposta_ia)
-            
-        except Exception as e:
-            bot.reply_to(message, f"😵 Ocorreu um erro ao processar sua mensagem: {e}")
+        if not chat_pool.submit(message.chat.id, message, message.text):
+            bot.reply_to(message, "⏳ Muitas mensagens na fila. Tente de novo em instantes.")
 
     # Loop infinito para garantir reconexão em caso de queda
     while True:
@@ -358,242 +514,717 @@ def telegram_polling():
             log(f"⚠️ Conexão Telegram instável. Reconectando em 5s... ({e})")
             time.sleep(5)
 
-def process_data(exchange, symbol):
+# Candles de 1m por par, baixados de forma incremental (ver candles.py). Os de
+# 5m/15m/1h são montados dos mesmos candles de 1m, sem fetch_ohlcv extra; só na
+# semeadura cada timeframe maior pede os próprios 100 candles (RSI e Bollinger do
+# 1h prontos na partida) e os 1000 de 1m cobrem o período em formação.
+candle_store = CandleStore(size=50, timeframe='1m', higher_timeframes=HIGHER_TIMEFRAMES, history=100, seed_limit=1000)
+
+# Estado incremental do RSI(14) e Bollinger(20, 2) por par (ver indicators.py)
+indicator_engines = {}
+
+# Mesmos indicadores nos timeframes maiores (só candles fechados), por par
+timeframe_engines = {}     # symbol -> {timeframe: IndicatorEngine}
+timeframe_indicators = {}  # symbol -> {timeframe: {'rsi', 'lower_band', 'upper_band'}}
+
+def update_timeframe_indicators(symbol):
+    engines = timeframe_engines.setdefault(symbol, {})
+    timeframe_indicators[symbol] = sync_timeframes(engines, candle_store.get_frames(symbol), get_indicator_key())
+
+def get_indicator_key():
+    """(rsi_length, bb_length, bb_std) do perfil de risco atual"""
+    params = get_risk_params(bot_state.get("risk_mode", "conservative"))
+    return (params['rsi_length'], params['bb_length'], params['bb_std'])
+
+def get_indicator_engine(symbol):
+    # Perfis do sweep.py podem usar outros períodos: recria o motor e ele se
+    # realimenta com os candles que já estão no buffer
+    key = get_indicator_key()
+    engine = indicator_engines.get(symbol)
+    if engine is None or engine.key != key:
+        engine = IndicatorEngine(rsi_length=key[0], bb_length=key[1], bb_std=key[2])
+        indicator_engines[symbol] = engine
+    return engine
+
+def forget_pairs(pairs):
+    """Pares que saíram da lista: libera buffers de candles (1m e timeframes maiores),
+    motores de indicadores e métricas"""
+    keep = set(pairs)
+    metrics.forget_symbols(keep)
+    candle_store.retain(keep)
+    for symbol in [s for s in indicator_engines if s not in keep]:
+        indicator_engines.pop(symbol, None)
+    # Candles dos timeframes maiores saem no retain; os motores deles saem aqui
+    for symbol in [s for s in timeframe_engines if s not in keep]:
+        timeframe_engines.pop(symbol, None)
+    for symbol in [s for s in timeframe_indicators if s not in keep]:
+        timeframe_indicators.pop(symbol, None)
+
+def process_data(exchange, symbol, current_price=None):
     try:
-        ticker = exchange.fetch_ticker(symbol)
-        current_price = ticker['last']
-        
-        ohlcv = exchange.fetch_ohlcv(symbol, '1m', limit=50)
-        df = pd.DataFrame(ohlcv, columns=['timestamp', 'open', 'high', 'low', 'close', 'volume'])
-        
-        # Indicadores
-        df['rsi'] = ta.rsi(df['close'], length=14)
-        
-        # Bollinger Bands (20, 2)
-        bbands = ta.bbands(df['close'], length=20, std=2)
-        
-        lower_band = 0
-        upper_band = 0
-        
-        if bbands is not None and not bbands.empty:
-            # Pega as colunas dinamicamente (Lower, Mid, Upper)
-            # O pandas_ta retorna algo como BBL_20_2.0, BBM_20_2.0, BBU_20_2.0
-            # Vamos pegar pela posição ou filtrar nomes
-            cols = bbands.columns
-            lower_col = [c for c in cols if c.startswith('BBL')][0]
-            upper_col = [c for c in cols if c.startswith('BBU')][0]
+        with metrics.timer('symbol', symbol):
+            # Preço vem do lote de tickers do ciclo; busca individual só se faltou
+            if current_price is None:
+                ticker = exchange.fetch_ticker(symbol)
+                current_price = ticker['last']
             
-            df = pd.concat([df, bbands], axis=1)
-            lower_band = df[lower_col].iloc[-1]
-            upper_band = df[upper_col].iloc[-1]
-
-        current_rsi = df['rsi'].iloc[-1] if not df['rsi'].empty else 50
+            # Só os candles novos (ou o atual atualizado) vêm pela rede
+            with metrics.timer('candles'):
+                candles = candle_store.update(exchange, symbol)
+                window = candles.window()
+            
+            # Indicadores: os candles fechados atualizam o estado em O(1) e o candle
+            # em formação entra como valor "e se" (igual ao último ponto do pandas_ta)
+            with metrics.timer('indicators'):
+                engine = get_indicator_engine(symbol)
+                engine.sync(window)
+                rsi, lower_band, upper_band = engine.peek(window[-1, CLOSE])
+                update_timeframe_indicators(symbol)
+        
+        current_rsi = rsi if rsi is not None else 50
+        lower_band = lower_band or 0
+        upper_band = upper_band or 0
         
         return current_price, current_rsi, lower_band, upper_band
     except Exception as e:
+        metrics.count_error('process_data')
         log(f"Erro ao processar {symbol}: {e}")
         return 0, 50, 0, 0
 
-def bot_loop():
-    log("Sistema iniciado. Aguardando configuração...")
+# Limite de requisições simultâneas na exchange (o throttle do ccxt + este teto
+# mantém o ciclo dentro do rate limit da Binance)
+MAX_FETCH_WORKERS = 8
+fetch_pool = ThreadPoolExecutor(max_workers=MAX_FETCH_WORKERS, thread_name_prefix="fetch")
+
+# Acima deste número de pares, pede todos os tickers da exchange (mesmo peso no
+# rate limit da Binance e sem URL gigante com a lista de símbolos)
+BATCH_TICKERS_MAX_SYMBOLS = 100
+
+def fetch_prices(exchange, pairs):
+    """Últimos preços de todos os pares numa única requisição"""
+    try:
+        if len(pairs) > BATCH_TICKERS_MAX_SYMBOLS:
+            tickers = exchange.fetch_tickers()
+        else:
+            tickers = exchange.fetch_tickers(pairs)
+        return {symbol: tickers[symbol]['last'] for symbol in pairs if symbol in tickers}
+    except Exception as e:
+        metrics.count_error('prices')
+        log(f"Erro ao buscar cotações em lote: {e}")
+        return {}
+
+# --- MODO SHARDED (centenas de pares) ---
+# BOT_SHARD_WORKERS=N: N processos (shards.py) dividem os pares e fazem candles e
+# indicadores; este processo segue como coordenador (saldo, trava, active_trades
+# e ordens), então dois shards nunca gastam o mesmo saldo. Só no modo polling.
+SHARD_WORKERS = int(os.getenv("BOT_SHARD_WORKERS", "0") or 0)
+SHARD_FETCH_WORKERS = 4  # Requisições simultâneas por shard
+shard_lock = threading.Lock()
+shard_session = {"pool": None, "key": None}
+
+def shard_exchange_factory():
+    """(função, argumentos) que cada shard usa para criar seu cliente (precisa ser picklable)"""
+    return shards.binance_public, (bot_state["is_live"],)
+
+def get_shard_pool():
+    factory = shard_exchange_factory()
+    with shard_lock:
+        if shard_session["pool"] is None or shard_session["key"] != factory:
+            stop_shard_pool_locked()
+            shard_session["pool"] = shards.ShardPool(
+                SHARD_WORKERS, factory[0], factory[1], candle_options=candle_store.options(),
+                fetch_workers=SHARD_FETCH_WORKERS
+            )
+            shard_session["key"] = factory
+            log(f"🧩 Modo sharded: {SHARD_WORKERS} processos para os pares")
+        return shard_session["pool"]
+
+def stop_shard_pool_locked():
+    if shard_session["pool"] is not None:
+        shard_session["pool"].stop()
+    shard_session["pool"] = None
+    shard_session["key"] = None
+
+def stop_shard_pool():
+    with shard_lock:
+        stop_shard_pool_locked()
+
+def fetch_sharded_snapshot(targets, prices):
+    """Mesmo formato do fetch_market_snapshot, calculado pelos shards"""
+    results = get_shard_pool().evaluate(targets, prices, get_indicator_key(), list(bot_state["pairs"]))
+    snapshot = {}
+    for symbol, (values, timeframes, seconds, error) in results.items():
+        metrics.observe('symbol', seconds, symbol)
+        timeframe_indicators[symbol] = timeframes
+        if error:
+            metrics.count_error('process_data')
+            log(f"Erro ao processar {symbol}: {error}")
+        snapshot[symbol] = values
+    return snapshot
+
+def fetch_market_snapshot(exchange, pairs):
+    """Busca os dados de todas as moedas em paralelo.
+    O ciclo passa a durar o tempo do par mais lento, e não a soma de todos."""
+    with metrics.timer('prices'):
+        prices = fetch_prices(exchange, pairs)
+    if SHARD_WORKERS > 0:
+        return fetch_sharded_snapshot(pairs, prices)
+    futures = {symbol: fetch_pool.submit(process_data, exchange, symbol, prices.get(symbol)) for symbol in pairs}
+    return {symbol: future.result() for symbol, future in futures.items()}
+
+# Ordens a mercado em paralelo, com clientOrderId e leitura do preenchimento real
+order_executor = OrderExecutor(max_workers=4, metrics=metrics)
+MIN_SELL_USDT = 10.0  # Posição (ou sobra de venda parcial) abaixo disso não é vendida
+trades_lock = threading.Lock()
+
+# Saldo mantido localmente (balances.py): ordens executadas e o stream da conta
+# atualizam o cache; o fetch_balance completo só roda na reconciliação
+BALANCE_RECONCILE_SECONDS = 60          # Sem o stream da conta
+BALANCE_RECONCILE_STREAM_SECONDS = 900  # Com o stream da conta conectado
+USER_DATA_STREAM = True                 # Assina o stream da conta (listenKey) se a exchange suportar
+balance_cache = BalanceCache(reconcile_seconds=BALANCE_RECONCILE_SECONDS)
+user_stream = None
+
+def user_stream_connected():
+    return user_stream is not None and user_stream.connected
+
+def refresh_balance_state():
+    """Saldo em USDT exibido e usado na trava de saldo, já sem as reservas"""
+    bot_state["balance"] = balance_cache.available('USDT')
+
+def get_balance(exchange):
+    """Saldo do cache, reconciliado com fetch_balance quando venceu o prazo"""
+    interval = BALANCE_RECONCILE_STREAM_SECONDS if user_stream_connected() else BALANCE_RECONCILE_SECONDS
+    if balance_cache.needs_reconcile(interval):
+        with metrics.timer('balance'):
+            balance_cache.apply_snapshot(exchange.fetch_balance())
+    refresh_balance_state()
+    return balance_cache.snapshot()
+
+def book_fill_balance(symbol, side, fill):
+    # Com o stream da conta conectado, o saldo absoluto já chega por ele
+    if not user_stream_connected():
+        balance_cache.apply_fill(symbol, side, fill)
+
+def get_user_stream_url():
+    env_url = sanitize_value(os.getenv("BINANCE_USER_STREAM_URL"))
+    if env_url:
+        return env_url
+    return BINANCE_STREAM_URL if bot_state["is_live"] else BINANCE_TESTNET_STREAM_URL
+
+def on_user_stream_error(error, failures):
+    metrics.count_error('user_stream')
+    if failures == 1: # Só a primeira falha de cada sequência vai para o log
+        log(f"⚠️ Stream da conta indisponível, usando reconciliação periódica do saldo ({error})")
+
+def sync_user_stream(exchange):
+    global user_stream
+    if not USER_DATA_STREAM or not hasattr(exchange, 'publicPostUserDataStream'):
+        return
+    if user_stream is not None and user_stream.running and user_stream.exchange is exchange:
+        return
+    stop_user_stream()
+    user_stream = UserDataStream(exchange, get_user_stream_url(), balance_cache,
+                                 on_update=refresh_balance_state, on_error=on_user_stream_error)
+    user_stream.start()
+
+def stop_user_stream():
+    global user_stream
+    if user_stream is not None:
+        user_stream.stop()
+        user_stream = None
+
+def on_buy_filled(symbol, signal_price, reserved_usdt, fill, error):
+    """Chamado pelo order_executor quando a compra termina (ou falha)"""
+    if error is not None or not fill['filled']:
+        balance_cache.release('USDT', reserved_usdt) # Devolve a reserva
+        refresh_balance_state()
+        log(f"Erro ao comprar {symbol}: {error or 'ordem não executada'}")
+        publish_status()
+        return
+
+    # Taxa cobrada na própria moeda reduz a posição; em USDT entra no custo
+    amount = fill['filled'] - fill['fee_base']
+    cost = fill['cost'] + fill['fee_quote']
+    with trades_lock:
+        active_trades[symbol] = {
+            'status': 'BOUGHT',
+            'price': fill['price'],
+            'amount': amount,
+            'cost': cost,
+            'fee_usdt': fill['fee_usdt'],
+            'order_id': fill['order_id'],
+            'client_order_id': fill['client_order_id'],
+            'signal_price': signal_price,
+            'timestamp': datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+        }
+        save_active_trades()
+    # Troca a reserva pelo valor realmente gasto
+    balance_cache.release('USDT', reserved_usdt)
+    book_fill_balance(symbol, 'buy', fill)
+    refresh_balance_state()
+
+    slippage = (fill['price'] - signal_price) / signal_price * 100
+    msg = f"🚀 COMPRA: {amount:.5f} {symbol} (Total: ${cost:.2f} USDT) | Preço Médio: ${fill['price']:.2f} (slippage {slippage:+.2f}%)"
+    log(msg)
+    notify("success", msg)
+    send_telegram_message(f"🟢 *COMPRA REALIZADA*\n\nMoeda: `{symbol}`\nQtd: `{amount:.5f}`\nValor Gasto: `${cost:.2f} USDT`\nPreço Médio: `${fill['price']:.2f}`\nTaxa: `${fill['fee_usdt']:.4f}`\nEstratégia: Double Confirmation")
+    publish_status()
+
+def on_sell_filled(symbol, trade, sell_reason, signal_price, fill, error):
+    """Chamado pelo order_executor quando a venda termina (ou falha); a posição só
+    sai do active_trades com o preenchimento confirmado"""
+    if error is not None or not fill['filled']:
+        log(f"Erro ao vender {symbol}: {error or 'ordem não executada'}")
+        publish_status()
+        return
+
+    proceeds = fill['cost'] - fill['fee_quote'] - fill['fee_base'] * fill['price']
+    fraction = min(1.0, fill['filled'] / trade['amount']) if trade.get('amount') else 1.0
+    if trade.get('cost') and trade.get('amount'):
+        cost_basis = trade['cost'] * fraction
+    else:
+        cost_basis = trade['price'] * fill['filled'] # Posição antiga, sem custo registrado
+    profit_usdt = proceeds - cost_basis
+    profit_pct = profit_usdt / cost_basis * 100 if cost_basis else 0.0
+
+    with trades_lock:
+        # Ordem preenchida só em parte: o que não saiu continua na posição
+        remaining = (trade.get('amount') or 0.0) - fill['filled']
+        partial = fill['filled'] < fill.get('requested', fill['filled']) and remaining * fill['price'] > MIN_SELL_USDT
+        if partial:
+            # Custo e taxa da compra ficam proporcionais ao que sobrou
+            active_trades[symbol] = dict(
+                trade,
+                amount=remaining,
+                cost=trade['cost'] * (1 - fraction) if trade.get('cost') else None,
+                fee_usdt=trade.get('fee_usdt', 0.0) * (1 - fraction)
+            )
+        else:
+            # Vendida por inteiro (sobra abaixo do mínimo de venda não tem como sair)
+            active_trades.pop(symbol, None)
+        save_active_trades()
+    book_fill_balance(symbol, 'sell', fill)
+    refresh_balance_state()
+
+    save_trade({
+        'symbol': symbol,
+        'type': 'SELL',
+        'buy_price': trade['price'],
+        'sell_price': fill['price'],
+        'amount': fill['filled'],
+        'profit_usdt': profit_usdt,
+        'profit_pct': profit_pct,
+        'reason': sell_reason,
+        'timestamp': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+        'fee_usdt': trade.get('fee_usdt', 0.0) * fraction + fill['fee_usdt'],
+        'signal_price': signal_price,
+        'order_id': fill['order_id'],
+        'client_order_id': fill['client_order_id'],
+        'entry_client_order_id': trade.get('client_order_id')
+    })
+
+    msg = f"💰 VENDA{' (parcial)' if partial else ''} {symbol} | Lucro: ${profit_usdt:.2f} ({profit_pct:.2f}%)"
+    log(msg)
+    notify("info", msg)
+    send_telegram_message(f"🔴 *VENDA REALIZADA*\n\nMoeda: `{symbol}`\nLucro: `${profit_usdt:.2f}` ({profit_pct:.2f}%)\nPreço Médio: `${fill['price']:.2f}`\nMotivo: {sell_reason}")
+    publish_status()
+
+def evaluate_symbol(exchange, symbol, price, rsi, lower_band, upper_band, balance):
+    """Aplica as regras de compra/venda a um par e atualiza market_data"""
+    asset = symbol.split('/')[0]
+    coin_balance = balance['total'].get(asset, 0.0)
+    wallet_value = coin_balance * price
+
+    status = "Aguardando"
+    signal_color = "grey" # grey, green, red
+    action = "-"
+    pnl_str = "-"
+
+    # Lógica de Trade
+    # Primeiro a ordem em andamento, depois a posição: uma ordem que preencher
+    # entre as duas leituras já deixou o active_trades atualizado. Só esta thread
+    # chama submit(), então sem ordem pendente a posição não muda mais aqui.
+    pending = order_executor.is_pending(symbol)
+    is_bought = False
+    buy_price = 0.0
+    trade = active_trades.get(symbol)
+
+    if trade and trade['status'] == 'BOUGHT':
+        is_bought = True
+        buy_price = trade['price']
+
+    # --- ESTRATÉGIA DE ENTRADA (Double Confirmation) ---
+    # RSI < limite do perfil E Preço < Banda Inferior (perfis em strategy.py)
+    params = get_risk_params(bot_state.get("risk_mode", "conservative"))
+    # RSI dos timeframes maiores (candles fechados), usado pelos perfis com confirmação
+    htf_rsi = {tf: values['rsi'] for tf, values in timeframe_indicators.get(symbol, {}).items()}
+    buy_signal = strategy_buy_signal(params, rsi, price, lower_band, htf_rsi)
+
+    if pending:
+        # Ordem enviada e ainda sem preenchimento: nada de novo sinal para o par
+        status = "⏳ Ordem em andamento"
+        action = "Aguardando execução"
+        if is_bought:
+            pnl_str = f"{((price - buy_price) / buy_price) * 100:.2f}%"
+
+    elif buy_signal and not is_bought:
+        # --- TRAVA DE SEGURANÇA DE SALDO (BAIXO CAPITAL) ---
+        if bot_state["balance"] < MIN_BALANCE_USDT:
+            action = f"Ignorado: Saldo Baixo (${bot_state['balance']:.2f})"
+            # log(f"Sinal em {symbol} ignorado. Saldo insuficiente.")
+        elif (get_market_info(symbol).get('min_cost') or 0) > TRADE_AMOUNT_USDT:
+            action = f"Ignorado: Valor Mínimo do Par (${get_market_info(symbol)['min_cost']:.2f})"
+        else:
+            signal_color = "green"
+            status = "🟢 OPORTUNIDADE"
+
+            amount_to_spend = TRADE_AMOUNT_USDT
+            amount_coin = amount_to_spend / price
+
+            try:
+                # Ajusta à precisão do lote usando os mercados em cache
+                amount_coin = float(exchange.amount_to_precision(symbol, amount_coin))
+                # Reserva o valor já: os próximos pares do ciclo enxergam o saldo descontado
+                balance_cache.reserve('USDT', amount_to_spend)
+                refresh_balance_state()
+                submitted = order_executor.submit(
+                    exchange, symbol, 'buy', amount_coin,
+                    lambda fill, error: on_buy_filled(symbol, price, amount_to_spend, fill, error)
+                )
+                if submitted is None:
+                    balance_cache.release('USDT', amount_to_spend)
+                    refresh_balance_state()
+                action = "COMPRA enviada (Double Conf.) ⏳"
+            except Exception as e:
+                balance_cache.release('USDT', amount_to_spend)
+                refresh_balance_state()
+                metrics.count_error('order')
+                action = f"Erro Compra: {e}"
+                log(f"Erro ao comprar {symbol}: {e}")
+
+    # --- ESTRATÉGIA DE SAÍDA (Gestão de Risco) ---
+    elif is_bought:
+        current_pnl_pct = ((price - buy_price) / buy_price) * 100
+        pnl_str = f"{current_pnl_pct:.2f}%"
+
+        # Condições de Venda
+        take_profit, stop_loss, tech_exit = exit_masks(params, current_pnl_pct, rsi, htf_rsi)
+        sell_reason = strategy_sell_reason(params, take_profit, stop_loss, tech_exit)
+
+        if take_profit or stop_loss or tech_exit:
+            signal_color = "red"
+            status = f"🔴 VENDA: {sell_reason}"
+
+            # Vende a quantidade da posição (não o saldo inteiro da moeda);
+            # posições antigas, sem 'amount', usam o saldo da carteira
+            sell_amount = min(trade.get('amount') or coin_balance, coin_balance)
+            if sell_amount * price > MIN_SELL_USDT:
+                try:
+                    sell_amount = float(exchange.amount_to_precision(symbol, sell_amount))
+                    entry = dict(trade)
+                    order_executor.submit(
+                        exchange, symbol, 'sell', sell_amount,
+                        lambda fill, error: on_sell_filled(symbol, entry, sell_reason, price, fill, error)
+                    )
+                    action = f"VENDA enviada ({sell_reason}) ⏳"
+                except Exception as e:
+                    metrics.count_error('order')
+                    action = f"Erro Venda: {e}"
+                    log(f"Erro ao vender {symbol}: {e}")
+            else:
+                action = "Erro Venda (Saldo Baixo)"
+        else:
+            status = "Em Operação"
+            signal_color = "blue"
+
+    # Define Status da Carteira
+    wallet_status = "⚪ AGUARDANDO"
+    if is_bought:
+        wallet_status = "🔵 EM CARTEIRA"
+
+    # Atualiza dados para o Frontend
+    market_data[symbol] = {
+        'price': price,
+        'rsi': rsi,
+        'lower_band': lower_band,
+        'upper_band': upper_band,
+        'status': status,
+        'wallet_status': wallet_status,
+        'signal_color': signal_color,
+        'pnl': pnl_str,
+        'action': action,
+        'wallet_amount': coin_balance,
+        'wallet_value': wallet_value,
+        'wallet_value_brl': wallet_value * bot_state.get("brl_rate", 1.0),
+        'htf_rsi': {tf: round(value, 1) for tf, value in htf_rsi.items() if value is not None}
+    }
+
+    # Valor investido / atual da posição, somados em update_position_totals
+    if is_bought:
+        position_values[symbol] = (coin_balance * buy_price, coin_balance * price)
+    else:
+        position_values.pop(symbol, None)
+    
+    # Log periódico apenas para debug se necessário (opcional, para não poluir)
+    # log(f"Analisando {symbol}: RSI {rsi:.1f} | Preço {price:.2f} | BB_Inf {lower_band:.2f}")
+
+# Valor (investido, atual) de cada posição aberta, por par
+position_values = {}
+
+def update_position_totals(pairs):
+    """Atualiza os totais investido/atual da carteira a partir das posições avaliadas"""
+    bot_state["total_invested_usdt"] = sum(position_values[s][0] for s in pairs if s in position_values)
+    bot_state["total_wallet_value_usdt"] = sum(position_values[s][1] for s in pairs if s in position_values)
+
+# --- MODO STREAMING (WebSocket) ---
+# Em vez de esperar o próximo ciclo de 10s, as regras de compra/venda rodam a cada
+# evento de kline/ticker recebido. O saldo vem do balance_cache.
+market_stream = None
+stream_lock = threading.Lock()
+
+def get_stream_url():
+    if replay_session is not None:
+        return replay_session.url
+    # BINANCE_STREAM_URL permite apontar para um replay avulso (stream_replay.py)
+    env_url = sanitize_value(os.getenv("BINANCE_STREAM_URL"))
+    if env_url:
+        return env_url
+    return BINANCE_STREAM_URL if bot_state["is_live"] else BINANCE_TESTNET_STREAM_URL
+
+def on_stream_event(symbol, kind, payload):
+    if not bot_state["running"]:
+        return
+    exchange = get_exchange()
+    if exchange is None:
+        return
+    
+    candles = candle_store.get(symbol)
+    if kind == 'kline':
+        candle_store.feed(symbol, [payload['candle']])
+        price = payload['candle'][CLOSE]
+    else:
+        price = payload['price']
     
-    global active_trades
-    active_trades = load_active_trades()
+    if candles.count == 0:
+        return
+    
+    engine = get_indicator_engine(symbol)
+    engine.sync(candles.window())
+    rsi, lower_band, upper_band = engine.peek(price)
+    update_timeframe_indicators(symbol)
+    if rsi is None or lower_band is None:
+        return # Histórico ainda insuficiente para os indicadores
     
+    with stream_lock, metrics.timer('stream_event'):
+        evaluate_symbol(exchange, symbol, price, rsi, lower_band, upper_band, balance_cache.snapshot())
+    request_status_publish()
+
+# Com dezenas de eventos por segundo, o status (resumo + diff de todos os pares)
+# é publicado no máximo a cada STATUS_PUBLISH_SECONDS pela thread status_publisher
+STATUS_PUBLISH_SECONDS = 0.3
+status_dirty = threading.Event()
+
+def request_status_publish():
+    status_dirty.set()
+
+def status_publisher():
     while True:
-        if bot_state["running"] and bot_state["pairs"]:
-            refresh_brl_rate()
-            exchange = get_exchange()
-            if exchange:
-                try:
-                    # Atualiza Saldo
-                    bot_state["previous_balance"] = bot_state["balance"]
-                    balance = exchange.fetch_balance()
-                    bot_state["balance"] = balance['total'].get('USDT', 0.0)
-                    
-                    if not bot_state["connected"]:
-                        log(f"✅ Conexão com Binance OK! Saldo: ${bot_state['balance']:.2f}")
+        status_dirty.wait()
+        time.sleep(STATUS_PUBLISH_SECONDS) # Junta os eventos do intervalo
+        status_dirty.clear()
+        try:
+            publish_status()
+        except Exception as e:
+            log(f"Erro ao publicar status: {e}")
+
+def on_stream_error(error):
+    metrics.count_error('stream')
+    log(f"⚠️ Stream de mercado instável, reconectando... ({error})")
+
+def seed_candles(exchange, pairs):
+    """Carrega o histórico inicial via REST antes de passar a ouvir o stream"""
+    def seed(symbol):
+        try:
+            candle_store.update(exchange, symbol)
+        except Exception as e:
+            log(f"Erro ao carregar histórico de {symbol}: {e}")
+    list(fetch_pool.map(seed, pairs))
+
+def sync_market_stream(exchange, pairs):
+    """Garante um stream ativo com a lista atual de pares"""
+    global market_stream
+    url = get_stream_url()
+    if market_stream and market_stream.running and market_stream.pairs == pairs and market_stream.base_url == url.rstrip('/'):
+        return
+    
+    stop_market_stream()
+    seed_candles(exchange, pairs)
+    market_stream = MarketStream(url, pairs, on_stream_event, on_error=on_stream_error)
+    market_stream.start()
+    log(f"📡 Modo streaming ativo ({len(pairs)} pares).")
+
+def stop_market_stream():
+    global market_stream
+    if market_stream:
+        market_stream.stop()
+        market_stream = None
+        log("📡 Modo streaming desligado.")
+
+# --- REPLAY OFFLINE (stream_replay.py) ---
+# BOT_REPLAY="BTC/USDT=btc_1m.csv,ETH/USDT=eth_1m.csv" roda o modo streaming sem
+# internet: a ReplayExchange faz o papel da Binance (histórico da semeadura,
+# saldo e ordens simuladas) e o stream vem de um replay local dos mesmos arquivos,
+# continuando no tempo a partir do histórico.
+REPLAY_DATASETS = sanitize_value(os.getenv("BOT_REPLAY"))
+REPLAY_WARMUP = int(os.getenv("BOT_REPLAY_WARMUP", "100") or 100)  # Candles de cada arquivo usados na semeadura
+REPLAY_SPEED = float(os.getenv("BOT_REPLAY_SPEED", "60") or 60)
+replay_session = None
+
+def start_replay(session):
+    """Liga o robô numa stream_replay.ReplaySession: exchange simulada, stream local e modo streaming"""
+    global replay_session
+    session.start()
+    reset_exchange()
+    replay_session = session
+    bot_state.update(pairs=list(session.pairs), stream_mode=True)
+    log(f"⏪ Replay offline: {len(session.pairs)} pares em {session.url}")
+
+def stop_replay():
+    global replay_session
+    if replay_session is not None:
+        stop_market_stream()
+        replay_session.stop()
+        replay_session = None
+        reset_exchange()
+
+def run_cycle(symbols=None):
+    """Uma iteração do robô: saldo, dados de mercado e decisões.
+    symbols limita a avaliação a parte dos pares (ver candle_scheduler)"""
+    with metrics.timer('cycle'):
+        _run_cycle(symbols)
+    publish_status()
+
+def _run_cycle(symbols):
+    if bot_state["running"] and bot_state["pairs"]:
+        refresh_brl_rate()
+        exchange = get_exchange()
+        if exchange:
+            refresh_markets()
+            try:
+                # Atualiza Saldo (cache local; fetch_balance só na reconciliação)
+                bot_state["previous_balance"] = bot_state["balance"]
+                balance = get_balance(exchange)
+                sync_user_stream(exchange)
+                
+                if not bot_state["connected"]:
+                    log(f"✅ Conexão com Binance OK! Saldo: ${bot_state['balance']:.2f}")
+                
+                bot_state["connected"] = True
+                
+                pairs = list(bot_state["pairs"])
+                forget_pairs(pairs)
+                
+                if bot_state.get("stream_mode"):
+                    # Decisões acontecem em on_stream_event; aqui só o saldo e o stream
+                    sync_market_stream(exchange, pairs)
+                else:
+                    stop_market_stream()
                     
-                    bot_state["connected"] = True
+                    targets = [s for s in pairs if symbols is None or s in symbols]
                     
-                    # Totais para cálculo de investimento
-                    iter_invested_usdt = 0.0
-                    iter_wallet_value_usdt = 0.0
+                    # Busca concorrente dos pares do ciclo, depois decide em sequência
+                    with metrics.timer('market_data'):
+                        snapshot = fetch_market_snapshot(exchange, targets)
                     
-                    for symbol in bot_state["pairs"]:
-                        price, rsi, lower_band, upper_band = process_data(exchange, symbol)
-                        asset = symbol.split('/')[0]
-                        coin_balance = balance['total'].get(asset, 0.0)
-                        wallet_value = coin_balance * price
-                        
-                        # Inicializa dados se não existir
-                        if symbol not in market_data:
-                            market_data[symbol] = {}
-                        
-                        status = "Aguardando"
-                        signal_color = "grey" # grey, green, red
-                        action = "-"
-                        pnl_str = "-"
-                        
-                        # Lógica de Trade
-                        is_bought = False
-                        buy_price = 0.0
-                        
-                        if symbol in active_trades and active_trades[symbol]['status'] == 'BOUGHT':
-                            is_bought = True
-                            buy_price = active_trades[symbol]['price']
-                            
-                            # Acumula totais
-                            iter_invested_usdt += coin_balance * buy_price
-                            iter_wallet_value_usdt += coin_balance * price
-
-                        # --- ESTRATÉGIA DE ENTRADA (Double Confirmation) ---
-                        # RSI < 30 E Preço < Banda Inferior
-                        
-                        risk_mode = bot_state.get("risk_mode", "conservative")
-                        buy_signal = False
-                        
-                        if risk_mode == "conservative":
-                            # Modo Prevenido: RSI < 30 E Preço < Banda Inferior
-                            buy_signal = (rsi < 30) and (price < lower_band)
-                        elif risk_mode == "moderate":
-                            # Modo Moderado: RSI < 35 E Preço < Banda Inferior
-                            buy_signal = (rsi < 35) and (price < lower_band)
-                        elif risk_mode == "aggressive":
-                            # Modo Audacioso: RSI < 40 E Preço < Banda Inferior (Mais sinais)
-                            buy_signal = (rsi < 40) and (price < lower_band)
-                        
-                        if buy_signal and not is_bought:
-                            # --- TRAVA DE SEGURANÇA DE SALDO (BAIXO CAPITAL) ---
-                            if bot_state["balance"] < 12.0:
-                                action = f"Ignorado: Saldo Baixo (${bot_state['balance']:.2f})"
-                                # log(f"Sinal em {symbol} ignorado. Saldo insuficiente.")
-                            else:
-                                signal_color = "green"
-                                status = "🟢 OPORTUNIDADE"
-                                
-                                amount_to_spend = TRADE_AMOUNT_USDT
-                                amount_coin = amount_to_spend / price
-                                
-                                try:
-                                    exchange.create_market_buy_order(symbol, amount_coin)
-                                    active_trades[symbol] = {'status': 'BOUGHT', 'price': price}
-                                    save_active_trades()
-                                    action = "COMPRA (Double Conf.) 🟢"
-                                    msg = f"🚀 COMPRA: {amount_coin:.5f} {symbol} (Total: ${amount_to_spend:.2f} USDT) | Preço Unitário: ${price:.2f}"
-                                    log(msg)
-                                    bot_state["notifications"].append({"type": "success", "msg": msg, "time": datetime.now().timestamp()})
-                                    send_telegram_message(f"🟢 *COMPRA REALIZADA*\n\nMoeda: `{symbol}`\nQtd: `{amount_coin:.5f}`\nValor Gasto: `${amount_to_spend:.2f} USDT`\nPreço Unitário: `${price:.2f}`\nEstratégia: Double Confirmation")
-                                    
-                                    # Atualiza saldo localmente
-                                    bot_state["balance"] -= amount_to_spend
-                                except Exception as e:
-                                    action = f"Erro Compra: {e}"
-                                    log(f"Erro ao comprar {symbol}: {e}")
-
-                        # --- ESTRATÉGIA DE SAÍDA (Gestão de Risco) ---
-                        elif is_bought:
-                            current_pnl_pct = ((price - buy_price) / buy_price) * 100
-                            pnl_str = f"{current_pnl_pct:.2f}%"
-                            
-                            # Condições de Venda
-                            take_profit = current_pnl_pct >= 2.0
-                            stop_loss = current_pnl_pct <= -1.5
-                            tech_exit = rsi > 70
-                            
-                            sell_reason = ""
-                            if take_profit: sell_reason = "Take Profit (+2%)"
-                            elif stop_loss: sell_reason = "Stop Loss (-1.5%)"
-                            elif tech_exit: sell_reason = "RSI Esticado (>70)"
-                            
-                            if take_profit or stop_loss or tech_exit:
-                                signal_color = "red"
-                                status = f"🔴 VENDA: {sell_reason}"
-                                
-                                coin_balance = balance['total'].get(symbol.split('/')[0], 0.0)
-                                if coin_balance * price > 10:
-                                    exchange.create_market_sell_order(symbol, coin_balance)
-                                    if symbol in active_trades:
-                                        del active_trades[symbol]
-                                    save_active_trades()
-                                    
-                                    # Calcula Lucro em USDT
-                                    profit_usdt = (price - buy_price) * coin_balance
-                                    
-                                    # Salva Trade
-                                    save_trade({
-                                        'symbol': symbol,
-                                        'type': 'SELL',
-                                        'buy_price': buy_price,
-                                        'sell_price': price,
-                                        'amount': coin_balance,
-                                        'profit_usdt': profit_usdt,
-                                        'profit_pct': current_pnl_pct,
-                                        'reason': sell_reason,
-                                        'timestamp': datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-                                    })
-                                    
-                                    action = f"VENDA ({sell_reason}) 🔴"
-                                    msg = f"💰 VENDA {symbol} | Lucro: ${profit_usdt:.2f} ({current_pnl_pct:.2f}%)"
-                                    log(msg)
-                                    bot_state["notifications"].append({"type": "info", "msg": msg, "time": datetime.now().timestamp()})
-                                    send_telegram_message(f"🔴 *VENDA REALIZADA*\n\nMoeda: `{symbol}`\nLucro: `${profit_usdt:.2f}` ({current_pnl_pct:.2f}%)\nMotivo: {sell_reason}")
-                                else:
-                                    action = "Erro Venda (Saldo Baixo)"
-                            else:
-                                status = "Em Operação"
-                                signal_color = "blue"
-
-                        # Define Status da Carteira
-                        wallet_status = "⚪ AGUARDANDO"
-                        if is_bought:
-                            wallet_status = "🔵 EM CARTEIRA"
-
-                        # Atualiza dados para o Frontend
-                        market_data[symbol] = {
-                            'price': price,
-                            'rsi': rsi,
-                            'lower_band': lower_band,
-                            'upper_band': upper_band,
-                            'status': status,
-                            'wallet_status': wallet_status,
-                            'signal_color': signal_color,
-                            'pnl': pnl_str,
-                            'action': action,
-                            'wallet_amount': coin_balance,
-                            'wallet_value': wallet_value,
-                            'wallet_value_brl': wallet_value * bot_state.get("brl_rate", 1.0)
-                        }
-                        
-                        # Log periódico apenas para debug se necessário (opcional, para não poluir)
-                        # log(f"Analisando {symbol}: RSI {rsi:.1f} | Preço {price:.2f} | BB_Inf {lower_band:.2f}")
+                    with metrics.timer('evaluate'):
+                        for symbol in targets:
+                            price, rsi, lower_band, upper_band = snapshot[symbol]
+                            evaluate_symbol(exchange, symbol, price, rsi, lower_band, upper_band, balance)
+                
+                update_position_totals(pairs)
                     
-                    # Atualiza estado global com totais da iteração
-                    bot_state["total_invested_usdt"] = iter_invested_usdt
-                    bot_state["total_wallet_value_usdt"] = iter_wallet_value_usdt
-                        
-                except Exception as e:
-                    bot_state["connected"] = False
-                    log(f"Erro no loop principal: {e}")
-            else:
+            except Exception as e:
+                metrics.count_error('cycle')
                 bot_state["connected"] = False
-            
-        time.sleep(10) # Loop a cada 10 segundos
+                log(f"Erro no loop principal: {e}")
+        else:
+            bot_state["connected"] = False
+    else:
+        stop_market_stream()
+        stop_user_stream()
+
+# Avaliações alinhadas ao fechamento do candle de 1m, com checagens extras
+# entre fechamentos (mais frequentes para pares com posição aberta)
+CANDLE_CLOSE_DELAY = 2.0       # Segundos após o fechamento (a exchange consolida o candle)
+POSITION_CHECK_SECONDS = 5.0   # Take profit / stop loss das posições abertas
+IDLE_CHECK_SECONDS = 20.0      # Pares sem posição entre fechamentos (None = só no fechamento)
+IDLE_LOOP_SECONDS = 10.0       # Robô parado: só republica o status
+
+candle_scheduler = CandleScheduler(
+    period=ccxt.Exchange.parse_timeframe(candle_store.timeframe),
+    close_delay=CANDLE_CLOSE_DELAY,
+    position_interval=POSITION_CHECK_SECONDS,
+    idle_interval=IDLE_CHECK_SECONDS
+)
+
+def bot_loop():
+    log("Sistema iniciado. Aguardando configuração...")
+    
+    active_trades.replace(load_active_trades())
+    
+    while True:
+        pairs = list(bot_state["pairs"])
+        if bot_state["running"] and pairs:
+            candle_scheduler.forget(pairs)
+            now = time.time()
+            due = candle_scheduler.due(pairs, active_trades, now)
+            if due:
+                # Marca o horário de início: a duração do ciclo não desloca a cadência
+                candle_scheduler.mark_run(due, now)
+                run_cycle(due)
+            candle_scheduler.wait(pairs, active_trades)
+        else:
+            run_cycle()
+            candle_scheduler.wait(pairs, active_trades, max_wait=IDLE_LOOP_SECONDS)
+
+def start_background_threads():
+    # Inicia Thread do Robô
+    t = threading.Thread(target=bot_loop, name="bot-loop")
+    t.daemon = True
+    t.start()
+
+    # Inicia Thread do Sócio Digital (IA)
+    t_ia = threading.Thread(target=relatorio_ia_telegram, name="ai-report")
+    t_ia.daemon = True
+    t_ia.start()
 
-# Inicia Thread do Robô
-t = threading.Thread(target=bot_loop)
-t.daemon = True
-t.start()
+    # Inicia Thread do Chatbot Telegram
+    t_chat = threading.Thread(target=telegram_polling, name="telegram-polling")
+    t_chat.daemon = True
+    t_chat.start()
 
-# Inicia Thread do Sócio Digital (IA)
-t_ia = threading.Thread(target=relatorio_ia_telegram)
-t_ia.daemon = True
-t_ia.start()
+    # Publica o status alterado pelos eventos do stream (agrupado)
+    t_status = threading.Thread(target=status_publisher, name="status-publisher")
+    t_status.daemon = True
+    t_status.start()
 
-# Inicia Thread do Chatbot Telegram
-t_chat = threading.Thread(target=telegram_polling)
-t_chat.daemon = True
-t_chat.start()
+# --- VÁRIOS PROCESSOS (WSGI com N workers) ---
+# BOT_STATE_ADDRESS (ex.: 127.0.0.1:5055 ou /tmp/bot.sock) liga o modo multi-worker:
+#   BOT_STATE_ADDRESS=127.0.0.1:5055 BOT_STATE_AUTHKEY=<segredo> gunicorn -w 4 --threads 8 server:app   (sem --preload)
+# O primeiro processo a pegar o PRIMARY_LOCK_FILE roda o robô e atende os demais
+# (state_store.StateServer); os outros só servem HTTP, lendo o estado do primário.
+# A conexão troca objetos pickle: quem tem a chave executa código no primário,
+# então BOT_STATE_AUTHKEY é obrigatório (ex.: python -c "import secrets; print(secrets.token_hex(32))").
+STATE_ADDRESS = sanitize_value(os.getenv("BOT_STATE_ADDRESS"))
+STATE_AUTHKEY = sanitize_value(os.getenv("BOT_STATE_AUTHKEY")).encode()
+PRIMARY_LOCK_FILE = 'bot_primary.lock'
+
+if STATE_ADDRESS and not STATE_AUTHKEY:
+    raise RuntimeError("BOT_STATE_ADDRESS definido sem BOT_STATE_AUTHKEY: defina uma chave secreta para os workers")
+
+is_primary = True    # Definido em start()
+state_client = None
 
 # --- ROTAS FLASK ---
 
@@ -601,66 +1232,239 @@ t_chat.start()
 def index():
     return render_template('index.html')
 
+def build_status_summary():
+    """Campos escalares do status (saldos, lucros, conexão), sem tabela nem logs"""
+    profits = profit_aggregator.snapshot()
+    state = bot_state.snapshot() # Todos os campos da mesma versão
+    brl_rate = state.get("brl_rate", 0.0)
+    return {
+        'running': state["running"],
+        'connected': state.get("connected", False),
+        'balance': state["balance"],
+        'balance_brl': state["balance"] * brl_rate,
+        'previous_balance': state.get("previous_balance", 0.0),
+        'total_profit': profits['total'],
+        'daily_profit': profits['daily'],
+        'profit_by_symbol': profits['by_symbol'],
+        'profit_by_reason': profits['by_reason'],
+        'total_traded_value': state.get("total_traded_value", 0.0),
+        'total_traded_value_brl': state.get("total_traded_value", 0.0) * brl_rate,
+        'total_invested_usdt': state.get("total_invested_usdt", 0.0),
+        'total_invested_brl': state.get("total_invested_usdt", 0.0) * brl_rate,
+        'total_wallet_value_usdt': state.get("total_wallet_value_usdt", 0.0),
+        'total_wallet_value_brl': state.get("total_wallet_value_usdt", 0.0) * brl_rate,
+        'brl_rate': brl_rate,
+        'metrics': metrics.summary()
+    }
+
+def build_status(market=None, summary=None):
+    status = summary if summary is not None else build_status_summary()
+    status['market_data'] = market if market is not None else market_data.snapshot()
+    status['logs'] = [e['data'] for e in reversed(events.recent('log', 50))] # Mais novo primeiro
+    status['notifications'] = [e['data'] for e in events.recent('notification', 5)] # Envia as últimas 5
+    status['last_event_id'] = events.last_id # Cursor para o /api/events?after=
+    return status
+
+# Uma publicação por vez (loop, stream, publicador e callbacks das ordens): sem
+# ele, uma versão montada antes podia ser gravada por último
+status_publish_lock = threading.Lock()
+
+def publish_status():
+    """Chamado por quem escreve no market_data (fim do ciclo / evento do stream):
+    envia os deltas SSE e publica uma nova versão serializada do /api/status"""
+    with status_publish_lock:
+        status_snapshot.mark_clean()
+        market = market_data.snapshot()
+        summary = build_status_summary()
+        status_broadcaster.publish_deltas(summary, market)
+        status_snapshot.publish(build_status(market, dict(summary)))
+
+def read_status(known_etag=None):
+    """(etag, bytes) do /api/status; bytes é None se o ETag não mudou"""
+    _, etag, body = status_snapshot.current(lambda market: build_status(market))
+    return etag, (None if etag == known_etag else body)
+
+# Último /api/status recebido do primário (só nos workers), trocado de uma vez
+worker_status = (None, b'')
+
 @app.route('/api/status')
 def get_status():
-    total_profit, daily_profit = get_profits()
-    
-    # Pega notificações recentes (limpa as antigas da memória se quiser, ou o front filtra)
-    # Vamos enviar todas e o front mostra só as novas
-    
-    brl_rate = bot_state.get("brl_rate", 0.0)
-    return jsonify({
-        'running': bot_state["running"],
-        'connected': bot_state.get("connected", False),
-        'balance': bot_state["balance"],
-        'balance_brl': bot_state["balance"] * brl_rate,
-        'previous_balance': bot_state.get("previous_balance", 0.0),
-        'total_profit': total_profit,
-        'daily_profit': daily_profit,
-        'total_traded_value': bot_state.get("total_traded_value", 0.0),
-        'total_traded_value_brl': bot_state.get("total_traded_value", 0.0) * brl_rate,
-        'total_invested_usdt': bot_state.get("total_invested_usdt", 0.0),
-        'total_invested_brl': bot_state.get("total_invested_usdt", 0.0) * brl_rate,
-        'total_wallet_value_usdt': bot_state.get("total_wallet_value_usdt", 0.0),
-        'total_wallet_value_brl': bot_state.get("total_wallet_value_usdt", 0.0) * brl_rate,
-        'brl_rate': brl_rate,
-        'market_data': market_data,
-        'logs': bot_state["logs"],
-        'notifications': bot_state["notifications"][-5:] # Envia as últimas 5
-    })
+    # Mantido como fallback para quem não usa o /api/stream.
+    # Serve os bytes já prontos; If-None-Match com o mesmo ETag responde 304.
+    global worker_status
+    if state_client is not None:
+        known_etag, cached = worker_status
+        etag, body = state_client.request('status', known_etag)
+        if body is None:
+            body = cached
+        else:
+            worker_status = (etag, body)
+    else:
+        etag, body = read_status()
+    response = Response(body, mimetype='application/json')
+    response.set_etag(etag)
+    response.headers['Cache-Control'] = 'no-cache'
+    return response.make_conditional(request)
+
+def status_event_stream(_=None):
+    client = status_broadcaster.subscribe()
+    return status_broadcaster.stream(client, build_status())
+
+@app.route('/api/stream')
+def stream_status():
+    events = state_client.stream('stream') if state_client is not None else status_event_stream()
+    return Response(
+        events,
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
+
+@app.route('/api/metrics')
+def get_metrics():
+    # Formato texto do Prometheus (scrape direto deste endpoint)
+    text = state_client.request('metrics') if state_client is not None else metrics.render_prometheus()
+    return Response(text, mimetype='text/plain; version=0.0.4')
+
+def read_events(query):
+    after, kind, limit = query
+    return events.since(after, kind, limit)
+
+@app.route('/api/events')
+def get_events():
+    # Só o que é mais novo que o cursor: /api/events?after=<id>&kind=log|notification
+    after = request.args.get('after', 0, type=int)
+    kind = request.args.get('kind') or None
+    limit = max(1, min(request.args.get('limit', 200, type=int), 1000))
+    query = (after, kind, limit)
+    result = state_client.request('events', query) if state_client is not None else read_events(query)
+    return jsonify({'events': result, 'last_id': result[-1]['id'] if result else after})
+
+def current_config(_=None):
+    reload_risk_presets()
+    state = bot_state.snapshot()
+    return {
+        "api_key": state["api_key"],
+        "secret_key": state["secret_key"],
+        "pairs": state["pairs"],
+        "is_live": state["is_live"],
+        "risk_mode": state.get("risk_mode", "conservative"),
+        "stream_mode": state.get("stream_mode", False),
+        "risk_modes": list(RISK_MODES), # Inclui os perfis salvos pelo sweep.py
+        "telegram_token": state.get("telegram_token", ""),
+        "telegram_chat_id": state.get("telegram_chat_id", "")
+    }
 
 @app.route('/api/config', methods=['GET'])
 def get_config():
-    return jsonify({
-        "api_key": bot_state["api_key"],
-        "secret_key": bot_state["secret_key"],
-        "pairs": bot_state["pairs"],
-        "is_live": bot_state["is_live"],
-        "risk_mode": bot_state.get("risk_mode", "conservative"),
-        "telegram_token": bot_state.get("telegram_token", ""),
-        "telegram_chat_id": bot_state.get("telegram_chat_id", "")
-    })
+    return jsonify(state_client.request('config') if state_client is not None else current_config())
 
-@app.route('/api/config', methods=['POST'])
-def update_config():
-    data = request.json
-    if 'api_key' in data: bot_state["api_key"] = data['api_key']
-    if 'secret_key' in data: bot_state["secret_key"] = data['secret_key']
-    if 'pairs' in data: bot_state["pairs"] = data['pairs']
-    if 'is_live' in data: bot_state["is_live"] = data['is_live']
-    if 'risk_mode' in data: bot_state["risk_mode"] = data['risk_mode']
-    if 'telegram_token' in data: bot_state["telegram_token"] = sanitize_value(data['telegram_token'])
-    if 'telegram_chat_id' in data: bot_state["telegram_chat_id"] = sanitize_value(data['telegram_chat_id'])
+def apply_config(data):
+    """Único caminho de escrita da configuração (rota local ou comando de um worker)"""
+    if 'risk_mode' in data:
+        # Perfis salvos pelo sweep.py depois que o servidor subiu
+        reload_risk_presets()
+        if data['risk_mode'] not in RISK_MODES:
+            raise ValueError(f"Perfil de risco desconhecido: {data['risk_mode']}")
+    with bot_state.write() as state:
+        if 'api_key' in data: state["api_key"] = data['api_key']
+        if 'secret_key' in data: state["secret_key"] = data['secret_key']
+        if 'pairs' in data: state["pairs"] = data['pairs']
+        if 'is_live' in data: state["is_live"] = data['is_live']
+        if 'risk_mode' in data: state["risk_mode"] = data['risk_mode']
+        if 'stream_mode' in data: state["stream_mode"] = bool(data['stream_mode'])
+        if 'telegram_token' in data: state["telegram_token"] = sanitize_value(data['telegram_token'])
+        if 'telegram_chat_id' in data: state["telegram_chat_id"] = sanitize_value(data['telegram_chat_id'])
+    
+    status_snapshot.mark_dirty()
+    
+    # Chaves ou modo mudaram: a sessão da exchange precisa ser recriada
+    if 'api_key' in data or 'secret_key' in data or 'is_live' in data:
+        if exchange_session["key"] != (bot_state["api_key"], bot_state["secret_key"], bot_state["is_live"]):
+            reset_exchange()
     
     # Salva no arquivo sempre que atualizar
-    if 'api_key' in data or 'secret_key' in data or 'pairs' in data or 'is_live' in data or 'telegram_token' in data or 'risk_mode' in data:
+    if 'api_key' in data or 'secret_key' in data or 'pairs' in data or 'is_live' in data or 'telegram_token' in data or 'risk_mode' in data or 'stream_mode' in data:
         save_config_to_file()
 
     if 'running' in data: 
         bot_state["running"] = data['running']
         log("Estado do robô alterado para: " + ("LIGADO" if data['running'] else "DESLIGADO"))
+        publish_status()
     
+    # Pares novos / robô ligado: avalia já, sem esperar o próximo candle
+    if 'running' in data or 'pairs' in data:
+        candle_scheduler.wake()
+
+@app.route('/api/config', methods=['POST'])
+def update_config():
+    data = request.json
+    try:
+        if state_client is not None:
+            state_client.request('update_config', data)
+        else:
+            apply_config(data)
+    except (ValueError, RuntimeError) as e:
+        return jsonify({'status': 'error', 'message': str(e)}), 400
     return jsonify({'status': 'ok'})
 
+def start_state_server():
+    """Atende os workers HTTP (modo BOT_STATE_ADDRESS) a partir do processo primário"""
+    server = StateServer(
+        parse_address(STATE_ADDRESS), STATE_AUTHKEY,
+        handlers={
+            'status': read_status,
+            'config': current_config,
+            'update_config': apply_config,
+            'metrics': lambda _: metrics.render_prometheus(),
+            'events': read_events
+        },
+        streams={'stream': status_event_stream},
+        on_error=lambda e: log(f"Erro no servidor de estado: {e}")
+    )
+    server.start()
+    log(f"🔗 Servidor de estado para os workers em {STATE_ADDRESS}")
+    return server
+
+def open_storage():
+    """Diário de trades, totais de lucro, últimos trades do chat e histórico de
+    eventos. Só o primário abre os arquivos: é o único caminho de escrita, e os
+    workers leem tudo pelo StateClient"""
+    global trade_journal, events
+    trade_journal = TradeJournal(TRADES_DB, legacy_file=TRADES_FILE)
+    profit_aggregator.load(trade_journal.query())
+    recent_trades_digest.load(load_trades(limit=15))
+    events = EventStore(EVENTS_FILE, capacity=500)
+
+def start():
+    """Início do processo: papel (primário/worker), servidor de estado e threads do robô"""
+    global is_primary, state_client
+    if STATE_ADDRESS:
+        is_primary = acquire_primary_lock(PRIMARY_LOCK_FILE)
+        if not is_primary:
+            state_client = StateClient(parse_address(STATE_ADDRESS), STATE_AUTHKEY)
+
+    if is_primary:
+        open_storage()
+
+    # BOT_BACKGROUND_THREADS=0 importa o módulo sem iniciar as threads (ex.: benchmarks)
+    if is_primary and os.getenv("BOT_BACKGROUND_THREADS", "1") != "0":
+        if REPLAY_DATASETS:
+            start_replay(ReplaySession(load_datasets(REPLAY_DATASETS.split(',')), warmup=REPLAY_WARMUP, speed=REPLAY_SPEED))
+        # Cotação inicial (depois de log() existir, para não quebrar sem internet)
+        refresh_brl_rate(force=True)
+        start_background_threads()
+
+    if is_primary and STATE_ADDRESS:
+        start_state_server()
+
+# Roda no import para servir tanto o `python server.py` quanto o gunicorn
+# (server:app). Processos filhos do multiprocessing, como os shards (spawn),
+# reimportam este arquivo como __mp_main__ quando ele é o script principal:
+# neles nada disso pode rodar (seria um segundo robô, polling do Telegram,
+# relatório e escrita no events.jsonl / trades.db). O nome do processo filho já
+# vem definido nessa importação (parent_process() ainda não).
+if multiprocessing.current_process().name == 'MainProcess':
+    start()
+
 if __name__ == '__main__':
     app.run(debug=True, port=5000, use_reloader=False)
@@ -0,0 +1,162 @@
+import multiprocessing
+import threading
+import time
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+from candles import CandleStore, CLOSE
+from indicators import IndicatorEngine, sync_timeframes
+
+# Modo com vários processos para muitos pares: cada processo (shard) cuida de
+# um subconjunto fixo dos pares, baixando candles e calculando os indicadores
+# fora do GIL do processo principal. O coordenador (server.py) continua dono do
+# saldo, da trava de saldo mínimo, do active_trades e das ordens: os shards só
+# devolvem (preço, rsi, banda inferior, banda superior) e os indicadores dos
+# timeframes maiores.
+
+def shard_of(symbol, shards):
+    """Shard de um par: estável entre ciclos e reinícios (não depende da ordem da lista)"""
+    return zlib.crc32(symbol.encode()) % shards
+
+def binance_public(is_live):
+    """Cliente só com dados públicos (candles e cotações não precisam das chaves)"""
+    import ccxt
+    exchange = ccxt.binance({'enableRateLimit': True, 'options': {'defaultType': 'spot'}})
+    if not is_live:
+        exchange.set_sandbox_mode(True) # TESTNET
+    return exchange
+
+def shard_main(conn, factory, factory_args, candle_options, fetch_workers):
+    """Loop do processo shard: recebe ('evaluate', ...) e responde {par: (valores, timeframes, segundos, erro)}"""
+    exchange = factory(*factory_args)
+    candle_store = CandleStore(**candle_options)
+    engines = {}
+    timeframe_engines = {}
+    pool = ThreadPoolExecutor(max_workers=fetch_workers, thread_name_prefix="shard-fetch")
+
+    def compute(symbol, price, key):
+        started = time.perf_counter()
+        try:
+            if price is None:
+                price = exchange.fetch_ticker(symbol)['last']
+            window = candle_store.update(exchange, symbol).window()
+            engine = engines.get(symbol)
+            if engine is None or engine.key != key:
+                engine = engines[symbol] = IndicatorEngine(rsi_length=key[0], bb_length=key[1], bb_std=key[2])
+            engine.sync(window)
+            rsi, lower_band, upper_band = engine.peek(window[-1, CLOSE])
+            values = (price, rsi if rsi is not None else 50, lower_band or 0, upper_band or 0)
+            timeframes = sync_timeframes(timeframe_engines.setdefault(symbol, {}), candle_store.get_frames(symbol), key)
+            return values, timeframes, time.perf_counter() - started, None
+        except Exception as e:
+            return (0, 50, 0, 0), {}, time.perf_counter() - started, f"{type(e).__name__}: {e}"
+
+    while True:
+        try:
+            command, payload = conn.recv()
+        except (EOFError, OSError, KeyboardInterrupt):
+            return # Coordenador saiu
+        if command == 'stop':
+            return
+        symbols, prices, key, keep = payload
+        # Pares que saíram da lista deste shard não ocupam mais memória
+        candle_store.retain(keep)
+        for symbol in [s for s in engines if s not in keep]:
+            del engines[symbol]
+            timeframe_engines.pop(symbol, None)
+        futures = {symbol: pool.submit(compute, symbol, prices.get(symbol), key) for symbol in symbols}
+        conn.send({symbol: future.result() for symbol, future in futures.items()})
+
+class ShardPool:
+    """Processos shard e a distribuição dos pares entre eles.
+
+    evaluate() manda a cada shard só os seus pares, em paralelo, e junta as
+    respostas. Shard que morreu ou travou é recriado na próxima chamada; os
+    pares dele voltam com o valor neutro (0, 50, 0, 0) e o erro, como no
+    process_data.
+    """
+
+    def __init__(self, workers, factory, factory_args=(), candle_options=None, fetch_workers=4, timeout=60):
+        # spawn: o processo novo não herda threads/locks do servidor
+        self.context = multiprocessing.get_context('spawn')
+        self.workers = workers
+        self.factory = factory
+        self.factory_args = factory_args
+        self.candle_options = candle_options or {}
+        self.fetch_workers = fetch_workers
+        self.timeout = timeout
+        self.shards = [None] * workers  # (processo, conexão)
+        self.locks = [threading.Lock() for _ in range(workers)]
+        self.pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="shard")
+
+    def _start(self, index):
+        parent, child = self.context.Pipe()
+        process = self.context.Process(
+            target=shard_main,
+            args=(child, self.factory, self.factory_args, self.candle_options, self.fetch_workers),
+            name=f"shard-{index}", daemon=True
+        )
+        process.start()
+        child.close()
+        self.shards[index] = (process, parent)
+
+    def _kill(self, index):
+        shard = self.shards[index]
+        self.shards[index] = None
+        if shard is None:
+            return
+        process, conn = shard
+        conn.close()
+        process.terminate()
+        process.join(timeout=5)
+
+    def _call(self, index, payload):
+        with self.locks[index]:
+            if self.shards[index] is None or not self.shards[index][0].is_alive():
+                self._kill(index)
+                self._start(index)
+            _, conn = self.shards[index]
+            try:
+                conn.send(('evaluate', payload))
+                if not conn.poll(self.timeout):
+                    raise TimeoutError(f"shard {index} não respondeu em {self.timeout}s")
+                return conn.recv()
+            except Exception:
+                self._kill(index) # Estado desconhecido: recomeça do zero na próxima
+                raise
+
+    def evaluate(self, symbols, prices, key, pairs):
+        """{par: ((preço, rsi, banda inf., banda sup.), {timeframe: indicadores}, segundos, erro ou None)}"""
+        groups = [[] for _ in range(self.workers)]
+        keep = [set() for _ in range(self.workers)]
+        for symbol in pairs:
+            keep[shard_of(symbol, self.workers)].add(symbol)
+        for symbol in symbols:
+            groups[shard_of(symbol, self.workers)].append(symbol)
+
+        futures = {}
+        for index, group in enumerate(groups):
+            if group:
+                payload = (group, {s: prices.get(s) for s in group}, key, keep[index])
+                futures[index] = self.pool.submit(self._call, index, payload)
+
+        results = {}
+        for index, future in futures.items():
+            try:
+                results.update(future.result())
+            except Exception as e:
+                error = f"shard {index}: {type(e).__name__}: {e}"
+                for symbol in groups[index]:
+                    results[symbol] = ((0, 50, 0, 0), {}, 0.0, error)
+        return results
+
+    def stop(self):
+        for index in range(self.workers):
+            with self.locks[index]:
+                shard = self.shards[index]
+                if shard is not None:
+                    try:
+                        shard[1].send(('stop', None))
+                    except OSError:
+                        pass
+                    shard[0].join(timeout=2)
+                self._kill(index)
@@ -0,0 +1,215 @@
+import os
+import threading
+from collections.abc import MutableMapping
+from contextlib import contextmanager
+from multiprocessing.connection import Client, Listener
+
+class StateStore(MutableMapping):
+    """Dict compartilhado entre as threads do robô, do Telegram e do Flask.
+
+    Toda escrita passa pelo mesmo lock e gera uma nova versão. Leitores usam
+    snapshot(): uma cópia feita uma vez por versão e compartilhada por todos
+    (copy-on-write), então ninguém itera um dict que está sendo alterado.
+    Valores aninhados devem ser substituídos, não alterados no lugar.
+    """
+
+    def __init__(self, initial=None):
+        self._lock = threading.RLock()
+        self._data = dict(initial or {})
+        self._version = 0
+        self._snapshot = (-1, None)
+
+    @property
+    def version(self):
+        return self._version
+
+    def __getitem__(self, key):
+        return self._data[key]
+
+    def __setitem__(self, key, value):
+        with self._lock:
+            self._data[key] = value
+            self._version += 1
+
+    def __delitem__(self, key):
+        with self._lock:
+            del self._data[key]
+            self._version += 1
+
+    def __contains__(self, key):
+        return key in self._data
+
+    def __iter__(self):
+        return iter(self.snapshot())
+
+    def __len__(self):
+        return len(self._data)
+
+    def get(self, key, default=None):
+        return self._data.get(key, default)
+
+    def pop(self, key, *default):
+        with self._lock:
+            value = self._data.pop(key, *default)
+            self._version += 1
+            return value
+
+    def replace(self, data):
+        """Troca todo o conteúdo de uma vez (ex.: carga do arquivo)"""
+        with self._lock:
+            self._data = dict(data)
+            self._version += 1
+
+    @contextmanager
+    def write(self):
+        """Escrita composta sob o lock (ler-e-somar, vários campos juntos)"""
+        with self._lock:
+            yield self._data
+            self._version += 1
+
+    def snapshot(self):
+        """Cópia da versão atual, compartilhada entre leitores (não altere)"""
+        version, data = self._snapshot
+        if version == self._version:
+            return data
+        with self._lock:
+            if self._snapshot[0] != self._version:
+                self._snapshot = (self._version, dict(self._data))
+            return self._snapshot[1]
+
+# --- VÁRIOS PROCESSOS (WSGI com N workers) ---
+# Um processo é o primário: roda o robô e atende os demais por um socket local.
+# Os outros só servem HTTP, lendo o estado e repassando comandos ao primário.
+
+def parse_address(text):
+    """'127.0.0.1:5055' -> tupla TCP; qualquer outra coisa é um caminho de socket Unix"""
+    host, sep, port = text.rpartition(':')
+    if sep and port.isdigit():
+        return (host or '127.0.0.1', int(port))
+    return text
+
+_primary_lock_handles = []
+
+def acquire_primary_lock(path):
+    """True no primeiro processo que pegar o lock (mantido enquanto o processo viver)"""
+    try:
+        import fcntl
+    except ImportError:
+        return os.getenv("BOT_ROLE", "primary") == "primary"
+    handle = open(path, 'a+')
+    try:
+        fcntl.flock(handle, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except OSError:
+        handle.close()
+        return False
+    _primary_lock_handles.append(handle)
+    return True
+
+class StateServer:
+    """Atende os workers no processo primário.
+
+    handlers: {comando: função(payload) -> resultado}, resposta única.
+    streams: {comando: função(payload) -> gerador}, cada item é enviado até o
+    worker desconectar (ex.: eventos SSE).
+    """
+
+    def __init__(self, address, authkey, handlers, streams=None, on_error=None):
+        self.address = address
+        self.authkey = authkey
+        self.handlers = handlers
+        self.streams = streams or {}
+        self.on_error = on_error
+        self.listener = None
+
+    def start(self):
+        self.listener = Listener(self.address, authkey=self.authkey)
+        threading.Thread(target=self._accept, name="state-server", daemon=True).start()
+
+    def _accept(self):
+        while True:
+            try:
+                conn = self.listener.accept()
+            except Exception as e:
+                if self.on_error:
+                    self.on_error(e)
+                continue
+            threading.Thread(target=self._serve, args=(conn,), daemon=True).start()
+
+    def _serve(self, conn):
+        try:
+            while True:
+                command, payload = conn.recv()
+                if command in self.streams:
+                    stream = self.streams[command](payload)
+                    try:
+                        for item in stream:
+                            conn.send(item)
+                    finally:
+                        stream.close()
+                    return
+                try:
+                    result = (True, self.handlers[command](payload))
+                except Exception as e:
+                    result = (False, f"{type(e).__name__}: {e}")
+                conn.send(result)
+        except (EOFError, OSError):
+            pass  # Worker desconectou
+        finally:
+            conn.close()
+
+class StateClient:
+    """Lado do worker: uma conexão por thread do servidor HTTP, refeita se cair"""
+
+    def __init__(self, address, authkey, timeout=10):
+        self.address = address
+        self.authkey = authkey
+        self.timeout = timeout
+        self.local = threading.local()
+
+    def _connection(self):
+        conn = getattr(self.local, 'conn', None)
+        if conn is None:
+            conn = self.local.conn = Client(self.address, authkey=self.authkey)
+        return conn
+
+    def _drop(self):
+        conn = getattr(self.local, 'conn', None)
+        self.local.conn = None
+        if conn is not None:
+            try:
+                conn.close()
+            except OSError:
+                pass
+
+    def request(self, command, payload=None):
+        for attempt in range(2):
+            try:
+                conn = self._connection()
+                conn.send((command, payload))
+                if not conn.poll(self.timeout):
+                    self._drop()
+                    raise TimeoutError(f"Processo primário não respondeu a '{command}'")
+                ok, result = conn.recv()
+                break
+            except TimeoutError:
+                raise # Subclasse de OSError, mas não é conexão caída: não repete
+            except (EOFError, OSError):
+                # Primário reiniciou: tenta uma vez com conexão nova
+                self._drop()
+                if attempt:
+                    raise
+        if not ok:
+            raise RuntimeError(result)
+        return result
+
+    def stream(self, command, payload=None):
+        """Gerador com os itens enviados pelo primário numa conexão dedicada"""
+        conn = Client(self.address, authkey=self.authkey)
+        try:
+            conn.send((command, payload))
+            while True:
+                yield conn.recv()
+        except (EOFError, OSError):
+            return
+        finally:
+            conn.close()
@@ -2,12 +2,24 @@ let isRunning = false;
 
 let lastNotificationTime = 0;
 
+// Último estado completo recebido (snapshot + deltas do /api/stream)
+let dashboardState = null;
+let pollTimer = null;
+
 // Função para atualizar dados da tela
 async function updateDashboard() {
     try {
         const response = await fetch('/api/status');
-        const data = await response.json();
+        dashboardState = await response.json();
+        renderDashboard(dashboardState);
+    } catch (error) {
+        console.error("Erro ao buscar dados:", error);
+    }
+}
 
+// Desenha a tela a partir do estado
+function renderDashboard(data) {
+    try {
         // Atualiza Saldos e Lucros
         document.getElementById('balanceDisplay').innerText = `$${data.balance.toFixed(2)}`;
         document.getElementById('totalProfitDisplay').innerText = `$${data.total_profit.toFixed(2)}`;
@@ -90,6 +102,8 @@ async function updateDashboard() {
                 const walletAmount = info.wallet_amount || 0;
                 const walletValue = info.wallet_value || 0;
                 const walletValueBrl = info.wallet_value_brl || 0;
+                // RSI dos timeframes maiores (candles fechados), ex.: "5m 41.2 · 1h 55.0"
+                const htfRsi = Object.entries(info.htf_rsi || {}).map(([tf, value]) => `${tf} ${value.toFixed(1)}`).join(' · ');
 
                 tr.innerHTML = `
                     <td class="fs-4 text-center">${signalDot}</td>
@@ -99,7 +113,7 @@ async function updateDashboard() {
                     <td class="text-info">$${walletValue.toFixed(2)}</td>
                     <td class="text-warning">R$${walletValueBrl.toFixed(2)}</td>
                     <td>$${info.price.toFixed(4)}</td>
-                    <td>${info.rsi.toFixed(2)}</td>
+                    <td>${info.rsi.toFixed(2)}${htfRsi ? `<br><small class="text-muted">${htfRsi}</small>` : ''}</td>
                     <td class="text-info">$${info.lower_band.toFixed(4)}</td>
                     <td class="text-warning">$${info.upper_band.toFixed(4)}</td>
                     <td class="${pnlClass}">${info.pnl}</td>
@@ -113,9 +127,87 @@ async function updateDashboard() {
         const logsArea = document.getElementById('logsArea');
         logsArea.innerHTML = data.logs.map(log => `<div>${log}</div>`).join('');
 
+        // Resumo de desempenho (detalhes completos em /api/metrics)
+        if (data.metrics) renderMetrics(data.metrics);
+
     } catch (error) {
-        console.error("Erro ao buscar dados:", error);
+        console.error("Erro ao desenhar dados:", error);
+    }
+}
+
+function renderMetrics(m) {
+    const lines = [];
+    const cycle = m.stages.cycle;
+    if (cycle) lines.push(`<div>Ciclo: <b>${cycle.last_ms} ms</b> (média ${cycle.avg_ms} | p95 ${cycle.p95_ms})</div>`);
+    lines.push(`<div>API: ${m.api_calls} chamadas | ${m.api_errors} falhas | ${m.errors} erros</div>`);
+    for (const stage of ['balance', 'prices', 'market_data', 'candles', 'indicators', 'evaluate', 'order', 'telegram']) {
+        const s = m.stages[stage];
+        if (s) lines.push(`<div>${stage}: ${s.last_ms} ms (p95 ${s.p95_ms})</div>`);
+    }
+    const slowest = Object.entries(m.slowest_symbols).map(([sym, ms]) => `${sym} ${ms} ms`).join(', ');
+    if (slowest) lines.push(`<div>Pares mais lentos: ${slowest}</div>`);
+    document.getElementById('metricsArea').innerHTML = lines.join('');
+}
+
+// Fallback: polling do /api/status a cada 2 segundos
+function startPolling() {
+    if (pollTimer) return;
+    pollTimer = setInterval(updateDashboard, 2000);
+    updateDashboard();
+}
+
+function stopPolling() {
+    clearInterval(pollTimer);
+    pollTimer = null;
+}
+
+// Stream SSE: recebe um snapshot inicial e depois só o que mudou
+function connectStream() {
+    if (!window.EventSource) {
+        startPolling();
+        return;
     }
+
+    const source = new EventSource('/api/stream');
+
+    source.addEventListener('snapshot', (e) => {
+        stopPolling();
+        dashboardState = JSON.parse(e.data);
+        renderDashboard(dashboardState);
+    });
+
+    source.addEventListener('summary', (e) => {
+        if (!dashboardState) return;
+        Object.assign(dashboardState, JSON.parse(e.data));
+        renderDashboard(dashboardState);
+    });
+
+    source.addEventListener('market', (e) => {
+        if (!dashboardState) return;
+        const delta = JSON.parse(e.data);
+        for (const [symbol, changed] of Object.entries(delta.changed)) {
+            dashboardState.market_data[symbol] = Object.assign(dashboardState.market_data[symbol] || {}, changed);
+        }
+        delta.removed.forEach(symbol => delete dashboardState.market_data[symbol]);
+        renderDashboard(dashboardState);
+    });
+
+    source.addEventListener('log', (e) => {
+        if (!dashboardState) return;
+        dashboardState.logs.unshift(JSON.parse(e.data));
+        dashboardState.logs = dashboardState.logs.slice(0, 50);
+        renderDashboard(dashboardState);
+    });
+
+    source.addEventListener('notification', (e) => {
+        if (!dashboardState) return;
+        dashboardState.notifications.push(JSON.parse(e.data));
+        dashboardState.notifications = dashboardState.notifications.slice(-5);
+        renderDashboard(dashboardState);
+    });
+
+    // O EventSource reconecta sozinho; enquanto isso, volta ao polling
+    source.onerror = () => startPolling();
 }
 
 // Botão Salvar Configuração
@@ -124,6 +216,7 @@ document.getElementById('btnSave').addEventListener('click', async () => {
     const secretKey = document.getElementById('secretKey').value;
     const isLive = document.getElementById('liveModeToggle').checked;
     const riskMode = document.getElementById('riskMode').value;
+    const streamMode = document.getElementById('streamModeToggle').checked;
     const telegramToken = document.getElementById('telegramToken').value;
     const telegramChatId = document.getElementById('telegramChatId').value;
     
@@ -140,7 +233,7 @@ document.getElementById('btnSave').addEventListener('click', async () => {
         return;
     }
 
-    await fetch('/api/config', {
+    const response = await fetch('/api/config', {
         method: 'POST',
         headers: { 'Content-Type': 'application/json' },
         body: JSON.stringify({
@@ -149,11 +242,17 @@ document.getElementById('btnSave').addEventListener('click', async () => {
             pairs: selectedOptions,
             is_live: isLive,
             risk_mode: riskMode,
+            stream_mode: streamMode,
             telegram_token: telegramToken,
             telegram_chat_id: telegramChatId
         })
     });
 
+    if (!response.ok) {
+        const result = await response.json();
+        alert("Erro ao salvar: " + result.message);
+        return;
+    }
     alert("Configuração Salva!");
 });
 
@@ -180,7 +279,18 @@ async function loadConfig() {
         if (data.api_key) document.getElementById('apiKey').value = data.api_key;
         if (data.secret_key) document.getElementById('secretKey').value = data.secret_key;
         if (data.is_live !== undefined) document.getElementById('liveModeToggle').checked = data.is_live;
-        if (data.risk_mode) document.getElementById('riskMode').value = data.risk_mode;
+        // Perfis extras (gerados pelo sweep.py)
+        const riskSelect = document.getElementById('riskMode');
+        (data.risk_modes || []).forEach(mode => {
+            if (!riskSelect.querySelector(`option[value="${mode}"]`)) {
+                const option = document.createElement('option');
+                option.value = mode;
+                option.innerText = `🧪 ${mode}`;
+                riskSelect.appendChild(option);
+            }
+        });
+        if (data.risk_mode) riskSelect.value = data.risk_mode;
+        if (data.stream_mode !== undefined) document.getElementById('streamModeToggle').checked = data.stream_mode;
         if (data.telegram_token) document.getElementById('telegramToken').value = data.telegram_token;
         if (data.telegram_chat_id) document.getElementById('telegramChatId').value = data.telegram_chat_id;
         
@@ -218,7 +328,7 @@ function showToast(message, type) {
     toast.show();
 }
 
-// Atualiza a cada 2 segundos
-setInterval(updateDashboard, 2000);
+// Tempo real via SSE (com polling de 2 segundos como fallback)
+connectStream();
 updateDashboard();
 loadConfig();
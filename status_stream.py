@@ -0,0 +1,129 @@
+import json
+import queue
+import threading
+import uuid
+
+class StatusBroadcaster:
+    """Distribui eventos Server-Sent Events para os navegadores conectados.
+
+    Cada evento é serializado uma única vez e a mesma string vai para a fila de
+    todos os clientes. Cliente lento (fila cheia) é desconectado em vez de
+    segurar memória.
+    """
+
+    def __init__(self, max_queue=500):
+        self.max_queue = max_queue
+        self.clients = set()
+        self.lock = threading.Lock()
+        self.last_summary = {}
+        self.last_market = {}
+
+    def subscribe(self):
+        client = queue.Queue(maxsize=self.max_queue)
+        with self.lock:
+            self.clients.add(client)
+        return client
+
+    def unsubscribe(self, client):
+        with self.lock:
+            self.clients.discard(client)
+
+    def publish(self, event, data):
+        if not self.clients:
+            return
+        message = format_sse(event, data)
+        with self.lock:
+            for client in list(self.clients):
+                try:
+                    client.put_nowait(message)
+                except queue.Full:
+                    self.clients.discard(client)
+                    # Sinaliza ao gerador que ele deve encerrar
+                    try:
+                        client.get_nowait()
+                        client.put_nowait(None)
+                    except (queue.Empty, queue.Full):
+                        pass
+
+    def publish_deltas(self, summary, market):
+        """Envia só os campos que mudaram desde a última publicação"""
+        with self.lock:
+            summary_delta = {k: v for k, v in summary.items() if self.last_summary.get(k) != v}
+            market_delta = {}
+            for symbol, info in market.items():
+                previous = self.last_market.get(symbol, {})
+                changed = {k: v for k, v in info.items() if previous.get(k) != v}
+                if changed:
+                    market_delta[symbol] = changed
+            removed = [s for s in self.last_market if s not in market]
+            self.last_summary = dict(summary)
+            self.last_market = {s: dict(info) for s, info in market.items()}
+
+        if summary_delta:
+            self.publish('summary', summary_delta)
+        if market_delta or removed:
+            self.publish('market', {'changed': market_delta, 'removed': removed})
+
+    def stream(self, client, initial, heartbeat=15):
+        """Gerador para a resposta text/event-stream de um cliente"""
+        try:
+            yield format_sse('snapshot', initial)
+            while True:
+                try:
+                    message = client.get(timeout=heartbeat)
+                except queue.Empty:
+                    yield ": keep-alive\n\n"
+                    continue
+                if message is None:
+                    break
+                yield message
+        finally:
+            self.unsubscribe(client)
+
+def format_sse(event, data):
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+class StatusSnapshot:
+    """Última versão do /api/status, já serializada em bytes.
+
+    O loop do robô publica ao fim de cada ciclo (market_data consistente, sem
+    leitura pela metade). Logs e notificações só marcam o snapshot como sujo,
+    e ele é refeito uma vez na próxima requisição, reaproveitando o
+    market_data publicado. Cada versão tem um ETag próprio.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.boot_id = uuid.uuid4().hex[:8]
+        self.version = 0
+        self.market = {}
+        self.payload = None # (versão, etag, bytes) trocado de uma vez só
+        self.dirty = True
+
+    def publish(self, status):
+        body = json.dumps(status).encode('utf-8')
+        with self.lock:
+            self.market = status.get('market_data', {})
+            self._store(body)
+
+    def mark_dirty(self):
+        self.dirty = True
+
+    def mark_clean(self):
+        """Chamado antes de montar o status a publicar: o que for escrito depois
+        da montagem marca o snapshot como sujo de novo"""
+        self.dirty = False
+
+    def current(self, build):
+        """Retorna (versão, etag, bytes); build(market) remonta o status se estiver sujo"""
+        if self.dirty or self.payload is None:
+            with self.lock:
+                if self.dirty or self.payload is None:
+                    self.dirty = False
+                    body = json.dumps(build(self.market)).encode('utf-8')
+                    self._store(body)
+        return self.payload
+
+    def _store(self, body):
+        self.version += 1
+        self.payload = (self.version, f"{self.boot_id}-{self.version}", body)
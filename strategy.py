@@ -0,0 +1,115 @@
+import json
+import os
+
+# Parâmetros da estratégia, compartilhados pelo robô (server.py) e pelo backtest
+
+TRADE_AMOUNT_USDT = 11.0  # Valor fixo em USDT por operação
+MIN_BALANCE_USDT = 12.0   # Trava de segurança: abaixo disso não compra
+
+# Entrada (Double Confirmation): RSI < rsi_buy E Preço < Banda Inferior
+# Saída: Take Profit, Stop Loss ou RSI > rsi_sell
+DEFAULT_PARAMS = {
+    'rsi_length': 14,
+    'rsi_buy': 30,
+    'rsi_sell': 70,
+    'bb_length': 20,
+    'bb_std': 2.0,
+    'take_profit_pct': 2.0,
+    'stop_loss_pct': 1.5
+}
+
+# Timeframes maiores montados localmente a partir dos candles de 1m (candles.ResampledFrame)
+HIGHER_TIMEFRAMES = ('5m', '15m', '1h')
+
+RISK_MODES = {
+    # Modo Prevenido: RSI < 30 E Preço < Banda Inferior
+    'conservative': dict(DEFAULT_PARAMS, rsi_buy=30),
+    # Modo Moderado: RSI < 35 E Preço < Banda Inferior
+    'moderate': dict(DEFAULT_PARAMS, rsi_buy=35),
+    # Modo Audacioso: RSI < 40 E Preço < Banda Inferior (Mais sinais)
+    'aggressive': dict(DEFAULT_PARAMS, rsi_buy=40),
+    # Modo Confirmado: sinal de 1m (RSI < 35 E Preço < Banda Inferior) só vale se os
+    # timeframes maiores também estiverem esticados para baixo (RSI dos candles
+    # fechados abaixo do limite). A saída técnica pede RSI alto também no 5m.
+    'confirmed': dict(DEFAULT_PARAMS, rsi_buy=35,
+                      confirm_rsi_buy={'5m': 40, '15m': 45, '1h': 55},
+                      confirm_rsi_sell={'5m': 60})
+}
+
+# Perfis extras gerados pelo sweep.py (--save-preset), somados aos de cima
+RISK_PRESETS_FILE = 'risk_presets.json'
+_presets_mtime = None
+
+def load_risk_presets():
+    global _presets_mtime
+    if os.path.exists(RISK_PRESETS_FILE):
+        try:
+            _presets_mtime = os.path.getmtime(RISK_PRESETS_FILE)
+            with open(RISK_PRESETS_FILE, 'r') as f:
+                presets = json.load(f)
+            for name, params in presets.items():
+                RISK_MODES[name] = dict(DEFAULT_PARAMS, **params)
+        except Exception as e:
+            print(f"Erro ao carregar perfis de risco: {e}")
+
+def save_risk_preset(name, params):
+    """Grava (ou substitui) um perfil no RISK_PRESETS_FILE"""
+    presets = {}
+    if os.path.exists(RISK_PRESETS_FILE):
+        with open(RISK_PRESETS_FILE, 'r') as f:
+            presets = json.load(f)
+    presets[name] = {k: params[k] for k in DEFAULT_PARAMS}
+    with open(RISK_PRESETS_FILE, 'w') as f:
+        json.dump(presets, f, indent=4)
+    RISK_MODES[name] = dict(DEFAULT_PARAMS, **presets[name])
+
+def reload_risk_presets():
+    """Relê o RISK_PRESETS_FILE se ele mudou (ex.: sweep.py --save-preset com o robô rodando)"""
+    try:
+        mtime = os.path.getmtime(RISK_PRESETS_FILE)
+    except OSError:
+        return
+    if mtime != _presets_mtime:
+        load_risk_presets()
+
+load_risk_presets()
+
+def get_risk_params(risk_mode):
+    return RISK_MODES.get(risk_mode, RISK_MODES['conservative'])
+
+def uses_higher_timeframes(params):
+    return bool(params.get('confirm_rsi_buy') or params.get('confirm_rsi_sell'))
+
+def _confirm(limits, htf_rsi, above):
+    """Todos os timeframes de `limits` confirmam; RSI ausente (None/NaN, sem histórico) não confirma"""
+    result = True
+    for timeframe, limit in limits.items():
+        rsi = (htf_rsi or {}).get(timeframe)
+        if rsi is None:
+            return False
+        result = result & ((rsi > limit) if above else (rsi < limit))
+    return result
+
+def buy_signal(params, rsi, price, lower_band, htf_rsi=None):
+    """Funciona com escalares (robô) e com arrays NumPy (backtest).
+    htf_rsi: {timeframe: RSI} dos timeframes maiores, exigido pelos perfis com confirm_rsi_buy"""
+    signal = (rsi < params['rsi_buy']) & (price < lower_band)
+    if params.get('confirm_rsi_buy'):
+        signal = signal & _confirm(params['confirm_rsi_buy'], htf_rsi, above=False)
+    return signal
+
+def exit_masks(params, pnl_pct, rsi, htf_rsi=None):
+    """(take_profit, stop_loss, saída técnica), escalares ou arrays"""
+    take_profit = pnl_pct >= params['take_profit_pct']
+    stop_loss = pnl_pct <= -params['stop_loss_pct']
+    tech_exit = rsi > params['rsi_sell']
+    if params.get('confirm_rsi_sell'):
+        tech_exit = tech_exit & _confirm(params['confirm_rsi_sell'], htf_rsi, above=True)
+    return take_profit, stop_loss, tech_exit
+
+def sell_reason(params, take_profit, stop_loss, tech_exit):
+    """Texto do motivo, na mesma prioridade do robô (TP, depois SL, depois RSI)"""
+    if take_profit: return f"Take Profit (+{params['take_profit_pct']:g}%)"
+    if stop_loss: return f"Stop Loss (-{params['stop_loss_pct']:g}%)"
+    if tech_exit: return f"RSI Esticado (>{params['rsi_sell']:g})"
+    return ""
@@ -0,0 +1,253 @@
+import argparse
+import csv
+import json
+import math
+import threading
+import time
+from urllib.parse import urlparse, parse_qs
+from websockets.sync.server import serve
+
+from candles import ResampledFrame
+from market_stream import stream_name
+
+# Servidor local que reproduz candles gravados (CSV) no formato dos streams
+# combinados da Binance, para testar o modo streaming sem internet.
+#
+# Uso offline (o servidor sobe o replay e uma exchange simulada com os mesmos dados):
+#   BOT_REPLAY="BTC/USDT=dados/btc_1m.csv,ETH/USDT=dados/eth_1m.csv" python server.py
+#
+# Replay avulso, para outro cliente de WebSocket:
+#   python stream_replay.py BTC/USDT=dados/btc_1m.csv ETH/USDT=dados/eth_1m.csv --speed 60
+#
+# Os primeiros `warmup` candles de cada arquivo não são transmitidos: eles são o
+# histórico que a ReplayExchange devolve no fetch_ohlcv (semeadura do robô), e o
+# stream continua no tempo a partir dali.
+#
+# CSV: timestamp(ms),open,high,low,close,volume (cabeçalho opcional)
+
+def load_candles(path):
+    candles = []
+    with open(path, newline='') as f:
+        for row in csv.reader(f):
+            if not row or not row[0].strip().isdigit():
+                continue  # Cabeçalho ou linha vazia
+            ts, o, h, l, c, v = row[:6]
+            candles.append([int(ts), float(o), float(h), float(l), float(c), float(v)])
+    return candles
+
+def load_datasets(items):
+    """['BTC/USDT=btc.csv', ...] -> {par: candles}"""
+    datasets = {}
+    for item in items:
+        symbol, path = item.split('=', 1)
+        datasets[symbol.strip()] = load_candles(path.strip())
+    return datasets
+
+def split_history(datasets, warmup):
+    """({par: histórico para a semeadura}, {par: candles a transmitir})"""
+    history = {symbol: candles[:warmup] for symbol, candles in datasets.items()}
+    replay = {symbol: candles[warmup:] for symbol, candles in datasets.items()}
+    return history, replay
+
+def resample(candles, timeframe):
+    """Candles de 1m agrupados num timeframe maior (semeadura dos ResampledFrame)"""
+    frame = ResampledFrame(timeframe, size=len(candles) + 1)
+    for candle in candles:
+        frame.feed(candle)
+    return frame.window().tolist()
+
+def candle_ticks(candle):
+    """Caminho de preço dentro do candle: abertura, mínima, máxima, fechamento"""
+    ts, o, h, l, c, v = candle
+    path = [o, l, h, c]
+    for i, price in enumerate(path):
+        closed = i == len(path) - 1
+        yield price, {
+            't': ts, 'o': str(o), 'h': str(max(path[:i + 1])), 'l': str(min(path[:i + 1])),
+            'c': str(price), 'v': str(v if closed else v * (i + 1) / len(path)), 'x': closed
+        }
+
+def build_events(datasets, timeframe='1m'):
+    """Agrupa os candles de todos os pares por timestamp e gera, para cada um dos
+    4 ticks do candle, as mensagens de kline e ticker de cada par"""
+    by_ts = {}
+    for symbol, candles in datasets.items():
+        for candle in candles:
+            by_ts.setdefault(candle[0], []).append((stream_name(symbol), candle))
+
+    for ts in sorted(by_ts):
+        steps = [[] for _ in range(4)]
+        for name, candle in by_ts[ts]:
+            for i, (price, kline) in enumerate(candle_ticks(candle)):
+                steps[i].append((name, {'stream': f"{name}@kline_{timeframe}", 'data': {'e': 'kline', 's': name.upper(), 'k': kline}}))
+                steps[i].append((name, {'stream': f"{name}@ticker", 'data': {'e': '24hrTicker', 's': name.upper(), 'c': str(price)}}))
+        for step in steps:
+            yield step
+
+class ReplayExchange:
+    """Exchange simulada com os dados do replay (só os métodos do ccxt que o robô usa).
+
+    fetch_ohlcv devolve o histórico de aquecimento; cotações e ordens usam o
+    último preço transmitido pelo replay (observe)."""
+
+    def __init__(self, history, balance_usdt=1000.0, fee_rate=0.001):
+        self.history = history
+        self.fee_rate = fee_rate
+        self.lock = threading.Lock()
+        self.prices = {symbol: candles[-1][4] for symbol, candles in history.items() if candles}
+        self.balance = {'USDT': balance_usdt}
+        self.orders = []
+        self.markets = {
+            symbol: {
+                'symbol': symbol,
+                'precision': {'amount': 1e-6, 'price': 1e-2},
+                'limits': {'amount': {'min': 1e-6}, 'cost': {'min': 5.0}}
+            }
+            for symbol in history
+        }
+
+    def observe(self, symbol, price):
+        with self.lock:
+            self.prices[symbol] = price
+
+    @staticmethod
+    def parse_timeframe(timeframe):
+        units = {'m': 60, 'h': 3600, 'd': 86400}
+        return int(timeframe[:-1]) * units[timeframe[-1]]
+
+    def set_sandbox_mode(self, enabled):
+        pass
+
+    def load_markets(self, reload=False):
+        return self.markets
+
+    def amount_to_precision(self, symbol, amount):
+        return f"{math.floor(amount * 1e6) / 1e6:.6f}"
+
+    def fetch_ohlcv(self, symbol, timeframe='1m', since=None, limit=None):
+        candles = self.history.get(symbol, [])
+        if timeframe != '1m':
+            candles = resample(candles, timeframe)
+        if since is not None:
+            candles = [c for c in candles if c[0] >= since]
+        return [list(c) for c in (candles[-limit:] if limit else candles)]
+
+    def fetch_ticker(self, symbol):
+        with self.lock:
+            return {'symbol': symbol, 'last': self.prices[symbol]}
+
+    def fetch_tickers(self, symbols=None):
+        return {s: self.fetch_ticker(s) for s in (symbols or self.prices)}
+
+    def fetch_balance(self):
+        with self.lock:
+            total = dict(self.balance)
+        return {'total': total, 'free': dict(total)}
+
+    def _fill(self, symbol, side, amount, params=None):
+        amount = float(amount)
+        asset = symbol.split('/')[0]
+        with self.lock:
+            price = self.prices[symbol]
+            sign = 1 if side == 'buy' else -1
+            self.balance[asset] = self.balance.get(asset, 0.0) + sign * amount
+            self.balance['USDT'] = self.balance.get('USDT', 0.0) - sign * amount * price
+            order = {
+                'id': str(len(self.orders) + 1),
+                'clientOrderId': (params or {}).get('newClientOrderId'),
+                'symbol': symbol, 'side': side, 'type': 'market', 'status': 'closed',
+                'amount': amount, 'filled': amount, 'average': price, 'cost': amount * price,
+                'fee': {'currency': 'USDT', 'cost': amount * price * self.fee_rate}
+            }
+            self.orders.append(order)
+        return order
+
+    def fetch_order(self, id, symbol=None, params=None):
+        cid = (params or {}).get('origClientOrderId')
+        with self.lock:
+            for order in self.orders:
+                if order['id'] == id or (cid and order['clientOrderId'] == cid):
+                    return dict(order)
+        raise KeyError(f"Ordem {id or cid} não encontrada")
+
+    def create_market_buy_order(self, symbol, amount, params=None):
+        return self._fill(symbol, 'buy', amount, params)
+
+    def create_market_sell_order(self, symbol, amount, params=None):
+        return self._fill(symbol, 'sell', amount, params)
+
+class ReplaySession:
+    """Mesmos dados para a exchange simulada (histórico) e para o stream (resto)"""
+
+    def __init__(self, datasets, warmup=100, speed=60.0, timeframe='1m', balance_usdt=1000.0):
+        history, self.replay = split_history(datasets, warmup)
+        self.pairs = list(datasets)
+        self.names = {stream_name(symbol): symbol for symbol in self.pairs}
+        self.timeframe = timeframe
+        self.candle_seconds = 60.0 / speed if speed else 0
+        self.exchange = ReplayExchange(history, balance_usdt)
+        self.server = None
+        self.url = None
+
+    def play(self, send, requested=None):
+        """Transmite o replay: send(mensagem JSON) para cada evento, atualizando
+        antes o preço da exchange simulada"""
+        for step in build_events(self.replay, self.timeframe):
+            for name, message in step:
+                if requested and name not in requested:
+                    continue
+                if message['data']['e'] == '24hrTicker':
+                    self.exchange.observe(self.names[name], float(message['data']['c']))
+                send(json.dumps(message))
+            # Cada candle leva candle_seconds; os 4 ticks se distribuem nesse intervalo
+            if self.candle_seconds:
+                time.sleep(self.candle_seconds / 4)
+
+    def _handler(self, ws):
+        # Respeita a assinatura pedida pelo cliente (?streams=btcusdt@kline_1m/...)
+        query = parse_qs(urlparse(ws.request.path).query)
+        requested = set()
+        for stream in query.get('streams', [''])[0].split('/'):
+            if stream:
+                requested.add(stream.split('@')[0])
+        self.play(ws.send, requested)
+        # Fim dos dados: mantém a conexão aberta (sem reconexão que repetiria o replay)
+        for _ in ws:
+            pass
+
+    def serve(self, host='localhost', port=8765):
+        return serve(self._handler, host, port)
+
+    def start(self, host='localhost', port=0):
+        """Sobe o servidor numa thread e retorna a URL base (ws://host:porta)"""
+        self.server = self.serve(host, port)
+        threading.Thread(target=self.server.serve_forever, name="stream-replay", daemon=True).start()
+        self.url = f"ws://{host}:{self.server.socket.getsockname()[1]}"
+        return self.url
+
+    def stop(self):
+        if self.server is not None:
+            self.server.shutdown()
+            self.server = None
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay local de klines/ticker no formato Binance")
+    parser.add_argument('datasets', nargs='+', help="PAR=arquivo.csv (ex.: BTC/USDT=btc_1m.csv)")
+    parser.add_argument('--host', default='localhost')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--speed', type=float, default=60.0, help="Aceleração do tempo (60 = 1 candle de 1m por segundo)")
+    parser.add_argument('--timeframe', default='1m')
+    parser.add_argument('--warmup', type=int, default=0, help="Candles iniciais de cada arquivo que não são transmitidos")
+    args = parser.parse_args()
+
+    datasets = load_datasets(args.datasets)
+    for symbol, candles in datasets.items():
+        print(f"{symbol}: {len(candles)} candles")
+
+    session = ReplaySession(datasets, warmup=args.warmup, speed=args.speed, timeframe=args.timeframe)
+    with session.serve(args.host, args.port) as server:
+        print(f"Replay em ws://{args.host}:{args.port} (velocidade {args.speed}x)")
+        server.serve_forever()
+
+if __name__ == '__main__':
+    main()
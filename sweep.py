@@ -0,0 +1,161 @@
+import argparse
+import itertools
+import math
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+import numpy as np
+
+from backtest import DEFAULT_FEE_RATE, load_candles, symbol_from_path, simulate, summarize, compute_indicators
+from strategy import TRADE_AMOUNT_USDT, DEFAULT_PARAMS, save_risk_preset
+
+# Varredura paralela de parâmetros da estratégia sobre candles históricos locais.
+#
+# Uso:
+#   python sweep.py dados/*_1m.csv --rsi-buy 25,30,35,40 --take-profit 1.5,2,3 \
+#       --stop-loss 1,1.5,2 --bb-std 2,2.5 --top 15 --save-preset otimizado
+#
+# Os candles são lidos uma vez e colocados em memória compartilhada; cada
+# processo do pool só mapeia os arrays (sem cópia). Combinações com os mesmos
+# parâmetros de indicador são agrupadas para calcular RSI/bandas uma vez só.
+
+GRID_ARGS = {
+    'rsi_length': ('--rsi-length', int),
+    'rsi_buy': ('--rsi-buy', float),
+    'rsi_sell': ('--rsi-sell', float),
+    'bb_length': ('--bb-length', int),
+    'bb_std': ('--bb-std', float),
+    'take_profit_pct': ('--take-profit', float),
+    'stop_loss_pct': ('--stop-loss', float)
+}
+INDICATOR_KEYS = ('rsi_length', 'bb_length', 'bb_std')
+SHARED_COLUMNS = ('timestamp', 'close')
+
+# --- MEMÓRIA COMPARTILHADA ---
+
+def share_datasets(datasets):
+    """Copia os arrays para blocos de memória compartilhada (uma vez, no processo pai)"""
+    blocks = []
+    layout = {}
+    for symbol, candles in datasets.items():
+        for col in SHARED_COLUMNS:
+            array = candles[col]
+            block = shared_memory.SharedMemory(create=True, size=max(array.nbytes, 1))
+            np.ndarray(array.shape, dtype=array.dtype, buffer=block.buf)[:] = array
+            blocks.append(block)
+            layout.setdefault(symbol, {})[col] = (block.name, array.shape, array.dtype.str)
+    return blocks, layout
+
+_worker_blocks = []
+_worker_datasets = {}
+
+def _attach(name):
+    try:
+        return shared_memory.SharedMemory(name=name, track=False)  # Python 3.13+
+    except TypeError:
+        return shared_memory.SharedMemory(name=name)
+
+def _init_worker(layout):
+    """Mapeia os arrays compartilhados no processo do pool"""
+    for symbol, columns in layout.items():
+        for col, (name, shape, dtype) in columns.items():
+            block = _attach(name)
+            _worker_blocks.append(block)  # Mantém o mapeamento vivo
+            _worker_datasets.setdefault(symbol, {})[col] = np.ndarray(shape, dtype=np.dtype(dtype), buffer=block.buf)
+
+# --- EXECUÇÃO ---
+
+def build_grid(grid):
+    """Produto cartesiano dos valores, agrupado pelos parâmetros de indicador"""
+    names = list(grid)
+    groups = {}
+    for values in itertools.product(*(grid[n] for n in names)):
+        params = dict(DEFAULT_PARAMS, **dict(zip(names, values)))
+        key = tuple(params[k] for k in INDICATOR_KEYS)
+        groups.setdefault(key, []).append(params)
+    return groups
+
+def split_tasks(groups, workers):
+    """Divide os grupos em tarefas de tamanho parecido para ocupar todos os núcleos"""
+    total = sum(len(g) for g in groups.values())
+    size = max(1, math.ceil(total / (workers * 4)))
+    tasks = []
+    for combos in groups.values():
+        for i in range(0, len(combos), size):
+            tasks.append(combos[i:i + size])
+    return tasks
+
+def run_task(combos, amount_usdt, fee_rate):
+    """Roda um lote de combinações que compartilham os mesmos indicadores"""
+    indicators = {symbol: compute_indicators(candles['close'], combos[0]) for symbol, candles in _worker_datasets.items()}
+    results = []
+    for params in combos:
+        trades = []
+        for symbol, candles in _worker_datasets.items():
+            symbol_trades, _ = simulate(symbol, candles, params, amount_usdt, fee_rate, indicators[symbol])
+            trades.extend(symbol_trades)
+        summary = summarize(trades)
+        summary.pop('by_reason')
+        results.append((params, summary))
+    return results
+
+def run_sweep(datasets, grid, workers=None, amount_usdt=TRADE_AMOUNT_USDT, fee_rate=DEFAULT_FEE_RATE, sort_by='profit_usdt'):
+    workers = workers or os.cpu_count() or 1
+    tasks = split_tasks(build_grid(grid), workers)
+    blocks, layout = share_datasets(datasets)
+    try:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(layout,)) as pool:
+            futures = [pool.submit(run_task, combos, amount_usdt, fee_rate) for combos in tasks]
+            results = [r for f in futures for r in f.result()]
+    finally:
+        for block in blocks:
+            block.close()
+            block.unlink()
+    # Drawdown é melhor quanto menor
+    reverse = sort_by != 'max_drawdown_usdt'
+    results.sort(key=lambda r: r[1][sort_by], reverse=reverse)
+    return results
+
+def parse_values(text, cast):
+    return [cast(v) for v in text.split(',') if v.strip()]
+
+def main():
+    parser = argparse.ArgumentParser(description="Varredura paralela dos parâmetros da estratégia")
+    parser.add_argument('files', nargs='+', help="Arquivos CSV/Parquet de candles (um por par)")
+    for name, (flag, _) in GRID_ARGS.items():
+        parser.add_argument(flag, dest=name, help=f"Valores separados por vírgula (padrão: {DEFAULT_PARAMS[name]})")
+    parser.add_argument('--workers', type=int, default=os.cpu_count())
+    parser.add_argument('--amount', type=float, default=TRADE_AMOUNT_USDT, help="USDT por compra")
+    parser.add_argument('--fee', type=float, default=DEFAULT_FEE_RATE * 100, help="Taxa por lado, em %%")
+    parser.add_argument('--sort', default='profit_usdt', choices=['profit_usdt', 'win_rate', 'avg_profit_usdt', 'max_drawdown_usdt'])
+    parser.add_argument('--top', type=int, default=20)
+    parser.add_argument('--save-preset', metavar='NOME', help="Salva a melhor combinação como novo risk_mode")
+    args = parser.parse_args()
+
+    grid = {}
+    for name, (_, cast) in GRID_ARGS.items():
+        value = getattr(args, name)
+        grid[name] = parse_values(value, cast) if value else [DEFAULT_PARAMS[name]]
+
+    datasets = {symbol_from_path(path): load_candles(path) for path in args.files}
+    combos = math.prod(len(v) for v in grid.values())
+    print(f"{combos} combinações x {len(datasets)} pares em {args.workers} processos...")
+
+    started = time.time()
+    results = run_sweep(datasets, grid, args.workers, args.amount, args.fee / 100, args.sort)
+    print(f"Concluído em {time.time() - started:.2f}s\n")
+
+    varying = [n for n in GRID_ARGS if len(grid[n]) > 1] or list(GRID_ARGS)
+    header = " ".join(f"{n:>15}" for n in varying)
+    print(f"{'#':>3} {header} {'Trades':>7} {'Lucro USDT':>11} {'Acerto %':>9} {'Drawdown':>9}")
+    for rank, (params, s) in enumerate(results[:args.top], start=1):
+        values = " ".join(f"{params[n]:>15g}" for n in varying)
+        print(f"{rank:>3} {values} {s['trades']:>7} {s['profit_usdt']:>11.2f} {s['win_rate']:>9.1f} {s['max_drawdown_usdt']:>9.2f}")
+
+    if args.save_preset and results:
+        save_risk_preset(args.save_preset, results[0][0])
+        print(f"\nPerfil '{args.save_preset}' salvo. Selecione-o no painel (Perfil de Risco).")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,18 @@
+import os
+import sys
+import pytest
+
+# Os módulos do robô ficam na raiz do repositório (layout plano)
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+@pytest.fixture(scope='session')
+def server_module(tmp_path_factory):
+    """server.py importado sem as threads do robô, com os arquivos (config, diário,
+    eventos) numa pasta temporária"""
+    workdir = tmp_path_factory.mktemp('server')
+    previous = os.getcwd()
+    os.chdir(workdir)
+    os.environ['BOT_BACKGROUND_THREADS'] = '0'
+    import server
+    yield server
+    os.chdir(previous)
@@ -0,0 +1,34 @@
+import numpy as np
+import pytest
+
+from backtest import simulate
+from strategy import RISK_MODES
+
+def candles_from(closes):
+    closes = np.asarray(closes, dtype=np.float64)
+    return {
+        'timestamp': np.arange(len(closes), dtype=np.float64) * 60000,
+        'open': closes, 'high': closes, 'low': closes, 'close': closes,
+        'volume': np.full(len(closes), 10.0)
+    }
+
+def test_profit_is_net_of_fees_like_the_live_bot():
+    # Lateral, queda (compra) e alta até o take profit
+    closes = [100 + 0.3 * ((i % 6) - 2.5) for i in range(60)]
+    closes += [closes[-1] * 0.99 ** k for k in range(1, 8)]
+    closes += [closes[-1] * 1.01 ** k for k in range(1, 10)]
+    params = dict(RISK_MODES['conservative'], stop_loss_pct=50)
+    trades, _ = simulate('BTC/USDT', candles_from(closes), params, amount_usdt=100.0, fee_rate=0.001)
+    assert trades
+    trade = trades[0]
+
+    # Mesmas contas do on_buy_filled / on_sell_filled: taxa da compra na moeda,
+    # da venda em USDT, % sobre o custo da compra
+    amount = 100.0 / trade['buy_price'] * 0.999
+    proceeds = amount * trade['sell_price'] * 0.999
+    assert trade['amount'] == pytest.approx(amount)
+    assert trade['profit_usdt'] == pytest.approx(proceeds - 100.0)
+    assert trade['profit_pct'] == pytest.approx((proceeds - 100.0) / 100.0 * 100)
+    assert trade['fee_usdt'] == pytest.approx(0.1 + amount * trade['sell_price'] * 0.001)
+    gross_pct = (trade['sell_price'] - trade['buy_price']) / trade['buy_price'] * 100
+    assert trade['profit_pct'] < gross_pct
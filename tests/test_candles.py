@@ -0,0 +1,77 @@
+import os
+import sys
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'benchmarks'))
+
+from fake_exchange import FakeExchange
+from candles import CandleStore, ResampledFrame, TIMESTAMP
+from indicators import sync_timeframes, higher_timeframe_rsi
+
+HOUR = 3600000
+MINUTE = 60000
+START = 1700000000000 // HOUR * HOUR
+
+def minutes(start, count):
+    """Candles de 1m sintéticos: [ts, open, high, low, close, volume]"""
+    result = []
+    for i in range(count):
+        close = 100 + 5 * np.sin(i / 40) + (i % 7) * 0.1
+        result.append([start + i * MINUTE, close - 0.05, close + 0.2, close - 0.2, close, 1.0 + i % 3])
+    return result
+
+def test_seed_gives_ready_hourly_indicators():
+    symbol = 'BTC/USDT'
+    exchange = FakeExchange([symbol], latency=0)
+    store = CandleStore(size=50, timeframe='1m', higher_timeframes=('5m', '15m', '1h'), history=100, seed_limit=1000)
+    store.update(exchange, symbol)
+
+    # Um fetch_ohlcv de 1m e um por timeframe maior, só na semeadura
+    assert exchange.calls['fetch_ohlcv'] == 4
+    indicators = sync_timeframes({}, store.get_frames(symbol), (14, 20, 2.0))
+    for timeframe in ('5m', '15m', '1h'):
+        assert indicators[timeframe]['rsi'] is not None
+        assert indicators[timeframe]['lower_band'] is not None
+    assert len(store.get_frames(symbol)['1h'].window()) > 90
+
+    exchange.reset_calls()
+    store.update(exchange, symbol)
+    assert exchange.calls['fetch_ohlcv'] == 1
+
+def test_seed_drops_partial_first_bucket():
+    exchange_candles = [[START - HOUR, 1, 2, 0.5, 1.5, 60.0], [START, 1.5, 3, 1, 2, 60.0]]
+    # Os minutos começam no meio do período de START: esse período vem da exchange
+    seeded = minutes(START + 30 * MINUTE, 90)
+    frame = ResampledFrame('1h', size=10)
+    frame.seed(exchange_candles, seeded)
+
+    window = frame.window()
+    assert window[:, TIMESTAMP].tolist() == [START - HOUR, START, START + HOUR]
+    assert window[1].tolist() == exchange_candles[1]
+    full_hour = np.array(seeded[30:])
+    assert window[2].tolist() == [START + HOUR, full_hour[0][1], full_hour[:, 2].max(),
+                                  full_hour[:, 3].min(), full_hour[-1][4], full_hour[:, 5].sum()]
+
+def test_feeding_after_seed_matches_resampling():
+    series = minutes(START + 17 * MINUTE, 400)
+    seeded, later = series[:150], series[150:]
+    frame = ResampledFrame('15m', size=100)
+    frame.seed([], seeded)
+    for candle in later:
+        frame.feed(candle)
+
+    reference = ResampledFrame('15m', size=100)
+    for candle in series:
+        reference.feed(candle)
+    # Igual ao resample da série inteira, menos o primeiro período (parcial)
+    assert np.allclose(frame.window(), reference.window()[1:])
+
+def test_backtest_drops_partial_first_bucket():
+    series = np.array(minutes(START + 30 * MINUTE, 40 * 60))
+    timestamps, close = series[:, TIMESTAMP], series[:, 4]
+    partial = higher_timeframe_rsi(timestamps, close, HOUR, length=5)
+    # Mesma série cortada no primeiro período completo: valores iguais daí em diante
+    full = higher_timeframe_rsi(timestamps[30:], close[30:], HOUR, length=5)
+    assert np.allclose(partial[30:], full, equal_nan=True)
+    assert not np.all(np.isnan(full))
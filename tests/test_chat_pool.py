@@ -0,0 +1,113 @@
+import os
+import sys
+import threading
+import time
+
+import pytest
+
+from chat_pool import ChatWorkerPool
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'benchmarks'))
+from fake_openai import FakeOpenAI
+
+@pytest.fixture
+def stub(server_module, monkeypatch):
+    """Stub local da OpenAI no lugar da API; answer_chat do servidor aponta para ele"""
+    stub = FakeOpenAI(latency=0.2).start()
+    monkeypatch.setenv("OPENAI_BASE_URL", stub.base_url)
+    server_module.bot_state["openai_key"] = 'teste'
+    server_module.openai_session.update(client=None, key=None)
+    yield stub
+    stub.stop()
+    server_module.openai_session.update(client=None, key=None)
+
+class Replies:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.items = []
+
+    def __call__(self, message, text):
+        with self.lock:
+            self.items.append((message, text))
+
+    def for_chat(self, chat):
+        with self.lock:
+            return [(message, text) for message, text in self.items if message[0] == chat]
+
+def make_pool(server, replies, **options):
+    errors = []
+    options.setdefault('coalesce_window', 0.05)
+    pool = ChatWorkerPool(server.answer_chat, replies, on_error=errors.append, **options)
+    return pool, errors
+
+def test_replies_follow_message_order_per_chat(server_module, stub):
+    replies = Replies()
+    pool, errors = make_pool(server_module, replies, max_workers=4)
+    for chat in ('a', 'b'):
+        pool.submit(chat, (chat, 1), f"{chat}: primeira")
+    time.sleep(0.1) # As primeiras já estão no LLM; as próximas esperam a vez do chat
+    for i in (2, 3):
+        for chat in ('a', 'b'):
+            pool.submit(chat, (chat, i), f"{chat}: mensagem {i}")
+    assert pool.wait(timeout=10)
+
+    for chat in ('a', 'b'):
+        # Primeira sozinha; 2 e 3 chegaram durante a resposta e viram uma só
+        assert [message for message, _ in replies.for_chat(chat)] == [(chat, 1), (chat, 3)]
+    assert stub.calls == 4
+    assert not errors
+
+def test_chats_are_answered_in_parallel(server_module, stub):
+    replies = Replies()
+    pool, _ = make_pool(server_module, replies, max_workers=4)
+    started = time.perf_counter()
+    for chat in range(4):
+        pool.submit(chat, (chat, 1), "oi")
+    assert pool.wait(timeout=10)
+    # Em série levaria 4 x 0,2s
+    assert time.perf_counter() - started < 0.6
+    assert len(replies.items) == 4
+
+def test_burst_is_coalesced_into_one_call(server_module, stub):
+    replies = Replies()
+    pool, _ = make_pool(server_module, replies, coalesce_window=0.3)
+    for i in range(5):
+        pool.submit('a', ('a', i), f"parte {i}")
+    assert pool.wait(timeout=10)
+    assert stub.calls == 1
+    assert all(f"parte {i}" in stub.prompts[0] for i in range(5))
+    # A resposta vai para a última mensagem da rajada
+    assert [message for message, _ in replies.items] == [('a', 4)]
+
+def test_full_queue_rejects_new_messages(server_module, stub):
+    replies = Replies()
+    pool, _ = make_pool(server_module, replies, max_pending=3)
+    accepted = [pool.submit(chat, (chat, 1), "oi") for chat in range(5)]
+    assert accepted == [True, True, True, False, False]
+    assert pool.rejected == 2
+    assert pool.wait(timeout=10)
+    # Fila liberada: volta a aceitar
+    assert pool.submit('x', ('x', 1), "oi")
+    assert pool.wait(timeout=10)
+
+def test_llm_timeout_replies_with_error(server_module, stub, monkeypatch):
+    stub.latency = 1.0
+    monkeypatch.setattr(server_module, 'OPENAI_TIMEOUT_SECONDS', 0.2)
+    server_module.openai_session.update(client=None, key=None)
+    replies = Replies()
+    pool, errors = make_pool(server_module, replies)
+    pool.submit('a', ('a', 1), "oi")
+    assert pool.wait(timeout=10)
+    assert len(replies.items) == 1 and replies.items[0][1].startswith("😵")
+    assert errors and 'timed out' in str(errors[0]).lower()
+
+def test_messages_that_waited_too_long_are_dropped(server_module, stub):
+    stub.latency = 0.5
+    replies = Replies()
+    pool, _ = make_pool(server_module, replies, max_wait=0.2)
+    pool.submit('a', ('a', 1), "primeira")
+    time.sleep(0.1)
+    pool.submit('a', ('a', 2), "segunda") # Espera a primeira (0,5s) e vence
+    assert pool.wait(timeout=10)
+    assert stub.calls == 1
+    assert replies.for_chat('a')[-1][1].startswith("⌛")
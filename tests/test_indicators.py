@@ -0,0 +1,90 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from indicators import StreamingRSI, StreamingBollinger, IndicatorEngine
+
+TOLERANCE = 1e-8
+
+def fixed_series(size=400, seed=7):
+    """Passeio aleatório fixo, com um trecho de preço parado no meio"""
+    rng = np.random.default_rng(seed)
+    close = 100 + np.cumsum(rng.normal(0, 0.5, size))
+    close[size // 2:size // 2 + 15] = close[size // 2 - 1]
+    return pd.Series(close)
+
+def reference_rsi(close, length):
+    """ta.rsi; sem pandas_ta instalado, a mesma fórmula (rma = ewm(alpha=1/n))"""
+    try:
+        import pandas_ta as ta
+        return ta.rsi(close, length=length)
+    except ImportError:
+        change = close.diff()
+        gains = change.clip(lower=0).ewm(alpha=1.0 / length, min_periods=length).mean()
+        losses = (-change).clip(lower=0).ewm(alpha=1.0 / length, min_periods=length).mean()
+        return 100.0 * gains / (gains + losses)
+
+def reference_bbands(close, length, std):
+    """(inferior, superior) do ta.bbands; sem pandas_ta, sma +- k * desvio populacional"""
+    try:
+        import pandas_ta as ta
+        bands = ta.bbands(close, length=length, std=std)
+        return bands.iloc[:, 0], bands.iloc[:, 2]
+    except ImportError:
+        mid = close.rolling(length).mean()
+        deviation = close.rolling(length).std(ddof=0)
+        return mid - std * deviation, mid + std * deviation
+
+def assert_close(value, expected):
+    if pd.isna(expected):
+        assert value is None
+    else:
+        assert value == pytest.approx(expected, abs=TOLERANCE)
+
+@pytest.mark.parametrize('length', [14, 7])
+def test_streaming_rsi_matches_reference(length):
+    close = fixed_series()
+    expected = reference_rsi(close, length)
+    rsi = StreamingRSI(length)
+    for i, price in enumerate(close):
+        assert_close(rsi.update(price), expected[i])
+
+def test_streaming_bollinger_matches_reference():
+    close = fixed_series()
+    lower, upper = reference_bbands(close, 20, 2.0)
+    bbands = StreamingBollinger(20, 2.0)
+    for i, price in enumerate(close):
+        bands = bbands.update(price)
+        if pd.isna(lower[i]):
+            assert bands is None
+        else:
+            assert_close(bands[0], lower[i])
+            assert_close(bands[2], upper[i])
+
+def test_engine_peek_matches_forming_candle():
+    """peek(preço) = indicador da série com o candle em formação fechando nesse preço"""
+    close = fixed_series()
+    expected_rsi = reference_rsi(close, 14)
+    expected_lower, expected_upper = reference_bbands(close, 20, 2.0)
+    engine = IndicatorEngine(rsi_length=14, bb_length=20, bb_std=2.0)
+    for i, price in enumerate(close):
+        rsi, lower_band, upper_band = engine.peek(price)
+        assert_close(rsi, expected_rsi[i])
+        assert_close(lower_band, expected_lower[i])
+        assert_close(upper_band, expected_upper[i])
+        # peek não mexe no estado: o candle só entra quando fecha
+        engine.update(price)
+
+def test_engine_sync_skips_forming_candle_and_reseeds():
+    close = fixed_series(size=60)
+    window = np.zeros((len(close), 6))
+    window[:, 0] = np.arange(len(close)) * 60000
+    window[:, 4] = close
+    engine = IndicatorEngine()
+    engine.sync(window)
+    assert engine.last_closed_ts == window[-2, 0]
+    assert_close(engine.rsi.value, reference_rsi(close[:-1], 14).iloc[-1])
+
+    # Janela sem o último candle fechado conhecido (buffer semeado de novo): recomeça
+    engine.sync(window[-30:] + [600000000, 0, 0, 0, 0, 0])
+    assert_close(engine.rsi.value, reference_rsi(close[-30:-1].reset_index(drop=True), 14).iloc[-1])
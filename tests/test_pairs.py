@@ -0,0 +1,61 @@
+import os
+import sys
+import time
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'benchmarks'))
+
+from fake_exchange import FakeExchange
+
+PAIRS = ['AAA/USDT', 'BBB/USDT', 'CCC/USDT']
+
+@pytest.fixture
+def fake_bot(server_module):
+    """Robô ligado na FakeExchange, como no benchmarks/run_benchmarks.py"""
+    server = server_module
+    fake = FakeExchange(PAIRS, latency=0)
+    server.bot_state.update(api_key='test', secret_key='test', is_live=False,
+                            pairs=list(PAIRS), running=True, stream_mode=False)
+    server.exchange_session.update(client=server.metrics.instrument(fake), key=('test', 'test', False), markets_loaded_at=time.time())
+    user_data_stream = server.USER_DATA_STREAM
+    server.USER_DATA_STREAM = False
+    server.balance_cache.mark_stale()
+    server.active_trades.replace({})
+    yield server
+    server.bot_state.update(running=False, pairs=[])
+    server.USER_DATA_STREAM = user_data_stream
+    server.order_executor.wait()
+    server.active_trades.replace({})
+    server.reset_exchange()
+
+def test_dropped_pairs_release_their_state(fake_bot):
+    server = fake_bot
+    server.run_cycle()
+    for symbol in PAIRS:
+        assert symbol in server.candle_store.buffers
+        assert symbol in server.indicator_engines
+
+    server.bot_state["pairs"] = ['AAA/USDT']
+    server.run_cycle()
+    assert set(server.candle_store.buffers) == {'AAA/USDT'}
+    assert set(server.candle_store.frames) == {'AAA/USDT'}
+    assert set(server.indicator_engines) == {'AAA/USDT'}
+
+def test_dropped_pairs_release_their_higher_timeframes(fake_bot):
+    server = fake_bot
+    server.bot_state["risk_mode"] = 'confirmed'
+    try:
+        server.run_cycle()
+        for symbol in PAIRS:
+            assert set(server.candle_store.frames[symbol]) == {'5m', '15m', '1h'}
+            assert symbol in server.timeframe_engines
+            assert symbol in server.timeframe_indicators
+
+        server.bot_state["pairs"] = ['AAA/USDT']
+        server.run_cycle()
+        assert set(server.candle_store.frames) == {'AAA/USDT'}
+        assert set(server.timeframe_engines) == {'AAA/USDT'}
+        assert set(server.timeframe_indicators) == {'AAA/USDT'}
+    finally:
+        server.bot_state["risk_mode"] = 'conservative'
@@ -0,0 +1,83 @@
+import pytest
+
+def sell_fill(filled, requested, price=100.0):
+    return {
+        'order_id': '1', 'client_order_id': 'mcbsBTC1', 'status': 'closed', 'price': price,
+        'filled': filled, 'requested': requested, 'cost': filled * price,
+        'fee_quote': filled * price * 0.001, 'fee_base': 0.0, 'fee_usdt': filled * price * 0.001, 'fees': []
+    }
+
+@pytest.fixture
+def position(server_module):
+    trade = {'status': 'BOUGHT', 'price': 90.0, 'amount': 1.0, 'cost': 90.0, 'fee_usdt': 0.09,
+             'client_order_id': 'mcbbBTC1'}
+    server_module.active_trades.replace({'BTC/USDT': trade})
+    yield trade
+    server_module.active_trades.replace({})
+
+def test_partial_sell_keeps_the_remainder(server_module, position):
+    server = server_module
+    server.on_sell_filled('BTC/USDT', dict(position), 'Take Profit', 100.0, sell_fill(0.4, 1.0), None)
+
+    remainder = server.active_trades['BTC/USDT']
+    assert remainder['amount'] == pytest.approx(0.6)
+    assert remainder['cost'] == pytest.approx(54.0)
+    assert remainder['fee_usdt'] == pytest.approx(0.054)
+    trade = server.load_trades(limit=1)[0]
+    assert trade['amount'] == pytest.approx(0.4)
+    assert trade['profit_usdt'] == pytest.approx(40.0 - 0.04 - 36.0)
+
+def test_full_sell_closes_the_position(server_module, position):
+    server = server_module
+    # Sobra de arredondamento do lote (abaixo do mínimo de venda) não mantém a posição
+    server.on_sell_filled('BTC/USDT', dict(position), 'Stop Loss', 100.0, sell_fill(0.9999, 0.9999), None)
+    assert 'BTC/USDT' not in server.active_trades
+
+def test_partial_sell_with_dust_left_closes_the_position(server_module, position):
+    server = server_module
+    server.on_sell_filled('BTC/USDT', dict(position), 'Stop Loss', 100.0, sell_fill(0.95, 1.0), None)
+    assert 'BTC/USDT' not in server.active_trades
+
+class PrecisionExchange:
+    def amount_to_precision(self, symbol, amount):
+        return f"{amount:.6f}"
+
+@pytest.fixture
+def racing_fill(server_module, monkeypatch):
+    """A ordem pendente do par preenche logo antes de is_pending responder (a
+    thread da ordem já rodou on_done e tirou o par do pending)"""
+    server = server_module
+    submitted = []
+    monkeypatch.setattr(server.order_executor, 'submit', lambda *args: submitted.append(args))
+    monkeypatch.setitem(server.bot_state, 'balance', 1000.0)
+
+    def fill_then_check(apply_fill):
+        def is_pending(symbol):
+            apply_fill()
+            return False
+        monkeypatch.setattr(server.order_executor, 'is_pending', is_pending)
+    yield submitted, fill_then_check
+    server.active_trades.replace({})
+    server.market_data.pop('BTC/USDT', None)
+    server.position_values.pop('BTC/USDT', None)
+
+def test_buy_filling_during_evaluation_is_not_bought_twice(server_module, racing_fill):
+    server = server_module
+    submitted, fill_then_check = racing_fill
+    server.active_trades.replace({})
+    trade = {'status': 'BOUGHT', 'price': 90.0, 'amount': 0.1, 'cost': 9.0, 'fee_usdt': 0.01}
+    fill_then_check(lambda: server.active_trades.__setitem__('BTC/USDT', trade))
+    balance = {'total': {'BTC': 0.1, 'USDT': 1000.0}}
+    # Sinal de compra (RSI baixo e preço abaixo da banda) com a compra acabando de preencher
+    server.evaluate_symbol(PrecisionExchange(), 'BTC/USDT', 90.0, 10.0, 95.0, 110.0, balance)
+    assert submitted == []
+
+def test_sell_filling_during_evaluation_is_not_sold_twice(server_module, racing_fill):
+    server = server_module
+    submitted, fill_then_check = racing_fill
+    server.active_trades.replace({'BTC/USDT': {'status': 'BOUGHT', 'price': 50.0, 'amount': 1.0, 'cost': 50.0, 'fee_usdt': 0.05}})
+    fill_then_check(lambda: server.active_trades.replace({}))
+    balance = {'total': {'BTC': 1.0, 'USDT': 1000.0}}
+    # Take profit com a venda acabando de preencher
+    server.evaluate_symbol(PrecisionExchange(), 'BTC/USDT', 100.0, 50.0, 40.0, 150.0, balance)
+    assert submitted == []
@@ -0,0 +1,23 @@
+import json
+
+from strategy import DEFAULT_PARAMS
+
+def test_config_sees_presets_saved_after_start(server_module):
+    server = server_module
+    client = server.app.test_client()
+    assert 'otimizado' not in client.get('/api/config').json['risk_modes']
+
+    # sweep.py --save-preset com o servidor já rodando
+    with open('risk_presets.json', 'w') as f:
+        json.dump({'otimizado': dict(DEFAULT_PARAMS, rsi_buy=27)}, f)
+
+    assert 'otimizado' in client.get('/api/config').json['risk_modes']
+    response = client.post('/api/config', json={'risk_mode': 'otimizado'})
+    assert response.status_code == 200
+    assert server.get_risk_params(server.bot_state['risk_mode'])['rsi_buy'] == 27
+
+def test_config_rejects_unknown_risk_mode(server_module):
+    client = server_module.app.test_client()
+    response = client.post('/api/config', json={'risk_mode': 'inexistente'})
+    assert response.status_code == 400
+    assert server_module.bot_state['risk_mode'] != 'inexistente'
@@ -0,0 +1,36 @@
+import json
+import os
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Simula `python server.py` com shards: o __main__ aponta para o server.py, então
+# cada shard (spawn) reimporta o arquivo como __mp_main__, como na execução real
+SHARDED_RUN = f"""
+import sys
+sys.modules['__main__'].__file__ = {os.path.join(ROOT, 'server.py')!r}
+sys.path[:0] = [{ROOT!r}, {os.path.join(ROOT, 'benchmarks')!r}]
+import server, shards
+from fake_exchange import FakeExchange
+
+pairs = [f"C{{i}}/USDT" for i in range(8)]
+pool = shards.ShardPool(2, FakeExchange, (pairs, 0), candle_options=server.candle_store.options())
+results = pool.evaluate(pairs, {{}}, server.get_indicator_key(), pairs)
+pool.stop()
+assert len(results) == len(pairs) and not any(error for *_, error in results.values()), results
+print("ok")
+"""
+
+def test_sharded_run_starts_a_single_bot(tmp_path):
+    env = dict(os.environ, BOT_BACKGROUND_THREADS='1', TELEGRAM_TOKEN='', BINANCE_API_KEY='', BINANCE_SECRET_KEY='')
+    env.pop('BOT_STATE_ADDRESS', None)
+    result = subprocess.run([sys.executable, '-c', SHARDED_RUN], cwd=tmp_path, env=env,
+                            capture_output=True, text=True, timeout=120)
+    assert result.returncode == 0, result.stderr
+    assert result.stdout.strip().endswith("ok")
+
+    # Só o processo principal iniciou o robô e o chatbot (um único poller do Telegram)
+    lines = [json.loads(line)['data'] for line in (tmp_path / 'events.jsonl').read_text().splitlines()]
+    assert sum("Chatbot Telegram iniciado" in line for line in lines) == 1
+    assert sum("Sistema iniciado" in line for line in lines) == 1
@@ -0,0 +1,64 @@
+import os
+import subprocess
+import sys
+import time
+
+import pytest
+
+from state_store import StateServer, StateClient
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+def test_request_timeout_is_not_retried(tmp_path):
+    calls = []
+    def slow(payload):
+        calls.append(payload)
+        time.sleep(1)
+        return 'tarde'
+    address = str(tmp_path / 'state.sock')
+    server = StateServer(address, b'segredo', handlers={'slow': slow, 'ping': lambda _: 'pong'})
+    server.start()
+    client = StateClient(address, b'segredo', timeout=0.2)
+
+    with pytest.raises(TimeoutError):
+        client.request('slow', 1)
+    assert calls == [1]
+    # A conexão que expirou foi descartada; a próxima chamada usa uma nova
+    assert client.request('ping') == 'pong'
+
+def test_wrong_authkey_is_refused(tmp_path):
+    address = str(tmp_path / 'state.sock')
+    StateServer(address, b'segredo', handlers={'ping': lambda _: 'pong'}).start()
+    with pytest.raises(Exception):
+        StateClient(address, b'outra', timeout=1).request('ping')
+
+def test_state_address_requires_authkey(tmp_path):
+    env = dict(os.environ, BOT_STATE_ADDRESS=str(tmp_path / 'state.sock'), BOT_BACKGROUND_THREADS='0')
+    env.pop('BOT_STATE_AUTHKEY', None)
+    result = subprocess.run([sys.executable, '-c', 'import server'], cwd=tmp_path, env=dict(env, PYTHONPATH=ROOT),
+                            capture_output=True, text=True, timeout=60)
+    assert result.returncode != 0
+    assert 'BOT_STATE_AUTHKEY' in result.stderr
+
+WORKER_CHECK = """
+import os, server
+assert not server.is_primary and server.state_client is not None
+assert server.trade_journal is None
+assert not os.path.exists('trades.db') and not os.path.exists('events.jsonl')
+print('ok')
+"""
+
+def test_worker_does_not_open_the_journal_or_event_history(tmp_path):
+    fcntl = pytest.importorskip('fcntl')
+    # Este processo faz o papel do primário: o worker não pega o lock
+    lock = open(tmp_path / 'bot_primary.lock', 'a+')
+    fcntl.flock(lock, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    env = dict(os.environ, BOT_STATE_ADDRESS=str(tmp_path / 'state.sock'), BOT_STATE_AUTHKEY='segredo',
+               BOT_BACKGROUND_THREADS='0', PYTHONPATH=ROOT)
+    try:
+        result = subprocess.run([sys.executable, '-c', WORKER_CHECK], cwd=tmp_path, env=env,
+                                capture_output=True, text=True, timeout=60)
+    finally:
+        lock.close()
+    assert result.returncode == 0, result.stderr
+    assert 'ok' in result.stdout
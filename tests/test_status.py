@@ -0,0 +1,42 @@
+import threading
+import time
+
+def test_get_after_publish_serves_the_published_version(server_module):
+    server = server_module
+    client = server.app.test_client()
+    server.log("Log escrito durante o ciclo")
+    server.publish_status()
+    version = server.status_snapshot.payload[0]
+
+    response = client.get('/api/status')
+    assert response.status_code == 200
+    assert server.status_snapshot.payload[0] == version
+
+    # Log novo depois da publicação: a próxima leitura remonta
+    server.log("Log depois da publicação")
+    client.get('/api/status')
+    assert server.status_snapshot.payload[0] == version + 1
+
+def test_overlapping_publishes_keep_the_newest_state(server_module, monkeypatch):
+    server = server_module
+    build_summary = server.build_status_summary
+    calls = []
+
+    def slow_summary():
+        calls.append(1)
+        if len(calls) == 1:
+            time.sleep(0.3) # A primeira publicação demora a montar o resumo
+        return build_summary()
+
+    monkeypatch.setattr(server, 'build_status_summary', slow_summary)
+    server.market_data['RACE/USDT'] = {'price': 1.0}
+    first = threading.Thread(target=server.publish_status)
+    first.start()
+    time.sleep(0.1)
+    server.market_data['RACE/USDT'] = {'price': 2.0}
+    server.publish_status()
+    first.join()
+
+    assert server.status_snapshot.market['RACE/USDT'] == {'price': 2.0}
+    assert server.status_broadcaster.last_market['RACE/USDT'] == {'price': 2.0}
+    del server.market_data['RACE/USDT']
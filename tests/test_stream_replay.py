@@ -0,0 +1,80 @@
+import time
+
+import pytest
+
+from market_stream import MarketStream
+from stream_replay import ReplaySession, load_datasets, split_history
+
+START = 1_700_000_000_000 // 60000 * 60000
+
+def write_csv(path, closes):
+    """Candles de 1m com abertura no fechamento anterior"""
+    lines = ["timestamp,open,high,low,close,volume"]
+    previous = closes[0]
+    for i, close in enumerate(closes):
+        high, low = max(previous, close) * 1.001, min(previous, close) * 0.999
+        lines.append(f"{START + i * 60000},{previous},{high},{low},{close},10")
+        previous = close
+    path.write_text("\n".join(lines) + "\n")
+
+def dip_and_recovery(warmup=100):
+    """Lateral no aquecimento, queda forte (sinal de compra) e recuperação"""
+    closes = [100 + 0.3 * ((i % 6) - 2.5) for i in range(warmup)]
+    for _ in range(12):
+        closes.append(closes[-1] * 0.99)
+    for _ in range(20):
+        closes.append(closes[-1] * 1.01)
+    return closes
+
+@pytest.fixture
+def replay(server_module, tmp_path):
+    path = tmp_path / 'btc_1m.csv'
+    write_csv(path, dip_and_recovery())
+    session = ReplaySession(load_datasets([f"BTC/USDT={path}"]), warmup=100, speed=0)
+    server = server_module
+    server.start_replay(session)
+    server.bot_state.update(running=True, risk_mode='conservative')
+    server.active_trades.replace({})
+    server.balance_cache.mark_stale()
+    yield session
+    server.bot_state["running"] = False
+    server.stop_replay()
+
+def test_split_history_seeds_before_the_replay(tmp_path):
+    path = tmp_path / 'eth.csv'
+    write_csv(path, [10.0 + i for i in range(5)])
+    history, rest = split_history(load_datasets([f"ETH/USDT={path}"]), 3)
+    assert [c[4] for c in history['ETH/USDT']] == [10.0, 11.0, 12.0]
+    assert rest['ETH/USDT'][0][0] == history['ETH/USDT'][-1][0] + 60000
+
+def test_replay_drives_stream_events_to_buy_and_sell(server_module, replay):
+    server = server_module
+    exchange = server.get_exchange()
+    assert exchange is not None # Sem chaves da Binance nem rede
+    server.get_balance(exchange)
+    server.seed_candles(exchange, replay.pairs)
+    assert server.candle_store.get('BTC/USDT').count > 0
+
+    colors = []
+    stream = MarketStream(replay.url, replay.pairs, server.on_stream_event)
+    def send(message):
+        stream._dispatch(message)
+        server.order_executor.wait(timeout=5)
+        colors.append(server.market_data.get('BTC/USDT', {}).get('signal_color'))
+    replay.play(send)
+
+    sides = [order['side'] for order in replay.exchange.orders]
+    assert 'green' in colors and 'red' in colors
+    assert sides[:2] == ['buy', 'sell']
+    assert 'BTC/USDT' not in server.active_trades
+
+def test_replay_over_websocket(server_module, replay):
+    server = server_module
+    server.run_cycle() # Saldo, semeadura e conexão no replay local
+    last_ts = replay.replay['BTC/USDT'][-1][0]
+    deadline = time.time() + 20
+    while time.time() < deadline and server.candle_store.get('BTC/USDT').last_timestamp != last_ts:
+        time.sleep(0.05)
+    server.order_executor.wait(timeout=5)
+    assert server.candle_store.get('BTC/USDT').last_timestamp == last_ts
+    assert [order['side'] for order in replay.exchange.orders][:2] == ['buy', 'sell']
@@ -0,0 +1,31 @@
+import json
+import multiprocessing
+
+from trade_journal import TradeJournal
+
+def open_journal(db, legacy, barrier):
+    barrier.wait() # Todos os "workers" abrem o banco juntos
+    TradeJournal(db, legacy_file=legacy)
+
+def test_concurrent_migration_imports_once(tmp_path):
+    legacy = tmp_path / 'trades.json'
+    db = tmp_path / 'trades.db'
+    trades = [{'symbol': 'BTC/USDT', 'timestamp': f"2024-01-01 00:00:{i:02d}", 'profit_usdt': i} for i in range(50)]
+    legacy.write_text(json.dumps(trades))
+
+    context = multiprocessing.get_context('spawn')
+    barrier = context.Barrier(4)
+    workers = [context.Process(target=open_journal, args=(str(db), str(legacy), barrier)) for _ in range(4)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join(timeout=30)
+
+    assert [worker.exitcode for worker in workers] == [0, 0, 0, 0]
+    assert TradeJournal(str(db)).count() == len(trades)
+    assert not legacy.exists()
+    assert (tmp_path / 'trades.json.migrated').exists()
+
+def test_migration_without_legacy_file(tmp_path):
+    journal = TradeJournal(str(tmp_path / 'trades.db'), legacy_file=str(tmp_path / 'trades.json'))
+    assert journal.count() == 0
@@ -0,0 +1,195 @@
+import json
+import os
+import sqlite3
+import threading
+from datetime import datetime
+
+class TradeJournal:
+    """Diário de trades em SQLite (modo WAL).
+
+    Cada trade é um INSERT (O(1), transacional e seguro contra queda), com
+    índices por data e por par para consultas por período. Na primeira abertura
+    importa o trades.json antigo, se existir.
+    """
+
+    def __init__(self, path='trades.db', legacy_file=None):
+        self.path = path
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS trades (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                timestamp TEXT NOT NULL,
+                symbol TEXT NOT NULL,
+                profit_usdt REAL NOT NULL DEFAULT 0,
+                data TEXT NOT NULL
+            )
+        """)
+        self.conn.execute("CREATE INDEX IF NOT EXISTS idx_trades_timestamp ON trades (timestamp)")
+        self.conn.execute("CREATE INDEX IF NOT EXISTS idx_trades_symbol ON trades (symbol, timestamp)")
+        self.conn.commit()
+
+        if legacy_file:
+            self.migrate_json(legacy_file)
+
+    def migrate_json(self, legacy_file):
+        """Importa uma única vez a lista do trades.json e renomeia o arquivo antigo.
+
+        Vários processos podem abrir o mesmo banco ao mesmo tempo (workers do
+        gunicorn): a contagem e o INSERT rodam numa única transação BEGIN
+        IMMEDIATE (trava de escrita do SQLite), então só o primeiro importa, e o
+        arquivo pode já ter sido renomeado por outro processo.
+        """
+        try:
+            with open(legacy_file, 'r') as f:
+                trades = json.load(f)
+        except FileNotFoundError:
+            return 0 # Nada a migrar (ou outro processo já migrou)
+        except Exception as e:
+            print(f"Erro ao ler {legacy_file} para migração: {e}")
+            return 0
+
+        with self.lock:
+            self.conn.execute("BEGIN IMMEDIATE")
+            try:
+                # Já migrado (por outro processo, ou queda entre o commit e a renomeação)
+                imported = self.conn.execute("SELECT COUNT(*) FROM trades").fetchone()[0] == 0
+                if imported:
+                    self.conn.executemany(
+                        "INSERT INTO trades (timestamp, symbol, profit_usdt, data) VALUES (?, ?, ?, ?)",
+                        [self._row(t) for t in trades]
+                    )
+                self.conn.commit()
+            except Exception:
+                self.conn.rollback()
+                raise
+        try:
+            os.replace(legacy_file, legacy_file + '.migrated')
+        except FileNotFoundError:
+            pass # Outro processo renomeou primeiro
+        if not imported:
+            return 0
+        print(f"{len(trades)} trades migrados de {legacy_file} para {self.path}")
+        return len(trades)
+
+    def _row(self, trade):
+        return (
+            trade.get('timestamp', ''),
+            trade.get('symbol', ''),
+            trade.get('profit_usdt', 0) or 0,
+            json.dumps(trade)
+        )
+
+    def append(self, trade):
+        with self.lock, self.conn:
+            self.conn.execute(
+                "INSERT INTO trades (timestamp, symbol, profit_usdt, data) VALUES (?, ?, ?, ?)",
+                self._row(trade)
+            )
+
+    def _where(self, start, end, symbol):
+        clauses, params = [], []
+        if start:
+            clauses.append("timestamp >= ?")
+            params.append(start)
+        if end:
+            clauses.append("timestamp < ?")
+            params.append(end)
+        if symbol:
+            clauses.append("symbol = ?")
+            params.append(symbol)
+        where = (" WHERE " + " AND ".join(clauses)) if clauses else ""
+        return where, params
+
+    def query(self, start=None, end=None, symbol=None, limit=None):
+        """Trades em ordem cronológica. start/end no formato 'YYYY-MM-DD[ HH:MM:SS]'
+        (end exclusivo); com limit, retorna os mais recentes."""
+        where, params = self._where(start, end, symbol)
+        sql = f"SELECT data FROM trades{where} ORDER BY id DESC"
+        if limit:
+            sql += " LIMIT ?"
+            params.append(limit)
+        with self.lock:
+            rows = self.conn.execute(sql, params).fetchall()
+        return [json.loads(r[0]) for r in reversed(rows)]
+
+    def recent(self, limit):
+        return self.query(limit=limit)
+
+    def profit_sum(self, start=None, end=None, symbol=None):
+        where, params = self._where(start, end, symbol)
+        with self.lock:
+            row = self.conn.execute(f"SELECT COALESCE(SUM(profit_usdt), 0) FROM trades{where}", params).fetchone()
+        return row[0]
+
+    def count(self):
+        with self.lock:
+            return self.conn.execute("SELECT COUNT(*) FROM trades").fetchone()[0]
+
+    def close(self):
+        with self.lock:
+            self.conn.close()
+
+def reason_key(reason):
+    """Agrupa o texto do motivo de venda ('Take Profit (+2%)' etc.) em uma chave fixa"""
+    reason = (reason or '').lower()
+    if 'take profit' in reason:
+        return 'take_profit'
+    if 'stop loss' in reason:
+        return 'stop_loss'
+    if 'rsi' in reason:
+        return 'rsi_exit'
+    return 'other'
+
+class ProfitAggregator:
+    """Totais de lucro mantidos em memória: carregados uma vez do diário e
+    atualizados a cada trade salvo. O /api/status só lê os números prontos."""
+
+    def __init__(self, clock=None):
+        self.lock = threading.Lock()
+        self.clock = clock or (lambda: datetime.now().strftime('%Y-%m-%d'))
+        self.total = 0.0
+        self.day = self.clock()
+        self.daily = 0.0
+        self.by_symbol = {}
+        self.by_reason = {}
+
+    def load(self, trades):
+        for trade in trades:
+            self.add(trade)
+
+    def _roll_day(self):
+        today = self.clock()
+        if today != self.day:
+            self.day = today
+            self.daily = 0.0
+
+    def add(self, trade):
+        profit = trade.get('profit_usdt', 0) or 0
+        with self.lock:
+            self._roll_day()
+            self.total += profit
+            if trade.get('timestamp', '').startswith(self.day):
+                self.daily += profit
+            symbol = trade.get('symbol', '')
+            self.by_symbol[symbol] = self.by_symbol.get(symbol, 0.0) + profit
+            key = reason_key(trade.get('reason'))
+            self.by_reason[key] = self.by_reason.get(key, 0.0) + profit
+
+    def totals(self):
+        """(lucro total, lucro de hoje)"""
+        with self.lock:
+            self._roll_day()
+            return self.total, self.daily
+
+    def snapshot(self):
+        with self.lock:
+            self._roll_day()
+            return {
+                'total': self.total,
+                'daily': self.daily,
+                'by_symbol': dict(self.by_symbol),
+                'by_reason': dict(self.by_reason)
+            }